@@ -1,49 +1,110 @@
-from fastapi import Depends, HTTPException, status, Request
+from fastapi import Depends, HTTPException, status, Request, WebSocket, WebSocketException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.core.security import verify_token
-from app.core.database import AsyncSessionLocal
-from app.models.api_key import ApiKey
-from sqlalchemy import select
+from app.services.api_key_cache import ApiKeyCache, load_api_key
 from typing import Dict, Any, Optional
 import hashlib
 
-from app.core.ratelimit import RateLimiter
+from app.core.config import settings
+from app.core.plans import resolve_plan
+from app.core.ratelimit import get_rate_limiter, limits_for
 
 security = HTTPBearer(auto_error=False)
 
-async def get_current_user(
-    request: Request,
-    token_creds: Optional[HTTPAuthorizationCredentials] = Depends(security)
+async def authenticate(
+    redis,
+    api_key_header: Optional[str] = None,
+    token: Optional[str] = None,
+    api_key_cache: Optional[ApiKeyCache] = None,
+    state=None
 ) -> Dict[str, Any]:
-    # 1. Check for API Key in header
-    api_key_header = request.headers.get("X-API-Key")
+    """
+    Resolve an API key or a Clerk bearer token to a user dict.
+
+    API key requests are rate limited; the result is left on `state.rate_limit`
+    (if given) for the X-RateLimit-* response headers.
+    """
+    # 1. Check for API Key
     if api_key_header:
         # Validate API Key
         key_hash = hashlib.sha256(api_key_header.encode()).hexdigest()
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(select(ApiKey).where(ApiKey.key_hash == key_hash))
-            api_key = result.scalar_one_or_none()
-            
-            if api_key and api_key.is_active:
-                # Check Rate Limit
-                if hasattr(request.app.state, "redis"):
-                    limiter = RateLimiter(request.app.state.redis)
-                    await limiter.check_limit(f"apikey:{api_key.id}", api_key.rate_limit)
-                
-                # Return a user-like dict. We use the user_id associated with the key.
-                return {"sub": api_key.user_id, "api_key_id": api_key.id}
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED, 
-                    detail="Invalid or inactive API Key"
+        if api_key_cache is not None:
+            api_key = await api_key_cache.get(key_hash)
+        else:
+            api_key = await load_api_key(key_hash)
+
+        if api_key and api_key["is_active"]:
+            # Check Rate Limit
+            if redis is not None:
+                limits = limits_for(
+                    api_key.get("rate_limit_per_second") or settings.RATE_LIMIT_PER_SECOND,
+                    api_key["rate_limit"],
+                    api_key.get("rate_limit_per_day") or settings.RATE_LIMIT_PER_DAY,
                 )
+                result = await get_rate_limiter(redis).enforce(f"apikey:{api_key['id']}", limits)
+                if state is not None:
+                    state.rate_limit = result
+
+            # Return a user-like dict. We use the user_id associated with the key.
+            return {
+                "sub": api_key["user_id"],
+                "api_key_id": api_key["id"],
+                "plan": resolve_plan(api_key.get("plan")),
+                "queue_weight": api_key.get("queue_weight"),
+            }
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or inactive API Key"
+            )
 
     # 2. Check for Bearer Token
-    if token_creds:
-        return verify_token(token_creds.credentials)
-        
+    if token:
+        # The plan comes from a "plan" claim, if the Clerk session token template adds one
+        claims = await verify_token(token)
+        return {**claims, "plan": resolve_plan(claims.get("plan"))}
+
     # 3. Neither found
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Not authenticated"
     )
+
+async def get_current_user(
+    request: Request,
+    token_creds: Optional[HTTPAuthorizationCredentials] = Depends(security)
+) -> Dict[str, Any]:
+    user = await authenticate(
+        getattr(request.app.state, "redis", None),
+        api_key_header=request.headers.get("X-API-Key"),
+        token=token_creds.credentials if token_creds else None,
+        api_key_cache=getattr(request.app.state, "api_key_cache", None),
+        state=request.state
+    )
+    usage_buffer = getattr(request.app.state, "usage_buffer", None)
+    if usage_buffer is not None and "api_key_id" in user:
+        usage_buffer.add(user["api_key_id"])
+    return user
+
+async def get_current_user_ws(websocket: WebSocket) -> Dict[str, Any]:
+    """
+    Authenticate a WebSocket handshake.
+
+    Browsers can't set headers on a WebSocket, so the API key or token may also
+    be passed as the `api_key` / `token` query parameters.
+    """
+    api_key = websocket.headers.get("X-API-Key") or websocket.query_params.get("api_key")
+    token = websocket.query_params.get("token")
+    auth_header = websocket.headers.get("Authorization", "")
+    if not token and auth_header.lower().startswith("bearer "):
+        token = auth_header[7:]
+
+    try:
+        return await authenticate(
+            getattr(websocket.app.state, "redis", None),
+            api_key,
+            token,
+            api_key_cache=getattr(websocket.app.state, "api_key_cache", None)
+        )
+    except HTTPException as e:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
@@ -2,8 +2,12 @@ from fastapi import APIRouter
 
 api_router = APIRouter()
 
-from app.api.v1.endpoints import scrape, stats, api_keys, webhooks
+from app.api.v1.endpoints import scrape, stats, api_keys, webhooks, schedules, events, export, search
 api_router.include_router(scrape.router, prefix="/scrape", tags=["scrape"])
 api_router.include_router(stats.router, prefix="/stats", tags=["stats"])
 api_router.include_router(api_keys.router, prefix="/api_keys", tags=["api_keys"])
 api_router.include_router(webhooks.router, prefix="/webhooks", tags=["webhooks"])
+api_router.include_router(schedules.router, prefix="/schedules", tags=["schedules"])
+api_router.include_router(events.router, prefix="/events", tags=["events"])
+api_router.include_router(export.router, prefix="/export", tags=["export"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.core.database import AsyncSessionLocal
 from app.models.api_key import ApiKey
 from app.api.deps import get_current_user
+from app.services.api_key_cache import api_key_record, invalidate_api_key
+from app.services.usage import get_usage
 from pydantic import BaseModel
 from typing import List
 import secrets
@@ -109,6 +111,38 @@ async def list_api_keys(
         for k in keys
     ]
 
+@router.get(
+    "/{key_id}/usage",
+    summary="Get API key usage",
+    description="Requests, static and dynamic jobs and LLM tokens used by an API key, per UTC day.",
+    response_description="All-time request count and a daily breakdown"
+)
+async def get_api_key_usage(
+    key_id: str,
+    req: Request,
+    days: int = Query(30, ge=1, le=365),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get usage for one of your API keys, including the last minute's counts not yet saved to the database.
+
+    - **key_id**: The unique identifier of the key
+    - **days**: How many days of daily breakdown to return (default 30)
+    """
+    user_id = current_user.get("sub")
+    result = await db.execute(
+        select(ApiKey)
+        .where(ApiKey.id == key_id)
+        .where(ApiKey.user_id == user_id)
+    )
+    api_key = result.scalar_one_or_none()
+
+    if not api_key:
+        raise HTTPException(status_code=404, detail="API Key not found")
+
+    return await get_usage(req.app.state.redis, api_key, days)
+
 @router.delete(
     "/{key_id}",
     summary="Revoke API key",
@@ -117,6 +151,7 @@ async def list_api_keys(
 )
 async def revoke_api_key(
     key_id: str,
+    req: Request,
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
@@ -140,5 +175,11 @@ async def revoke_api_key(
         
     api_key.is_active = False
     await db.commit()
+
+    # Reject the key everywhere now, not when the auth caches expire
+    await invalidate_api_key(req.app.state.redis, api_key.key_hash, api_key_record(api_key))
+    cache = getattr(req.app.state, "api_key_cache", None)
+    if cache is not None:
+        cache.invalidate(api_key.key_hash)
     
     return {"status": "revoked"}
@@ -0,0 +1,167 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, List, Optional
+from app.api.deps import get_current_user, get_current_user_ws
+from app.services.job_events import JobEventSubscription, format_sse
+from app.services.job_store import (
+    TERMINAL_STATUSES,
+    batch_key,
+    job_channel,
+    user_channel,
+    batch_channel,
+    read_job_fields,
+    read_job_record,
+)
+
+router = APIRouter()
+
+# Fields sent as the first event, so clients start from the current state
+SNAPSHOT_FIELDS = ["status", "url", "mode", "user_id", "batch_id", "error", "created_at"]
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no", # Disable proxy buffering (nginx, Railway)
+}
+
+async def job_snapshot(redis, job_id: str, user_id: str) -> Dict[str, Any]:
+    """Current small fields of a job, or 404 if it doesn't exist or isn't the user's."""
+    job = await read_job_fields(redis, job_id, SNAPSHOT_FIELDS)
+    if not job or job.get("user_id") not in (None, user_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job_id, **{k: v for k, v in job.items() if v is not None}}
+
+async def _with_result(redis, event: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Events only carry the status, so the last event of a job stream is sent
+    with the job's record (its data or error) read from Redis.
+    """
+    if event is None or event.get("status") not in TERMINAL_STATUSES:
+        return event
+    record = await read_job_record(redis, event["job_id"]) or {}
+    return {**{k: v for k, v in record.items() if v is not None}, **event}
+
+async def _resolve_channels(
+    redis,
+    user_id: str,
+    job_id: Optional[str] = None,
+    batch_id: Optional[str] = None
+) -> List[str]:
+    """Check the user may watch the requested scope and return its channels."""
+    if job_id:
+        await job_snapshot(redis, job_id, user_id)
+        return [job_channel(job_id)]
+    if batch_id:
+        owner = await redis.hget(batch_key(batch_id), "user_id")
+        if not owner or owner.decode() != user_id:
+            raise HTTPException(status_code=404, detail="Batch not found")
+        return [batch_channel(batch_id)]
+    return [user_channel(user_id)]
+
+async def _sse_stream(request: Request, channels: List[str], user_id: str, job_id: Optional[str] = None):
+    redis = request.app.state.redis
+    async with JobEventSubscription(request.app.state.job_events, channels) as subscription:
+        if job_id:
+            # Read the current state after subscribing so nothing is missed
+            snapshot = await job_snapshot(redis, job_id, user_id)
+            yield format_sse(snapshot)
+            if snapshot.get("status") in TERMINAL_STATUSES:
+                return
+
+        async for event in subscription.events(stop_on_terminal=job_id is not None):
+            if event is None and await request.is_disconnected():
+                return
+            if job_id:
+                event = await _with_result(redis, event)
+            yield format_sse(event)
+
+def _sse_response(stream) -> StreamingResponse:
+    return StreamingResponse(stream, media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.get(
+    "/jobs/{job_id}",
+    summary="Stream job status (SSE)",
+    description="Server-Sent Events stream of a job's status transitions and result. Ends when the job completes, fails or is cancelled.",
+    response_description="text/event-stream of job events"
+)
+async def stream_job_events(
+    job_id: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Stream updates for one job instead of polling `GET /scrape/{job_id}`.
+
+    The first event is the job's current state.
+    """
+    user_id = current_user["sub"]
+    channels = await _resolve_channels(request.app.state.redis, user_id, job_id=job_id)
+    return _sse_response(_sse_stream(request, channels, user_id, job_id=job_id))
+
+@router.get(
+    "/batches/{batch_id}",
+    summary="Stream batch status (SSE)",
+    description="Server-Sent Events stream of status transitions for every job in a batch.",
+    response_description="text/event-stream of job events"
+)
+async def stream_batch_events(
+    batch_id: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    user_id = current_user["sub"]
+    channels = await _resolve_channels(request.app.state.redis, user_id, batch_id=batch_id)
+    return _sse_response(_sse_stream(request, channels, user_id))
+
+@router.get(
+    "/",
+    summary="Stream all my jobs (SSE)",
+    description="Server-Sent Events stream of status transitions for all of the current user's jobs.",
+    response_description="text/event-stream of job events"
+)
+async def stream_user_events(
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    user_id = current_user["sub"]
+    channels = await _resolve_channels(request.app.state.redis, user_id)
+    return _sse_response(_sse_stream(request, channels, user_id))
+
+@router.websocket("/ws")
+async def job_events_websocket(
+    websocket: WebSocket,
+    job_id: Optional[str] = None,
+    batch_id: Optional[str] = None
+):
+    """
+    WebSocket stream of job events.
+
+    Connect with `?job_id=...`, `?batch_id=...` or neither (all of the user's jobs).
+    Authenticate with the `X-API-Key` header or the `api_key` / `token` query parameter.
+    Each message is a JSON job event; a job-scoped socket closes once the job is done.
+    """
+    current_user = await get_current_user_ws(websocket)
+    user_id = current_user["sub"]
+    redis = websocket.app.state.redis
+    try:
+        channels = await _resolve_channels(redis, user_id, job_id=job_id, batch_id=batch_id)
+    except HTTPException as e:
+        await websocket.close(code=4404, reason=str(e.detail))
+        return
+
+    await websocket.accept()
+    try:
+        async with JobEventSubscription(websocket.app.state.job_events, channels) as subscription:
+            if job_id:
+                snapshot = await job_snapshot(redis, job_id, user_id)
+                await websocket.send_json(snapshot)
+                if snapshot.get("status") in TERMINAL_STATUSES:
+                    await websocket.close()
+                    return
+
+            async for event in subscription.events(stop_on_terminal=job_id is not None):
+                if job_id:
+                    event = await _with_result(redis, event)
+                await websocket.send_json(event if event is not None else {"type": "ping"})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Optional
+from app.api.deps import get_current_user
+from app.services.export import EXPORT_FORMATS, export_query, export_stream
+
+router = APIRouter()
+
+@router.get(
+    "/jobs",
+    summary="Export job results",
+    description="Stream the current user's saved jobs and their results as NDJSON, CSV or Parquet, optionally gzipped.",
+    response_description="The export file, streamed with chunked transfer encoding"
+)
+async def export_jobs(
+    format: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$"),
+    batch_id: Optional[str] = Query(None, description="Only jobs of this batch"),
+    schedule_id: Optional[str] = Query(None, description="Only runs of this schedule"),
+    status: Optional[str] = Query(None, description="Only jobs with this status"),
+    since: Optional[datetime] = Query(None, description="Only jobs created at or after this time (UTC)"),
+    until: Optional[datetime] = Query(None, description="Only jobs created before this time (UTC)"),
+    gzip: bool = Query(False, description="Compress the file with gzip"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Export saved jobs, oldest first.
+
+    - **format**: `ndjson` (one job per line), `csv` (one column per result field) or `parquet`
+    - **batch_id** / **schedule_id** / **status** / **since** / **until**: Filters (optional)
+    - **gzip**: Return a `.gz` file (default false). Parquet is already compressed
+
+    Rows are read from a database cursor and written out as they arrive, so
+    exports of any size use constant memory.
+    """
+    query = export_query(
+        current_user["sub"],
+        batch_id=batch_id, schedule_id=schedule_id, status=status, since=since, until=until
+    )
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"jobs-{datetime.utcnow():%Y%m%d-%H%M%S}.{extension}"
+    if gzip:
+        media_type, filename = "application/gzip", filename + ".gz"
+
+    return StreamingResponse(
+        export_stream(query, format, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,142 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.core.database import AsyncSessionLocal
+from app.services.blobstore import load_result
+from app.models.schedule import Schedule
+from app.api.deps import get_current_user
+from app.api.v1.endpoints.scrape import ScrapeRequest
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import asyncio
+import uuid
+
+router = APIRouter()
+
+class ScheduleCreate(ScrapeRequest):
+    interval_seconds: int = Field(3600, ge=60, le=30 * 24 * 3600)
+
+class ScheduleResponse(BaseModel):
+    id: str
+    url: str
+    mode: str
+    selectors: Optional[Dict[str, str]] = None
+    instruction: Optional[str] = None
+    options: Optional[Dict[str, bool]] = None
+    interval_seconds: int
+    is_active: bool
+    next_run_at: Optional[str] = None
+    last_run_at: Optional[str] = None
+    last_changed_at: Optional[str] = None
+    last_job_id: Optional[str] = None
+    last_data: Optional[Any] = None
+    created_at: str
+
+async def get_db():
+    async with AsyncSessionLocal() as session:
+        yield session
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+async def _to_response(s: Schedule) -> Dict[str, Any]:
+    return {
+        "id": s.id,
+        "url": s.url,
+        "mode": s.mode,
+        "selectors": s.selectors,
+        "instruction": s.instruction,
+        "options": s.options,
+        "interval_seconds": s.interval_seconds,
+        "is_active": s.is_active,
+        "next_run_at": _isoformat(s.next_run_at),
+        "last_run_at": _isoformat(s.last_run_at),
+        "last_changed_at": _isoformat(s.last_changed_at),
+        "last_job_id": s.last_job_id,
+        "last_data": await load_result(s.last_data), # Large results are kept in the blob store
+        "created_at": s.created_at.isoformat()
+    }
+
+async def _get_owned_schedule(db: AsyncSession, schedule_id: str, user_id: str) -> Schedule:
+    result = await db.execute(
+        select(Schedule)
+        .where(Schedule.id == schedule_id)
+        .where(Schedule.user_id == user_id)
+    )
+    schedule = result.scalar_one_or_none()
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return schedule
+
+@router.post(
+    "/",
+    response_model=ScheduleResponse,
+    summary="Create a recurring scrape",
+    description="Re-run a scrape job spec at a fixed interval. A `job.changed` webhook is sent only when the extracted fields change.",
+    response_description="Created schedule"
+)
+async def create_schedule(
+    data: ScheduleCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Create a recurring scrape.
+
+    - **interval_seconds**: How often to re-check the page (60s to 30 days)
+    - All other fields are the same as for `POST /scrape`
+
+    The first run happens on the next scheduler tick (within a minute).
+    """
+    schedule = Schedule(
+        id=str(uuid.uuid4()),
+        user_id=current_user.get("sub"),
+        plan=current_user.get("plan"),
+        url=data.url,
+        mode=data.mode,
+        selectors=data.selectors,
+        instruction=data.instruction,
+        options=data.options,
+        interval_seconds=data.interval_seconds,
+        next_run_at=datetime.utcnow()
+    )
+
+    db.add(schedule)
+    await db.commit()
+
+    return await _to_response(schedule)
+
+@router.get("/", response_model=List[ScheduleResponse])
+async def list_schedules(
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    result = await db.execute(
+        select(Schedule)
+        .where(Schedule.user_id == current_user.get("sub"))
+        .order_by(Schedule.created_at.desc())
+    )
+    return await asyncio.gather(*(_to_response(s) for s in result.scalars().all()))
+
+@router.get("/{schedule_id}", response_model=ScheduleResponse)
+async def get_schedule(
+    schedule_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    schedule = await _get_owned_schedule(db, schedule_id, current_user.get("sub"))
+    return await _to_response(schedule)
+
+@router.delete("/{schedule_id}")
+async def delete_schedule(
+    schedule_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    schedule = await _get_owned_schedule(db, schedule_id, current_user.get("sub"))
+
+    await db.delete(schedule)
+    await db.commit()
+
+    return {"status": "deleted"}
@@ -1,6 +1,29 @@
-from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi import APIRouter, HTTPException, Request, Response, Depends, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, HttpUrl, field_validator, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from arq.constants import abort_jobs_ss
+from arq.jobs import Job as ArqJob, JobStatus as ArqJobStatus
+from app.core.config import settings
+from app.services.blobstore import is_blob_ref, stream_blob
+from app.services.job_events import wait_for_terminal_status
+from app.services.job_store import (
+    JOB_TTL,
+    TERMINAL_STATUSES,
+    batch_key,
+    write_job_record,
+    read_job_record,
+    read_job_records,
+    read_job_fields,
+    read_job_status,
+    update_job_fields,
+)
+from app.services.job_lookup import find_job, find_job_status, owned_by
+from app.services.admission import LOW_PRIORITY, NORMAL, REJECTED, Admission, push_low_priority
+from app.services.fair_queue import TenantShare, push_jobs, release_job, tenant_share, try_dispatch
+from datetime import datetime
+import asyncio
+import time
 import uuid
 import json
 import ipaddress
@@ -29,6 +52,9 @@ class ScrapeRequest(BaseModel):
             
             if not hostname:
                 raise ValueError('Invalid URL: no hostname')
+
+            if settings.ALLOW_PRIVATE_URLS:
+                return v
             
             # Try to resolve to IP and check if it's private
             try:
@@ -57,11 +83,87 @@ class JobResponse(BaseModel):
     job_id: str
     status: str
 
+class CreateJobResponse(JobResponse):
+    priority: str # normal, or low when admitted to the low-priority lane
+    estimated_wait_seconds: Optional[float] = None # Expected time in the queue; None until measured
+
+class BatchRequest(BaseModel):
+    jobs: List[ScrapeRequest] = Field(..., min_length=1, max_length=1000)
+
+class BatchResponse(BaseModel):
+    batch_id: str
+    job_ids: List[str]
+    status: str
+    priority: str
+    estimated_wait_seconds: Optional[float] = None
+
+async def submit_job(
+    redis,
+    request: ScrapeRequest,
+    user_id: str,
+    batch_id: Optional[str] = None,
+    api_key_id: Optional[str] = None,
+    plan: Optional[str] = None,
+    lane: str = NORMAL,
+    share: Optional[TenantShare] = None
+) -> str:
+    """
+    Create the job's Redis record and queue it behind the user's other
+    jobs (or park it in the low-priority lane), returning the new job_id.
+    Call try_dispatch() afterwards to hand it to the workers right away.
+    """
+    job_id = str(uuid.uuid4())
+
+    # Set initial status in Redis before enqueueing, so a fast worker's
+    # result can't be overwritten by the pending record
+    await write_job_record(redis, job_id, {
+        "status": "pending",
+        "url": request.url,
+        "mode": request.mode,
+        "user_id": user_id,
+        "batch_id": batch_id,
+        "plan": plan,
+        "priority": lane,
+        "created_at": datetime.utcnow().isoformat()
+    })
+
+    # Enqueue job to Arq
+    from app.core.logging import logger
+    logger.info(f"Enqueueing job {job_id} for URL {request.url} in {request.mode} mode")
+
+    job_kwargs = dict(
+        job_id=job_id,
+        url=request.url,
+        mode=request.mode,
+        selectors=request.selectors,
+        instruction=request.instruction,
+        options=request.options,
+        user_id=user_id, # Pass user_id for webhooks
+        batch_id=batch_id,
+        api_key_id=api_key_id, # Usage is metered per API key
+        plan=plan, # Sets how long the job is kept
+        submitted_at=time.time() # Queue wait counts from here, low-priority lane included
+    )
+    share = share or tenant_share(plan)
+    try:
+        if lane == LOW_PRIORITY:
+            # A worker queues it once the queue has drained
+            await push_low_priority(redis, user_id, job_kwargs, share)
+        else:
+            # Dispatched into arq by the fair scheduler (see fair_queue.py)
+            await push_jobs(redis, user_id, [job_kwargs], share)
+        logger.info(f"Job {job_id} enqueued successfully")
+    except Exception as e:
+        logger.error(f"Failed to enqueue job {job_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to queue job: {str(e)}")
+
+    return job_id
+
 from app.api.deps import get_current_user
 
 @router.post(
     "/", 
-    response_model=JobResponse,
+    response_model=CreateJobResponse,
     summary="Create a scraping job",
     description="Submit a URL to be scraped. The job will be processed asynchronously. Use the job_id to check status and retrieve results.",
     response_description="Job created successfully with unique job_id"
@@ -78,64 +180,278 @@ async def create_scrape_job(
     - **mode**: 'guided' (CSS selectors) or 'smart' (AI extraction)
     - **selectors**: CSS selectors for guided mode (optional)
     - **instruction**: Natural language instruction for smart mode (optional)
-    - **options**: Additional options like renderJs for dynamic content (optional)
+    - **options**: Additional options like renderJs for dynamic content, or snapshot to keep the page HTML (optional)
     
-    Returns a job_id to track the scraping progress.
+    Returns a job_id to track the scraping progress, and the estimated time
+    it will wait in the queue. Under heavy load the job may be accepted at
+    low priority, or refused with 503 and a `Retry-After` header.
     """
-    job_id = str(uuid.uuid4())
-    
-    # Enqueue job to Arq
-    from app.core.logging import logger
-    logger.info(f"Enqueueing job {job_id} for URL {request.url} in {request.mode} mode")
-    
-    try:
-        await req.app.state.redis.enqueue_job(
-            "scrape_task",
-            job_id=job_id,
-            url=request.url,
-            mode=request.mode,
-            selectors=request.selectors,
-            instruction=request.instruction,
-            options=request.options,
-            user_id=current_user["sub"] # Pass user_id for webhooks
+    admission = admit_jobs(req, current_user, 1)
+    job_id = await submit_job(
+        req.app.state.redis, request, current_user["sub"],
+        api_key_id=current_user.get("api_key_id"), plan=current_user.get("plan"),
+        lane=admission.lane, share=user_share(current_user)
+    )
+    await try_dispatch(req.app.state.redis)
+    return {"job_id": job_id, "status": "pending", **admission_fields(admission)}
+
+def admit_jobs(req: Request, current_user: dict, jobs: int) -> Admission:
+    """Admission decision for `jobs` new jobs, raising 503 when the queue is too far behind."""
+    monitor = getattr(req.app.state, "queue_monitor", None)
+    if monitor is None:
+        return Admission(NORMAL, None)
+    admission = monitor.admit(current_user.get("plan"), jobs)
+    if admission.lane == REJECTED:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Too many jobs queued (about {admission.estimated_wait:.0f}s of work); try again later",
+            headers={"Retry-After": str(admission.retry_after)}
         )
-        logger.info(f"Job {job_id} enqueued successfully")
-    except Exception as e:
-        logger.error(f"Failed to enqueue job {job_id}: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to queue job: {str(e)}")
-    
-    # Set initial status in Redis
-    await req.app.state.redis.set(f"job:{job_id}", json.dumps({
-        "status": "pending",
-        "url": request.url,
-        "mode": request.mode,
-        "created_at": "now"
-    }), ex=3600)
-    
-    return {"job_id": job_id, "status": "pending"}
+    return admission
+
+def user_share(current_user: dict) -> TenantShare:
+    """The user's share of the workers, from its API key's queue weight or its plan."""
+    return tenant_share(current_user.get("plan"), current_user.get("queue_weight"))
+
+def admission_fields(admission: Admission) -> Dict[str, Any]:
+    wait = admission.estimated_wait
+    return {
+        "priority": admission.lane,
+        "estimated_wait_seconds": round(wait, 1) if wait is not None else None
+    }
+
+@router.post(
+    "/batch",
+    response_model=BatchResponse,
+    summary="Create a batch of scraping jobs",
+    description="Submit up to 1000 scraping jobs at once. Watch them all with `GET /events/batches/{batch_id}`.",
+    response_description="Batch created with the job_id of every job"
+)
+async def create_scrape_batch(
+    request: BatchRequest,
+    req: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Create a batch of scraping jobs.
+
+    - **jobs**: List of job specs, each the same as the body of `POST /scrape`
+
+    The whole batch is admitted, moved to the low-priority lane or refused
+    (503) together, as for single jobs. Its jobs are run in turn with other
+    users' jobs, so a large batch doesn't hold up everyone else.
+    """
+    admission = admit_jobs(req, current_user, len(request.jobs))
+    redis = req.app.state.redis
+    user_id = current_user["sub"]
+    batch_id = str(uuid.uuid4())
+
+    await redis.hset(batch_key(batch_id), mapping={
+        "user_id": user_id,
+        "total": len(request.jobs),
+        "created_at": datetime.utcnow().isoformat()
+    })
+    await redis.expire(batch_key(batch_id), JOB_TTL)
+
+    api_key_id, plan, share = current_user.get("api_key_id"), current_user.get("plan"), user_share(current_user)
+    job_ids = [
+        await submit_job(redis, job, user_id, batch_id=batch_id, api_key_id=api_key_id, plan=plan, lane=admission.lane, share=share)
+        for job in request.jobs
+    ]
+    await try_dispatch(redis)
+
+    return {"batch_id": batch_id, "job_ids": job_ids, "status": "pending", **admission_fields(admission)}
 
 @router.get(
     "/{job_id}",
     summary="Get job status and results",
-    description="Retrieve the current status and results of a scraping job. Poll this endpoint until status is 'completed' or 'failed'.",
+    description="Retrieve the current status and results of a scraping job. Pass `wait` to block until the job finishes instead of polling.",
     response_description="Job status and data"
 )
 async def get_job_status(
     job_id: str, 
     req: Request,
+    wait: Optional[float] = Query(None, ge=0, le=settings.LONG_POLL_MAX_WAIT),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Get the status and results of a scraping job.
     
     - **job_id**: The unique identifier returned when creating the job
+    - **wait**: Long-poll: block up to this many seconds until the job finishes (optional)
     
-    Possible statuses: pending, processing, completed, failed
+    Possible statuses: pending, processing, completed, failed, cancelled
+    """
+    if wait:
+        # Only hold the request open for a job that exists and is the caller's
+        job_status = await find_job_status(req.app.state.redis, job_id, current_user["sub"])
+        if not job_status:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if job_status not in TERMINAL_STATUSES:
+            await wait_for_terminal_status(req.app.state.job_events, job_id, wait)
+
+    # Redis first, then the database once the Redis record has expired
+    job_data = await find_job(req.app.state.redis, job_id, current_user["sub"])
+    if not job_data:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if is_blob_ref(job_data.get("data")):
+        # Large result: stream it from the blob store into the "data" field
+        # instead of loading it into memory
+        return StreamingResponse(
+            _stream_with_blob_data(job_data),
+            media_type="application/json"
+        )
+    return job_data
+
+async def _stream_with_blob_data(job_data: Dict[str, Any]):
+    ref = job_data.pop("data")
+    head = json.dumps(job_data)
+    yield (head[:-1] + (', "data": ' if job_data else '"data": ')).encode()
+    async for chunk in stream_blob(ref):
+        yield chunk
+    yield b"}"
+
+@router.get(
+    "/{job_id}/status",
+    summary="Get job status only",
+    description="Cheap status check that reads only the status field of the job record, without its results.",
+    response_description="Job status"
+)
+async def get_job_status_only(
+    job_id: str,
+    req: Request,
+    wait: Optional[float] = Query(None, ge=0, le=settings.LONG_POLL_MAX_WAIT),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get just the status of a scraping job. Use this for polling, then fetch
+    `GET /scrape/{job_id}` once the job is completed.
+
+    - **wait**: Long-poll: block up to this many seconds until the job finishes (optional)
+    """
+    job_status = await find_job_status(req.app.state.redis, job_id, current_user["sub"])
+    if not job_status:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if wait and job_status not in TERMINAL_STATUSES:
+        job_status = await wait_for_terminal_status(req.app.state.job_events, job_id, wait) or job_status
+    return {"job_id": job_id, "status": job_status}
+
+@router.get(
+    "/{job_id}/snapshot",
+    summary="Get page snapshot",
+    description="Stream the HTML captured for a job submitted with `options.snapshot`.",
+    response_description="The page HTML"
+)
+async def get_job_snapshot(
+    job_id: str,
+    req: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Stream the HTML snapshot stored for a job.
+
+    - **job_id**: The unique identifier returned when creating the job
+    """
+    job_data = await read_job_record(req.app.state.redis, job_id)
+    if not job_data:
+        from app.core.database import read_session
+        from app.models.job import Job
+        from sqlalchemy import select
+
+        async with read_session() as session:
+            result = await session.execute(select(Job.snapshot, Job.user_id).where(Job.id == job_id))
+            row = result.first()
+        job_data = dict(row._mapping) if row else {}
+
+    snapshot = job_data.get("snapshot") if owned_by(job_data, current_user["sub"]) else None
+    if not is_blob_ref(snapshot):
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+
+    return StreamingResponse(stream_blob(snapshot), media_type=snapshot["content_type"])
+
+@router.delete(
+    "/{job_id}",
+    response_model=JobResponse,
+    summary="Cancel a job",
+    description="Cancel a queued or running scraping job. Running jobs are aborted and their browser and connections released.",
+    response_description="Job cancelled"
+)
+async def cancel_job(
+    job_id: str,
+    req: Request,
+    current_user: dict = Depends(get_current_user)
+):
     """
-    data = await req.app.state.redis.get(f"job:{job_id}")
-    if not data:
+    Cancel a scraping job.
+
+    - **job_id**: The unique identifier returned when creating the job
+
+    Jobs that already completed or failed cannot be cancelled (409).
+    """
+    redis = req.app.state.redis
+    job_data = await read_job_fields(redis, job_id, ["status", "user_id"])
+    if not job_data:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job_data.get("user_id") not in (None, current_user["sub"]):
         raise HTTPException(status_code=404, detail="Job not found")
-    return json.loads(data)
+    if job_data["status"] in TERMINAL_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job already {job_data['status']}")
+
+    arq_job = ArqJob(job_id, redis)
+    arq_status = await arq_job.status()
+    # A queued job is dropped as soon as a worker dequeues it, and one still
+    # in its user's queue or the low-priority lane isn't in arq yet (it is
+    # skipped when dispatched), so don't wait on either
+    waiting = arq_status in (ArqJobStatus.queued, ArqJobStatus.deferred, ArqJobStatus.not_found)
+    try:
+        aborted = await arq_job.abort(timeout=0 if waiting else settings.CANCEL_WAIT_TIMEOUT)
+    except asyncio.TimeoutError:
+        # Only a dequeue confirms the abort of a waiting job; a running one
+        # didn't stop in time and may still complete
+        aborted = False
+    except Exception:
+        # The job raised before the abort landed, i.e. it already finished
+        aborted = False
+
+    if not aborted and not waiting:
+        # Withdraw the abort so the job can't be stopped after we said it wasn't
+        await redis.zrem(abort_jobs_ss, job_id)
+        if arq_status == ArqJobStatus.complete:
+            raise HTTPException(status_code=409, detail="Job already finished")
+        raise HTTPException(status_code=409, detail="Job is still running and could not be cancelled")
+
+    # The worker may have finished the job while we waited; never overwrite
+    # a final status
+    status = await read_job_status(redis, job_id)
+    if status in TERMINAL_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job already {status}")
+
+    await update_job_fields(redis, job_id, status="cancelled")
+    # arq drops an aborted job without running it, so free its slot here
+    await release_job(redis, job_id)
+
+    from app.core.database import AsyncSessionLocal
+    from app.models.job import Job
+    from sqlalchemy import update
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(Job)
+            .where(Job.id == job_id)
+            .where(Job.status.notin_(TERMINAL_STATUSES))
+            .values(status="cancelled")
+        )
+        await session.commit()
+
+    from app.services.stats import record_job_stats
+    await record_job_stats(redis, current_user["sub"], "cancelled")
+
+    from app.core.logging import logger
+    logger.info(f"Job {job_id} cancelled by {current_user['sub']}")
+
+    return {"job_id": job_id, "status": "cancelled"}
 
 @router.post(
     "/{job_id}/save", 
@@ -154,54 +470,146 @@ async def save_job(
     
     - **job_id**: The unique identifier of the job to save
     
-    Jobs are initially stored in Redis cache (1 hour TTL). Use this endpoint to persist important results.
+    The worker already saves every job it runs, so this is rarely needed;
+    `GET /scrape/{job_id}` reads saved jobs once their cache entry expires.
+    To save many jobs, use `POST /scrape/save`.
     """
     # Get job from Redis
-    data = await req.app.state.redis.get(f"job:{job_id}")
-    if not data:
+    job_data = await read_job_record(req.app.state.redis, job_id)
+    if not job_data or not owned_by(job_data, current_user["sub"]):
         raise HTTPException(status_code=404, detail="Job not found in cache")
     
-    job_data = json.loads(data)
-    
     # Save to DB
     from app.core.database import AsyncSessionLocal
     from app.models.job import Job
+    from sqlalchemy import select
     
     async with AsyncSessionLocal() as session:
         # Check if already exists
-        existing = await session.get(Job, job_id)
+        existing = (await session.execute(select(Job.user_id).where(Job.id == job_id))).first()
         if existing:
+            if not owned_by({"user_id": existing.user_id}, current_user["sub"]):
+                raise HTTPException(status_code=404, detail="Job not found in cache")
             return {"job_id": job_id, "status": "saved"}
             
-        db_job = Job(
-            id=job_id,
-            url=job_data["url"],
-            mode=job_data["mode"],
-            status=job_data["status"],
-            data=job_data.get("data")
-        )
-        session.add(db_job)
+        session.add(await _job_from_record(job_id, job_data, current_user, session.bind))
         await session.commit()
         
     return {"job_id": job_id, "status": "saved"}
 
-@router.get(
-    "/history/all",
-    summary="Get scraping history",
-    description="Retrieve all saved scraping jobs for the current user, ordered by creation date (newest first).",
-    response_description="List of all saved jobs"
+async def _job_from_record(job_id: str, job_data: Dict[str, Any], current_user: dict, bind=None):
+    """A Job row for a Redis job record."""
+    from app.core.plans import resolve_plan
+    from app.models.job import Job
+    from app.services.blobstore import load_result
+    from app.services.search import search_vector
+
+    return Job(
+        id=job_id,
+        plan=resolve_plan(job_data.get("plan") or current_user.get("plan")),
+        url=job_data["url"],
+        mode=job_data["mode"],
+        status=job_data["status"],
+        user_id=job_data.get("user_id") or current_user["sub"],
+        data=job_data.get("data"),
+        search_vector=search_vector(await load_result(job_data.get("data")), bind),
+        timings=job_data.get("timings")
+    )
+
+class SaveJobsRequest(BaseModel):
+    job_ids: List[str] = Field(..., min_length=1, max_length=100)
+
+@router.post(
+    "/save",
+    summary="Save jobs to database",
+    description="Persist up to 100 jobs from the Redis cache in one call. Jobs the worker already saved are reported, not written again.",
+    response_description="Which jobs were saved, already saved, or not found"
 )
-async def get_history(current_user: dict = Depends(get_current_user)):
+async def save_jobs(
+    request: SaveJobsRequest,
+    req: Request,
+    current_user: dict = Depends(get_current_user)
+):
     """
-    Get all saved scraping jobs for the authenticated user.
-    
-    Returns jobs stored in the database (not cached jobs). Only returns jobs that were explicitly saved.
+    Save several of your jobs at once, in one database transaction.
+
+    - **job_ids**: Up to 100 job ids
+
+    Jobs of other users are reported as not found.
     """
     from app.core.database import AsyncSessionLocal
     from app.models.job import Job
     from sqlalchemy import select
-    
+
+    job_ids = list(dict.fromkeys(request.job_ids))
+    user_id = current_user["sub"]
+    saved, not_found = [], []
+
     async with AsyncSessionLocal() as session:
-        result = await session.execute(select(Job).order_by(Job.created_at.desc()))
-        jobs = result.scalars().all()
-        return jobs
+        result = await session.execute(select(Job.id, Job.user_id).where(Job.id.in_(job_ids)))
+        in_db = {job_id: owner for job_id, owner in result}
+        already_saved = {job_id for job_id, owner in in_db.items() if owner in (None, user_id)}
+        records = await read_job_records(req.app.state.redis, [j for j in job_ids if j not in in_db])
+        for job_id in job_ids:
+            if job_id in already_saved:
+                continue
+            job_data = records.get(job_id)
+            # Another user's job, saved or not, doesn't exist as far as the caller knows
+            if job_id in in_db or not job_data or job_data.get("user_id", user_id) != user_id:
+                not_found.append(job_id)
+                continue
+            session.add(await _job_from_record(job_id, job_data, current_user, session.bind))
+            saved.append(job_id)
+        await session.commit()
+
+    return {
+        "saved": saved,
+        "already_saved": [j for j in job_ids if j in already_saved],
+        "not_found": not_found
+    }
+
+@router.get(
+    "/history/all",
+    summary="Get scraping history",
+    description="List the current user's saved jobs, newest first, a page at a time. The cursor for the next page is in the `X-Next-Cursor` response header.",
+    response_description="One page of saved jobs"
+)
+async def get_history(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    status: Optional[str] = Query(None, description="Only jobs with this status"),
+    mode: Optional[str] = Query(None, description="Only guided or smart jobs"),
+    url_prefix: Optional[str] = Query(None, max_length=2048, description="Only jobs whose URL starts with this"),
+    include_data: bool = Query(False, description="Include each job's data, snapshot and timings"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get the authenticated user's saved scraping jobs.
+
+    - **limit**: Jobs per page (default 50, max 200)
+    - **cursor**: Pass the previous page's `X-Next-Cursor` header to get the next page
+    - **status** / **mode** / **url_prefix**: Filters (optional)
+    - **include_data**: Also return results, which can be large (default false)
+
+    Returns jobs stored in the database (not cached jobs). The `X-Next-Cursor`
+    header is absent on the last page.
+    """
+    from app.core.database import read_session
+    from app.services.job_queries import InvalidCursor, history_page, history_query
+
+    try:
+        query = history_query(
+            current_user["sub"], limit, cursor, include_data,
+            status=status, mode=mode, url_prefix=url_prefix
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async with read_session() as session:
+        result = await session.execute(query)
+        jobs, next_cursor = history_page(result.all(), limit)
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return jobs
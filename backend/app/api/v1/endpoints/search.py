@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from typing import Optional
+from app.api.deps import get_current_user
+from app.core.config import settings
+from app.core.database import read_session
+from app.services.job_queries import InvalidCursor, history_page
+from app.services.search import InvalidSearch, search_query, search_supported
+
+router = APIRouter()
+
+QUERY_CANCELED = "57014" # Postgres SQLSTATE for statement_timeout
+# SQLSTATEs a bad query from the user can raise: jsonpath syntax errors, and
+# data exceptions (class 22) such as a jsonpath that fails on a result
+SYNTAX_ERROR = "42601"
+DATA_EXCEPTION_CLASS = "22"
+
+@router.get(
+    "/jobs",
+    summary="Search job results",
+    description="Find saved jobs by the text of their results, a jsonpath predicate or a JSON object their results contain. Paged like history, with `X-Next-Cursor`.",
+    response_description="One page of matching jobs, newest first"
+)
+async def search_jobs(
+    response: Response,
+    q: Optional[str] = Query(None, max_length=500, description='Full-text query, e.g. `"free shipping" -refurbished`'),
+    jsonpath: Optional[str] = Query(None, max_length=2000, description="jsonpath predicate on the result, e.g. `$.price < 20`"),
+    contains: Optional[str] = Query(None, max_length=2000, description='JSON object the result contains, e.g. `{"in_stock": true}`'),
+    status: Optional[str] = Query(None, description="Only jobs with this status"),
+    mode: Optional[str] = Query(None, description="Only guided or smart jobs"),
+    url_prefix: Optional[str] = Query(None, max_length=2048, description="Only jobs whose URL starts with this"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    include_data: bool = Query(False, description="Include each job's data, snapshot and timings"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Search the authenticated user's saved jobs. All given conditions must match.
+
+    - **q**: Words in the result's text values, with web search syntax (quotes, `or`, `-`)
+    - **jsonpath**: A Postgres jsonpath predicate such as `$.price < 20` or `$.tags[*] == "sale"`
+    - **contains**: A JSON object, matched by containment (`{"brand": "Acme"}`)
+    - **status** / **mode** / **url_prefix**: Filters, as in history
+
+    Runs entirely in the database on indexed columns. Results kept in the
+    blob store (very large ones) match `q` but not `jsonpath` or `contains`.
+    """
+    if not (q or jsonpath or contains):
+        raise HTTPException(status_code=400, detail="Give at least one of q, jsonpath or contains")
+    if not search_supported():
+        raise HTTPException(status_code=501, detail="Search requires a PostgreSQL database")
+
+    try:
+        query = search_query(
+            current_user["sub"], limit, cursor, include_data,
+            q=q, jsonpath=jsonpath, contains=contains,
+            status=status, mode=mode, url_prefix=url_prefix
+        )
+    except (InvalidCursor, InvalidSearch) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async with read_session() as session:
+        await session.execute(text(f"SET LOCAL statement_timeout = {int(settings.SEARCH_STATEMENT_TIMEOUT_MS)}"))
+        try:
+            result = await session.execute(query)
+        except DBAPIError as e:
+            sqlstate = getattr(e.orig, "sqlstate", None) or ""
+            if sqlstate == QUERY_CANCELED:
+                raise HTTPException(status_code=504, detail="Search took too long; narrow it down")
+            if sqlstate == SYNTAX_ERROR or sqlstate.startswith(DATA_EXCEPTION_CLASS):
+                raise HTTPException(status_code=400, detail="Invalid search (check the jsonpath syntax)")
+            raise # Not the query's fault: a 500
+        jobs, next_cursor = history_page(result.all(), limit)
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return jobs
@@ -1,37 +1,32 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from app.core.database import AsyncSessionLocal
-from app.models.job import Job
+from fastapi import APIRouter, Depends, Query, Request
+from app.services.stats import read_stats, user_scope
 
 router = APIRouter()
 
-async def get_db():
-    async with AsyncSessionLocal() as session:
-        yield session
-
 from app.api.deps import get_current_user
 
 @router.get("/")
 async def get_stats(
-    db: AsyncSession = Depends(get_db),
+    req: Request,
+    granularity: str = Query("day", pattern="^(hour|day)$", description="Bucket size of the time series"),
+    buckets: int = Query(30, ge=1, le=366, description="Number of buckets, ending with the current one"),
+    scope: str = Query("user", pattern="^(user|global)$", description="Your jobs, or all jobs"),
     current_user: dict = Depends(get_current_user)
 ):
-    # Total jobs
-    result = await db.execute(select(func.count(Job.id)))
-    total_jobs = result.scalar() or 0
-    
-    # Completed jobs (Pages Scraped)
-    result = await db.execute(select(func.count(Job.id)).where(Job.status == "completed"))
-    completed_jobs = result.scalar() or 0
-    
-    # Success Rate
-    success_rate = 0.0
-    if total_jobs > 0:
-        success_rate = (completed_jobs / total_jobs) * 100
-        
+    """
+    Job counts, success rate, mean job duration and bytes downloaded, overall
+    and as a time series for charts.
+
+    Read from counters kept up to date as jobs finish, so the cost doesn't grow with the number of jobs.
+    """
+    stats = await read_stats(
+        req.app.state.redis,
+        "global" if scope == "global" else user_scope(current_user["sub"]),
+        granularity,
+        buckets
+    )
     return {
-        "total_jobs": total_jobs,
-        "pages_scraped": completed_jobs,
-        "success_rate": round(success_rate, 1)
+        "total_jobs": stats["jobs"],
+        "pages_scraped": stats["completed"],
+        **stats
     }
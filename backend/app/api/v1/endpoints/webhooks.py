@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.core.database import AsyncSessionLocal
 from app.models.webhook import Webhook
 from app.api.deps import get_current_user
+from app.services.webhooks import invalidate_webhook_subscriptions
 from pydantic import BaseModel, HttpUrl
 from typing import List
 import secrets
@@ -29,6 +30,7 @@ async def get_db():
 @router.post("/", response_model=WebhookResponse)
 async def create_webhook(
     data: WebhookCreate,
+    req: Request,
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
@@ -47,6 +49,7 @@ async def create_webhook(
     
     db.add(webhook)
     await db.commit()
+    await invalidate_webhook_subscriptions(req.app.state.redis, user_id)
     
     return {
         "id": webhook.id,
@@ -83,6 +86,7 @@ async def list_webhooks(
 @router.delete("/{webhook_id}")
 async def delete_webhook(
     webhook_id: str,
+    req: Request,
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
@@ -99,5 +103,6 @@ async def delete_webhook(
         
     await db.delete(webhook)
     await db.commit()
+    await invalidate_webhook_subscriptions(req.app.state.redis, user_id)
     
     return {"status": "deleted"}
@@ -0,0 +1,89 @@
+import asyncio
+import inspect
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+from redis.asyncio import Redis
+from app.core.logging import logger
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    Small in-process LRU cache with per-entry expiry.
+
+    Not thread-safe; meant to be used from a single event loop.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+async def listen_for_invalidations(
+    redis: Redis,
+    channel: str,
+    on_message: Callable[[str], Any],
+    on_reconnect: Optional[Callable[[], Any]] = None,
+    retry_delay: float = 1.0,
+) -> None:
+    """
+    Subscribe to an invalidation channel and call `on_message` with each decoded payload.
+
+    Runs until cancelled. If the subscription drops, messages may have been missed,
+    so `on_reconnect` is called (typically to clear the whole cache) before resubscribing.
+    """
+    while True:
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            if on_reconnect:
+                on_reconnect()
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                data = message["data"]
+                if isinstance(data, bytes):
+                    data = data.decode()
+                result = on_message(data)
+                if inspect.isawaitable(result):
+                    await result
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Invalidation listener on {channel} dropped: {e}")
+            await asyncio.sleep(retry_delay)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
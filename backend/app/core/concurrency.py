@@ -0,0 +1,164 @@
+import asyncio
+import math
+from typing import Dict, List, Optional, Tuple
+import psutil
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.metrics import CONCURRENCY_DECISIONS, CONCURRENCY_LIMIT, EVENT_LOOP_LAG, WORKER_RSS
+
+# Adaptive concurrency for scrape jobs, per worker process. Plain HTTP jobs
+# are I/O-bound and can run by the dozen; Chromium renders eat memory and
+# CPU. Each job class gets its own limit, tuned by AIMD (additive increase,
+# multiplicative decrease): it grows by one each interval while every slot
+# is busy and nothing looks strained, and is cut by ADAPTIVE_DECREASE_FACTOR
+# as soon as something does.
+STATIC, DYNAMIC = "static", "dynamic"
+JOB_CLASSES = (STATIC, DYNAMIC)
+LAG_PROBE_INTERVAL = 0.1 # Seconds between event loop lag samples
+
+INCREASE, DECREASE, HOLD = "increase", "decrease", "hold"
+
+def job_class(options: Optional[dict]) -> str:
+    return DYNAMIC if options and options.get("renderJs") else STATIC
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(math.ceil(q * len(ordered)) - 1, len(ordered) - 1)]
+
+class ClassLimiter:
+    """Slots for one job class, plus what its jobs did since the last adjustment."""
+    def __init__(self, name: str, initial: int, minimum: int, maximum: int):
+        self.name = name
+        self.minimum, self.maximum = max(minimum, 1), max(maximum, minimum, 1)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.active = 0
+        self._cond = asyncio.Condition()
+        self.reset_window()
+        CONCURRENCY_LIMIT.labels(name).set(self.slots)
+
+    @property
+    def slots(self) -> int:
+        return int(self.limit)
+
+    def reset_window(self) -> None:
+        self.durations: List[float] = []
+        self.failures = 0
+        self.saturated = self.active >= self.slots
+
+    async def acquire(self, timeout: Optional[float] = None, force: bool = False) -> bool:
+        """
+        Take a slot, waiting up to `timeout` seconds (None waits as long as
+        it takes). With `force`, take one anyway once the wait is up.
+        """
+        async with self._cond:
+            if self.active >= self.slots:
+                self.saturated = True
+                try:
+                    await asyncio.wait_for(self._cond.wait_for(lambda: self.active < self.slots), timeout)
+                except asyncio.TimeoutError:
+                    if not force:
+                        return False
+            self.active += 1
+            if self.active >= self.slots:
+                self.saturated = True
+            return True
+
+    async def release(self, duration: Optional[float] = None, failed: bool = False) -> None:
+        """Give the slot back, recording the job's run time (None if it didn't finish)."""
+        async with self._cond:
+            self.active -= 1
+            if duration is not None:
+                self.durations.append(duration)
+                self.failures += failed
+            self._cond.notify()
+
+    async def set_limit(self, limit: float) -> None:
+        async with self._cond:
+            self.limit = min(max(limit, self.minimum), self.maximum)
+            self._cond.notify_all()
+        CONCURRENCY_LIMIT.labels(self.name).set(self.slots)
+
+def decide(limiter: ClassLimiter, loop_lag: float, rss_mb: Optional[float]) -> Tuple[str, str]:
+    """The AIMD step for a class from its last interval: (action, reason)."""
+    busy = limiter.active > 0 or limiter.durations
+    if busy and settings.ADAPTIVE_MAX_RSS_MB and rss_mb is not None and rss_mb > settings.ADAPTIVE_MAX_RSS_MB:
+        return DECREASE, "memory"
+    if busy and loop_lag > settings.ADAPTIVE_MAX_LOOP_LAG:
+        return DECREASE, "loop_lag"
+    if len(limiter.durations) >= settings.ADAPTIVE_MIN_SAMPLES:
+        if limiter.failures / len(limiter.durations) > settings.ADAPTIVE_MAX_ERROR_RATE:
+            return DECREASE, "errors"
+        target = settings.ADAPTIVE_TARGET_LATENCY.get(limiter.name, math.inf)
+        if percentile(limiter.durations, 0.9) > target:
+            return DECREASE, "latency"
+    if limiter.saturated and limiter.limit < limiter.maximum:
+        return INCREASE, "demand"
+    return HOLD, "steady"
+
+def worker_rss() -> Optional[int]:
+    """Resident bytes of this process and its children (the browsers). None if unreadable."""
+    try:
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass # Exited in the meantime
+        return total
+    except psutil.Error:
+        return None
+
+class ConcurrencyController:
+    """The worker's per-class limiters, adjusted every ADAPTIVE_CONCURRENCY_INTERVAL by run()."""
+    def __init__(self):
+        self.limiters: Dict[str, ClassLimiter] = {
+            name: ClassLimiter(
+                name,
+                settings.ADAPTIVE_INITIAL_CONCURRENCY.get(name, 1),
+                settings.ADAPTIVE_MIN_CONCURRENCY.get(name, 1),
+                settings.ADAPTIVE_MAX_CONCURRENCY.get(name, 1),
+            )
+            for name in JOB_CLASSES
+        }
+
+    def limiter(self, name: str) -> ClassLimiter:
+        return self.limiters[name]
+
+    async def adjust(self, loop_lag: float, rss: Optional[int]) -> Dict[str, Tuple[str, str]]:
+        """Apply one AIMD step to every class and start a new window."""
+        EVENT_LOOP_LAG.set(loop_lag)
+        if rss is not None:
+            WORKER_RSS.set(rss)
+        rss_mb = rss / (1024 * 1024) if rss is not None else None
+
+        decisions = {}
+        for name, limiter in self.limiters.items():
+            action, reason = decide(limiter, loop_lag, rss_mb)
+            if action == DECREASE and limiter.limit <= limiter.minimum:
+                action = HOLD
+            if action == INCREASE:
+                await limiter.set_limit(limiter.limit + 1)
+            elif action == DECREASE:
+                await limiter.set_limit(limiter.limit * settings.ADAPTIVE_DECREASE_FACTOR)
+            if action != HOLD:
+                logger.info(f"Concurrency for {name} jobs: {action} to {limiter.slots} ({reason})")
+            CONCURRENCY_DECISIONS.labels(name, action, reason).inc()
+            limiter.reset_window()
+            decisions[name] = (action, reason)
+        return decisions
+
+    async def run(self, interval: Optional[float] = None) -> None:
+        """Worker background task: sample event loop lag continuously and adjust every interval."""
+        interval = interval or settings.ADAPTIVE_CONCURRENCY_INTERVAL
+        loop = asyncio.get_running_loop()
+        while True:
+            lag, window_end = 0.0, loop.time() + interval
+            while loop.time() < window_end:
+                before = loop.time()
+                await asyncio.sleep(LAG_PROBE_INTERVAL)
+                lag = max(lag, loop.time() - before - LAG_PROBE_INTERVAL)
+            try:
+                await self.adjust(lag, worker_rss())
+            except Exception as e:
+                logger.warning(f"Failed to adjust concurrency: {e}")
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "scraPy API"
@@ -11,6 +11,22 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = "advait"
     POSTGRES_DB: str = "scrapeflow"
     DATABASE_URL: Optional[str] = None  # Railway will set this automatically
+    # Optional read replica for read-only endpoints (history, stats, export,
+    # search, job lookups); they use the primary while it is unreachable
+    DATABASE_REPLICA_URL: Optional[str] = None
+
+    # Connection pool, per process and per engine (primary and replica).
+    # Statement caches: set both to 0 behind PgBouncer in transaction mode,
+    # which can't keep prepared statements across transactions
+    DB_ECHO: bool = False # Log every SQL statement
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0 # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800 # Seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100 # asyncpg's per-connection prepared statement cache
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100 # SQLAlchemy's, on top of asyncpg
+    DB_REPLICA_RETRY_SECONDS: float = 30.0 # How long to stay on the primary after a replica failure
 
     # Redis - will use Railway's REDIS_URL in production, local redis in dev
     REDIS_HOST: str = "localhost"
@@ -19,9 +35,150 @@ class Settings(BaseSettings):
     
     # LLM
     GEMINI_API_KEY: Optional[str] = None
+    LLM_BACKEND: str = "gemini"  # gemini, fake (offline stand-in for benchmarks)
+    FAKE_LLM_LATENCY: float = 1.0  # Seconds the fake backend takes per call
 
     # Auth
     CLERK_ISSUER_URL: Optional[str] = None
+    API_KEY_CACHE_TTL: float = 30.0  # In-process cache of API key lookups (revocations are pushed over pub/sub)
+    API_KEY_REDIS_TTL: int = 300  # Shared Redis copy
+    JWKS_CACHE_TTL: float = 3600.0  # Clerk signing keys are refreshed in the background after this
+    JWKS_FETCH_TIMEOUT: float = 5.0
+    JWT_CLAIMS_CACHE_SIZE: int = 10000  # Verified tokens remembered until they expire
+
+    # API key rate limits, per key. ApiKey.rate_limit is the per-minute limit;
+    # these are the defaults for keys without their own per-second/per-day value (0 disables)
+    RATE_LIMIT_PER_SECOND: int = 10
+    RATE_LIMIT_PER_DAY: int = 10000
+    RATE_LIMIT_LOCAL_PRECHECK: bool = True  # Refuse keys Redis already rejected without a round trip
+    RATE_LIMIT_LOCAL_BLOCK_SIZE: int = 10000
+
+    # Usage metering: API processes buffer request counts this long before
+    # writing them to Redis; the flush_usage cron moves this many keys per batch to Postgres
+    USAGE_BUFFER_INTERVAL: float = 1.0
+    USAGE_FLUSH_BATCH: int = 1000
+
+    # Stats rollups: how long the hourly and daily buckets stay in Redis
+    # (older ranges are read from the stats_rollups table)
+    STATS_HOURLY_RETENTION_DAYS: int = 8
+    STATS_DAILY_RETENTION_DAYS: int = 400
+
+    # Bulk exports: rows fetched from the database cursor per chunk
+    EXPORT_BATCH_SIZE: int = 500
+
+    # Plans. An API key's plan (or the "plan" claim of a Clerk token) picks
+    # how long its jobs are kept; unknown or missing plans get DEFAULT_PLAN.
+    # Plan names must be lowercase identifiers, they become partition names.
+    DEFAULT_PLAN: str = "free"
+    PLAN_RETENTION_DAYS: Dict[str, int] = {"free": 30, "pro": 365, "enterprise": 1095}
+
+    # Jobs table partitions: monthly partitions are created this many months
+    # ahead, and expired ones are dropped, or only detached (kept as
+    # standalone tables for archiving) when JOB_PARTITION_DETACH_ONLY is set
+    JOB_PARTITION_PREMAKE_MONTHS: int = 2
+    JOB_PARTITION_DETACH_ONLY: bool = False
+
+    # Admission control. The API estimates the queue wait as queue depth over
+    # recent worker throughput (refreshed every ADMISSION_REFRESH_SECONDS).
+    # Per plan, a job expected to wait up to ADMISSION_MAX_WAIT seconds is
+    # queued normally, up to ADMISSION_LOW_PRIORITY_MAX_WAIT it goes to the
+    # low-priority lane, and beyond that it is refused with a 503. Below
+    # ADMISSION_MIN_DEPTH queued jobs everything is admitted.
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_REFRESH_SECONDS: float = 2.0
+    ADMISSION_MIN_DEPTH: int = 100
+    ADMISSION_MIN_THROUGHPUT: float = 1.0 # Jobs/s assumed while workers haven't finished any
+    ADMISSION_MAX_WAIT: Dict[str, float] = {"free": 120, "pro": 600, "enterprise": 1800}
+    ADMISSION_LOW_PRIORITY_MAX_WAIT: Dict[str, float] = {"free": 900, "pro": 3600, "enterprise": 7200}
+    # Workers move low-priority jobs into the queue while it holds fewer than this
+    LOW_PRIORITY_PROMOTE_BELOW: int = 50
+    LOW_PRIORITY_PROMOTE_INTERVAL: float = 1.0
+
+    # Fair scheduling. Scrape jobs wait in per-user queues in Redis and are
+    # moved into the arq queue by deficit round robin while it holds fewer
+    # than FAIR_QUEUE_DISPATCH_BELOW jobs (keep this above the jobs all
+    # workers together can run at once, or they idle). Each turn a user
+    # dispatches as many jobs as its weight (ApiKey.queue_weight, else the
+    # plan's), and at most FAIR_QUEUE_MAX_IN_FLIGHT of its jobs are queued in
+    # arq or running.
+    FAIR_QUEUE_WEIGHTS: Dict[str, int] = {"free": 1, "pro": 4, "enterprise": 10}
+    FAIR_QUEUE_MAX_IN_FLIGHT: Dict[str, int] = {"free": 5, "pro": 20, "enterprise": 50}
+    FAIR_QUEUE_DISPATCH_BELOW: int = 50
+    FAIR_QUEUE_DISPATCH_INTERVAL: float = 1.0
+    FAIR_QUEUE_IN_FLIGHT_TTL: float = 900.0 # A dispatched job's slot is freed after this even if no worker reports it done
+
+    # Result search (Postgres only): the text search configuration used for
+    # the full-text index, how much of a result's text is indexed, and how
+    # long one search query may run
+    SEARCH_TEXT_CONFIG: str = "simple"
+    SEARCH_TEXT_MAX_CHARS: int = 100_000
+    SEARCH_STATEMENT_TIMEOUT_MS: int = 5000
+
+    # Let jobs target localhost/private IPs. Only for local fixture servers
+    # (benchmarks); never enable in production, it turns off SSRF protection.
+    ALLOW_PRIVATE_URLS: bool = False
+
+    # Job deadlines (seconds). JOB_TIMEOUT bounds the whole scrape_task run,
+    # the per-phase values bound each step so a hung page or LLM call fails fast.
+    JOB_TIMEOUT: float = 300.0
+    FETCH_TIMEOUT: float = 30.0
+    RENDER_TIMEOUT: float = 60.0
+    LLM_TIMEOUT: float = 60.0
+    PERSIST_TIMEOUT: float = 10.0
+    CANCEL_WAIT_TIMEOUT: float = 5.0  # How long DELETE /scrape/{id} waits for a running job to stop
+    LONG_POLL_MAX_WAIT: float = 60.0  # Upper bound for GET /scrape/{id}?wait=
+
+    # Job records in Redis: records reloaded from Postgres after expiring
+    # live JOB_CACHE_COLD_TTL seconds; each read doubles a record's TTL from
+    # that base, up to JOB_CACHE_MAX_TTL
+    JOB_CACHE_COLD_TTL: int = 600
+    JOB_CACHE_MAX_TTL: int = 86400
+
+    # Recurring scrapes: max schedules enqueued per scheduler tick
+    SCHEDULER_BATCH_SIZE: int = 500
+
+    # Blob storage for large job results and page snapshots
+    BLOB_STORE_BACKEND: str = "local"  # local, s3
+    BLOB_LOCAL_PATH: str = "./blobs"
+    BLOB_THRESHOLD_BYTES: int = 64 * 1024  # Results larger than this are stored as blobs
+    BLOB_ZSTD_LEVEL: int = 3
+    BLOB_S3_BUCKET: str = "scrapy-blobs"
+    BLOB_S3_PREFIX: str = "blobs/"
+    BLOB_S3_ENDPOINT_URL: Optional[str] = None  # e.g. http://localhost:9000 for MinIO
+    BLOB_S3_REGION: Optional[str] = None
+    BLOB_S3_ACCESS_KEY: Optional[str] = None
+    BLOB_S3_SECRET_KEY: Optional[str] = None
+
+    # Jobs each worker process runs concurrently. With adaptive concurrency
+    # on, a worker takes up to the sum of ADAPTIVE_MAX_CONCURRENCY jobs instead
+    WORKER_MAX_JOBS: int = 10
+
+    # Adaptive concurrency (AIMD). Each worker keeps a concurrency limit per
+    # job class: static (plain HTTP) and dynamic (rendered in Chromium).
+    # Every ADAPTIVE_CONCURRENCY_INTERVAL seconds a class's limit is
+    # multiplied by ADAPTIVE_DECREASE_FACTOR if its p90 job time is over
+    # ADAPTIVE_TARGET_LATENCY, more than ADAPTIVE_MAX_ERROR_RATE of its jobs
+    # failed, or the worker's event loop lag or memory (browsers included)
+    # is over its limit. Otherwise it grows by one while all its slots are
+    # in use. A job that gets no slot within ADAPTIVE_SLOT_WAIT seconds goes
+    # back to the queue for another worker, up to ADAPTIVE_MAX_DEFERRALS times.
+    ADAPTIVE_CONCURRENCY_ENABLED: bool = True
+    ADAPTIVE_CONCURRENCY_INTERVAL: float = 5.0
+    ADAPTIVE_INITIAL_CONCURRENCY: Dict[str, int] = {"static": 10, "dynamic": 3}
+    ADAPTIVE_MIN_CONCURRENCY: Dict[str, int] = {"static": 2, "dynamic": 1}
+    ADAPTIVE_MAX_CONCURRENCY: Dict[str, int] = {"static": 50, "dynamic": 8}
+    ADAPTIVE_TARGET_LATENCY: Dict[str, float] = {"static": 20.0, "dynamic": 60.0}
+    ADAPTIVE_MAX_ERROR_RATE: float = 0.3
+    ADAPTIVE_MIN_SAMPLES: int = 5 # Jobs a class must finish in an interval before its latency and errors count
+    ADAPTIVE_MAX_LOOP_LAG: float = 0.5
+    ADAPTIVE_MAX_RSS_MB: int = 3072 # 0 disables the memory check
+    ADAPTIVE_DECREASE_FACTOR: float = 0.7
+    ADAPTIVE_SLOT_WAIT: float = 10.0
+    ADAPTIVE_MAX_DEFERRALS: int = 5
+
+    # Metrics - the API serves /metrics; a worker exposes its own port (0 disables).
+    # Each worker process on a host needs a different port.
+    WORKER_METRICS_PORT: int = 0
 
     # CORS - frontend URL, defaults to localhost for dev
     FRONTEND_URL: str = "http://localhost:3000"
@@ -37,6 +194,12 @@ class Settings(BaseSettings):
             # Railway provides postgres:// but we need postgresql+asyncpg://
             return self.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://").replace("postgres://", "postgresql+asyncpg://")
         return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}/{self.POSTGRES_DB}"
+
+    @property
+    def async_replica_url(self) -> Optional[str]:
+        if self.DATABASE_REPLICA_URL:
+            return self.DATABASE_REPLICA_URL.replace("postgresql://", "postgresql+asyncpg://").replace("postgres://", "postgresql+asyncpg://")
+        return None
     
     @property
     def redis_connection_url(self) -> str:
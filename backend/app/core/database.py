@@ -1,18 +1,47 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
+from app.core.logging import logger
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """Pool and driver options for an engine; the pool settings only apply to Postgres."""
+    options: Dict[str, Any] = {"echo": settings.DB_ECHO, "future": True}
+    if make_url(url).get_backend_name() == "postgresql":
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            connect_args={
+                "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+                "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+            },
+        )
+    return options
+
+def create_engine(url: str) -> AsyncEngine:
+    return create_async_engine(url, **engine_options(url))
 
 # Create async engine using the smart property that handles both local and production
-engine = create_async_engine(
-    settings.async_database_url,
-    echo=True,
-    future=True,
-)
+engine = create_engine(settings.async_database_url)
 
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
+# Read-only queries may go to a replica, if one is configured
+replica_engine = create_engine(settings.async_replica_url) if settings.async_replica_url else None
+ReplicaSessionLocal = sessionmaker(
+    replica_engine, class_=AsyncSession, expire_on_commit=False
+) if replica_engine is not None else None
+_replica_down_until = 0.0
+
 Base = declarative_base()
 
 async def get_db():
@@ -21,3 +50,27 @@ async def get_db():
             yield session
         finally:
             await session.close()
+
+@asynccontextmanager
+async def read_session() -> AsyncIterator[AsyncSession]:
+    """
+    A session for read-only queries: on the replica when one is configured
+    and reachable, else on the primary. A replica that fails to connect is
+    skipped for DB_REPLICA_RETRY_SECONDS. Replicas lag a little, so don't
+    use this to read back something just written.
+    """
+    global _replica_down_until
+    if ReplicaSessionLocal is not None and time.monotonic() >= _replica_down_until:
+        session = ReplicaSessionLocal()
+        try:
+            await session.connection()
+        except (DBAPIError, OSError, TimeoutError) as e:
+            await session.close()
+            _replica_down_until = time.monotonic() + settings.DB_REPLICA_RETRY_SECONDS
+            logger.warning(f"Read replica unavailable, using the primary for {settings.DB_REPLICA_RETRY_SECONDS:g}s: {e}")
+        else:
+            async with session:
+                yield session
+            return
+    async with AsyncSessionLocal() as session:
+        yield session
@@ -57,3 +57,12 @@ class ScrapingException(ScrapyBaseException):
             status_code=502,
             details=details
         )
+
+class PhaseTimeoutException(ScrapyBaseException):
+    def __init__(self, phase: str, timeout: float):
+        super().__init__(
+            message=f"{phase} phase exceeded its {timeout:g}s deadline",
+            code="PHASE_TIMEOUT",
+            status_code=504,
+            details={"phase": phase, "timeout": timeout}
+        )
@@ -0,0 +1,71 @@
+import time
+from contextlib import contextmanager
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    start_http_server,
+)
+
+# Phases of a job: fetch (HTTP download), render (headless browser),
+# parse (HTML -> fields), llm (Gemini extraction), db (Postgres writes)
+PHASE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+PHASE_SECONDS = Histogram(
+    "scrapy_phase_seconds", "Time spent in each phase of a job", ["phase"], buckets=PHASE_BUCKETS
+)
+JOB_SECONDS = Histogram(
+    "scrapy_job_seconds", "End-to-end scrape_task duration", ["mode", "status"], buckets=PHASE_BUCKETS
+)
+QUEUE_DEPTH = Gauge("scrapy_queue_depth", "Jobs waiting in the arq queue")
+FAIR_QUEUE_PENDING = Gauge("scrapy_fair_queue_pending", "Jobs waiting in per-user queues, not yet dispatched to arq")
+JOBS_IN_FLIGHT = Gauge("scrapy_jobs_in_flight", "Jobs currently running in this worker")
+BROWSERS_IN_USE = Gauge("scrapy_browsers_in_use", "Headless browser instances currently open")
+# Adaptive concurrency (app/core/concurrency.py), per worker
+CONCURRENCY_LIMIT = Gauge("scrapy_concurrency_limit", "Concurrent scrape jobs allowed per job class", ["job_class"])
+CONCURRENCY_DECISIONS = Counter(
+    "scrapy_concurrency_decisions_total", "Concurrency limit adjustments", ["job_class", "action", "reason"]
+)
+EVENT_LOOP_LAG = Gauge("scrapy_event_loop_lag_seconds", "Worst event loop delay over the last adjustment interval")
+WORKER_RSS = Gauge("scrapy_worker_rss_bytes", "Resident memory of the worker and its browser processes")
+CACHE_REQUESTS = Counter(
+    "scrapy_cache_requests_total", "Cache lookups; hit ratio = hit / (hit + miss)", ["cache", "result"]
+)
+RATE_LIMIT_REJECTIONS = Counter("scrapy_rate_limit_rejections_total", "Requests rejected by the rate limiter")
+ADMISSION_DECISIONS = Counter(
+    "scrapy_admission_decisions_total", "Job submissions by admission outcome", ["plan", "outcome"]
+)
+ESTIMATED_QUEUE_WAIT = Gauge("scrapy_estimated_queue_wait_seconds", "Queue depth divided by recent worker throughput")
+WEBHOOK_DELIVERY_SECONDS = Histogram(
+    "scrapy_webhook_delivery_seconds", "Webhook POST latency", ["outcome"], buckets=PHASE_BUCKETS
+)
+
+# Pre-bound children, so the hot path skips the label lookup
+_phase_histograms = {}
+
+def _phase(phase: str):
+    histogram = _phase_histograms.get(phase)
+    if histogram is None:
+        histogram = _phase_histograms[phase] = PHASE_SECONDS.labels(phase)
+    return histogram
+
+@contextmanager
+def observe_phase(phase: str):
+    """Record the duration of the enclosed block in scrapy_phase_seconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phase(phase).observe(time.perf_counter() - start)
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+def render_metrics() -> bytes:
+    return generate_latest()
+
+def start_metrics_server(port: int) -> None:
+    """Expose this process's metrics on their own HTTP port (used by the worker)."""
+    start_http_server(port)
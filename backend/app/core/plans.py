@@ -0,0 +1,9 @@
+from typing import Optional
+from app.core.config import settings
+
+def resolve_plan(plan: Optional[str]) -> str:
+    """The configured plan of that name, or DEFAULT_PLAN."""
+    return plan if plan in settings.PLAN_RETENTION_DAYS else settings.DEFAULT_PLAN
+
+def retention_days(plan: str) -> int:
+    return settings.PLAN_RETENTION_DAYS[resolve_plan(plan)]
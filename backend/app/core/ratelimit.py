@@ -1,36 +1,156 @@
+import math
 import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 from fastapi import HTTPException, status
 from redis.asyncio import Redis
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import RATE_LIMIT_REJECTIONS
+
+# GCRA (generic cell rate algorithm) over any number of limits in one call.
+# Each key holds a "theoretical arrival time" (TAT) in milliseconds of Redis
+# server time. A request is allowed only if every limit allows it, and only
+# then are the TATs advanced, so rejected requests don't use up quota.
+#
+# ARGV: interval_ms_1, period_ms_1, interval_ms_2, period_ms_2, ...
+# Returns: {allowed, retry_after_ms, remaining_1, reset_ms_1, remaining_2, reset_ms_2, ...}
+GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local allowed = 1
+local retry_after = 0
+local new_tats = {}
+local result = {0, 0}
+for i = 1, #KEYS do
+    local interval = tonumber(ARGV[2 * i - 1])
+    local period = tonumber(ARGV[2 * i])
+    local tat = tonumber(redis.call('GET', KEYS[i])) or now
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + interval
+    local allow_at = new_tat - period
+    if allow_at > now then
+        allowed = 0
+        retry_after = math.max(retry_after, allow_at - now)
+        result[2 * i + 1] = 0
+        result[2 * i + 2] = tat - now
+    else
+        result[2 * i + 1] = math.floor((period - (new_tat - now)) / interval)
+        result[2 * i + 2] = new_tat - now
+    end
+    new_tats[i] = new_tat
+end
+if allowed == 1 then
+    for i = 1, #KEYS do
+        redis.call('SET', KEYS[i], new_tats[i], 'PX', new_tats[i] - now)
+    end
+end
+result[1] = allowed
+result[2] = retry_after
+return result
+"""
+
+@dataclass(frozen=True)
+class Limit:
+    """`count` requests per `period` seconds, with bursts of up to `count`."""
+    count: int
+    period: int
+    name: str
+
+@dataclass
+class RateLimitResult:
+    """State of the most restrictive limit after a check, for response headers."""
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: float  # Seconds until the limit is fully replenished
+    retry_after: float = 0.0
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+def limits_for(per_second: Optional[int], per_minute: Optional[int], per_day: Optional[int]) -> List[Limit]:
+    """The limits to enforce; None or 0 means no limit for that window."""
+    windows = (("second", 1, per_second), ("minute", 60, per_minute), ("day", 86400, per_day))
+    return [Limit(count, period, name) for name, period, count in windows if count]
 
 class RateLimiter:
-    def __init__(self, redis: Redis):
+    """
+    Redis rate limiter enforcing several limits (e.g. per second, minute and
+    day) for a key in one atomic round trip.
+
+    Unlike a fixed window, GCRA spaces requests evenly, so a client can't get
+    twice its limit by bursting on both sides of a window edge.
+
+    With a local pre-check, a key Redis rejected is remembered in-process
+    until its Retry-After, and further requests are refused without a round
+    trip. That's exact: GCRA would reject them anyway, since rejected
+    requests don't change the stored state.
+    """
+    def __init__(self, redis: Redis, local_blocks: Optional[TTLCache] = None):
         self.redis = redis
+        self.local_blocks = local_blocks
+        self._script = redis.register_script(GCRA_SCRIPT)
 
-    async def check_limit(self, key: str, limit: int, window: int = 60):
-        """
-        Check if the limit has been reached for the given key.
-        key: Unique identifier (e.g. api_key_id)
-        limit: Max requests allowed
-        window: Time window in seconds (default 1 minute)
-        """
-        # Create a key for the current window
-        # Simple approach: key + current_minute timestamp
-        current_window = int(time.time() / window)
-        redis_key = f"ratelimit:{key}:{current_window}"
-        
-        # Increment counter
-        # pipeline to ensure atomicity of incr + expire
-        async with self.redis.pipeline() as pipe:
-            await pipe.incr(redis_key)
-            await pipe.expire(redis_key, window + 10) # Expire slightly after window
-            result = await pipe.execute()
-            
-        count = result[0]
-        
-        if count > limit:
+    async def check(self, key: str, limits: List[Limit]) -> Optional[RateLimitResult]:
+        """Check and count one request. Returns None if `limits` is empty."""
+        if not limits:
+            return None
+
+        if self.local_blocks is not None:
+            blocked = self.local_blocks.get(key)
+            if blocked is not None:
+                limit, reset_at, retry_at = blocked
+                now = time.monotonic()
+                return RateLimitResult(False, limit, 0, reset_at - now, retry_at - now)
+
+        keys = [f"ratelimit:{key}:{l.name}" for l in limits]
+        args = []
+        for l in limits:
+            period_ms = l.period * 1000
+            args += [max(period_ms // l.count, 1), period_ms]
+        raw = await self._script(keys=keys, args=args)
+
+        allowed, retry_after_ms = bool(raw[0]), raw[1]
+        per_limit: List[Tuple[Limit, int, int]] = [
+            (l, int(raw[2 + 2 * i]), int(raw[3 + 2 * i])) for i, l in enumerate(limits)
+        ]
+        # Report the limit closest to running out; on a tie, the longest window
+        limit, remaining, reset_ms = min(per_limit, key=lambda x: (x[1], -x[0].period))
+        result = RateLimitResult(allowed, limit.count, remaining, reset_ms / 1000, retry_after_ms / 1000)
+
+        if not allowed and self.local_blocks is not None:
+            now = time.monotonic()
+            self.local_blocks.set(key, (limit.count, now + result.reset, now + result.retry_after), ttl=result.retry_after)
+        return result
+
+    async def enforce(self, key: str, limits: List[Limit]) -> Optional[RateLimitResult]:
+        """Like check(), but raise a 429 carrying Retry-After when a limit is exceeded."""
+        result = await self.check(key, limits)
+        if result is not None and not result.allowed:
+            RATE_LIMIT_REJECTIONS.inc()
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Rate limit exceeded"
+                detail="Rate limit exceeded",
+                headers=result.headers()
             )
-        
-        return True
+        return result
+
+_limiter: Optional[RateLimiter] = None
+
+def get_rate_limiter(redis: Redis) -> RateLimiter:
+    """The process-wide limiter, sharing one local block list."""
+    global _limiter
+    if _limiter is None or _limiter.redis is not redis:
+        local_blocks = TTLCache(maxsize=settings.RATE_LIMIT_LOCAL_BLOCK_SIZE) if settings.RATE_LIMIT_LOCAL_PRECHECK else None
+        _limiter = RateLimiter(redis, local_blocks)
+    return _limiter
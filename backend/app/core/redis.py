@@ -1,4 +1,5 @@
 from arq import create_pool
+from redis.commands.core import AsyncScript
 from arq.connections import RedisSettings
 from app.core.config import settings
 from urllib.parse import urlparse
@@ -24,3 +25,11 @@ async def create_redis_pool():
         return await create_pool(
             RedisSettings(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
         )
+
+def lua_script(source: str) -> AsyncScript:
+    """
+    A Lua script to create once at module level. Its SHA is computed here,
+    and every call names the client: `await script(keys=..., args=..., client=redis)`.
+    Runs with EVALSHA, loading the script into Redis the first time.
+    """
+    return AsyncScript(None, source.encode())
@@ -1,79 +1,128 @@
 import jwt
 from jwt.algorithms import RSAAlgorithm
-import json
-import urllib.request
+import asyncio
+import hashlib
+import time
+import httpx
+from typing import Any, Dict, Optional
 from fastapi import HTTPException, status
 from app.core.config import settings
+from app.core.cache import TTLCache
+from app.core.logging import logger
+from app.core.metrics import record_cache_lookup
 
-# Cache for JWKS
-jwks_cache = {}
+# A token with an unknown kid triggers at most one JWKS fetch per interval,
+# so garbage tokens can't make us hammer Clerk
+UNKNOWN_KID_REFETCH_INTERVAL = 10.0
+# With no keys yet, a failed fetch is retried at most once per interval;
+# requests in between fail at once instead of waiting on Clerk
+FAILED_FETCH_RETRY_INTERVAL = 10.0
 
-def get_jwks():
-    if jwks_cache:
-        return jwks_cache
-    
-    if not settings.CLERK_ISSUER_URL:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Clerk Issuer URL not configured"
-        )
-        
-    jwks_url = f"{settings.CLERK_ISSUER_URL}/.well-known/jwks.json"
-    try:
-        with urllib.request.urlopen(jwks_url) as response:
-            jwks = json.loads(response.read())
-            jwks_cache.update(jwks)
-            return jwks
-    except Exception as e:
-        print(f"Failed to fetch JWKS: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to fetch JWKS"
-        )
+class JWKSClient:
+    """
+    Async JWKS client holding parsed public keys by kid.
+
+    Keys older than JWKS_CACHE_TTL are refreshed in the background while the
+    current ones keep serving requests. Concurrent fetches share one request.
+    """
+    def __init__(self, url: str, ttl: Optional[float] = None):
+        self.url = url
+        self.ttl = settings.JWKS_CACHE_TTL if ttl is None else ttl
+        self._keys: Dict[str, Any] = {}
+        self._fetched_at = 0.0
+        self._fetch_task: Optional[asyncio.Task] = None
+
+    async def get_key(self, kid: str) -> Optional[Any]:
+        if not self._keys:
+            if self._fetched_at and time.monotonic() - self._fetched_at < FAILED_FETCH_RETRY_INTERVAL:
+                raise _jwks_unavailable()
+            await self.refresh()
+        elif time.monotonic() - self._fetched_at > self.ttl:
+            self._start_fetch()
+
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._fetched_at > UNKNOWN_KID_REFETCH_INTERVAL:
+            # Clerk may have rotated its signing key
+            await self.refresh()
+            key = self._keys.get(kid)
+        return key
+
+    async def refresh(self) -> None:
+        await asyncio.shield(self._start_fetch())
+
+    def _start_fetch(self) -> asyncio.Task:
+        if self._fetch_task is None or self._fetch_task.done():
+            self._fetch_task = asyncio.create_task(self._fetch())
+        return self._fetch_task
+
+    async def _fetch(self) -> None:
+        try:
+            async with httpx.AsyncClient(timeout=settings.JWKS_FETCH_TIMEOUT) as client:
+                response = await client.get(self.url)
+                response.raise_for_status()
+                jwks = response.json()
+            keys = {k["kid"]: RSAAlgorithm.from_jwk(k) for k in jwks.get("keys", []) if k.get("kty") == "RSA"}
+        except Exception as e:
+            logger.error(f"Failed to fetch JWKS from {self.url}: {e}")
+            # Don't retry on every request while Clerk is unreachable
+            self._fetched_at = time.monotonic()
+            if not self._keys:
+                raise _jwks_unavailable()
+            return
+
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+        logger.info(f"Loaded {len(keys)} JWKS key(s)")
+
+def _jwks_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail="Failed to fetch JWKS"
+    )
+
+_jwks_client: Optional[JWKSClient] = None
+
+def get_jwks_client() -> JWKSClient:
+    global _jwks_client
+    if _jwks_client is None:
+        if not settings.CLERK_ISSUER_URL:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Clerk Issuer URL not configured"
+            )
+        _jwks_client = JWKSClient(f"{settings.CLERK_ISSUER_URL}/.well-known/jwks.json")
+    return _jwks_client
+
+# Verified claims by token hash, kept until the token expires, so repeat
+# requests with the same token skip the RSA signature check
+_verified_claims = TTLCache(maxsize=settings.JWT_CLAIMS_CACHE_SIZE)
+
+async def verify_token(token: str) -> Dict[str, Any]:
+    token_hash = hashlib.sha256(token.encode()).digest()
+    claims = _verified_claims.get(token_hash)
+    record_cache_lookup("jwt_claims", claims is not None)
+    if claims is not None:
+        return claims
 
-def verify_token(token: str):
     try:
         # Get the Key ID (kid) from the token header
         header = jwt.get_unverified_header(token)
         kid = header.get("kid")
-        
+
         if not kid:
-            print("DEBUG: No KID in header")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token header"
             )
-            
-        jwks = get_jwks()
-        print(f"DEBUG: Token KID: {kid}")
-        print(f"DEBUG: Available KIDs: {[k.get('kid') for k in jwks.get('keys', [])]}")
-        
-        public_key = None
-        
-        for key in jwks["keys"]:
-            if key["kid"] == kid:
-                public_key = RSAAlgorithm.from_jwk(json.dumps(key))
-                break
-                
+
+        public_key = await get_jwks_client().get_key(kid)
         if not public_key:
-            # Refresh cache and try once more
-            print("DEBUG: KID not found, refreshing cache...")
-            jwks_cache.clear()
-            jwks = get_jwks()
-            print(f"DEBUG: Refreshed KIDs: {[k.get('kid') for k in jwks.get('keys', [])]}")
-            
-            for key in jwks["keys"]:
-                if key["kid"] == kid:
-                    public_key = RSAAlgorithm.from_jwk(json.dumps(key))
-                    break
-            
-            if not public_key:
-                print(f"DEBUG: KID {kid} still not found after refresh.")
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid token key"
-                )
-        
+            logger.warning(f"Token signed with unknown key {kid}")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid token key"
+            )
+
         # Verify the token
         payload = jwt.decode(
             token,
@@ -81,24 +130,28 @@ def verify_token(token: str):
             algorithms=["RS256"],
             options={"verify_aud": False} # Clerk tokens might not have audience set as expected for API
         )
-        
-        return payload
-        
+
+    except HTTPException:
+        raise
     except jwt.ExpiredSignatureError:
-        print("DEBUG: Token expired")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token expired"
         )
     except jwt.InvalidTokenError as e:
-        print(f"DEBUG: Invalid token error: {e}")
+        logger.debug(f"Invalid token: {e}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token"
         )
     except Exception as e:
-        print(f"DEBUG: Token verification failed: {e}")
+        logger.warning(f"Token verification failed: {e}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
+
+    exp = payload.get("exp")
+    if exp is not None:
+        _verified_claims.set(token_hash, payload, ttl=exp - time.time())
+    return payload
@@ -0,0 +1,57 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from app.core.metrics import observe_phase
+
+class JobTrace:
+    """
+    Timing breakdown of one job, stored with it under `timings`.
+
+    Durations are summed per span name in milliseconds (a redirect chain adds
+    up its hops); counters such as bytes_downloaded and prompt_tokens are summed too.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings: Dict[str, Any] = {}
+
+    def add_duration(self, name: str, seconds: float) -> None:
+        key = f"{name}_ms"
+        self.timings[key] = round(self.timings.get(key, 0) + seconds * 1000, 1)
+
+    def add_count(self, name: str, value: int) -> None:
+        self.timings[name] = self.timings.get(name, 0) + value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self.timings, "total_ms": round((time.perf_counter() - self.started) * 1000, 1)}
+
+_current_trace: ContextVar[Optional[JobTrace]] = ContextVar("job_trace", default=None)
+
+def start_trace() -> JobTrace:
+    """Start tracing the current job; spans in the same task (and its children) report to it."""
+    trace = JobTrace()
+    _current_trace.set(trace)
+    return trace
+
+def current_trace() -> Optional[JobTrace]:
+    return _current_trace.get()
+
+def record_duration(name: str, seconds: float) -> None:
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_duration(name, seconds)
+
+def record_count(name: str, value: int) -> None:
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_count(name, value)
+
+@contextmanager
+def span(phase: str):
+    """Time a job phase into the current trace and the Prometheus phase histogram."""
+    start = time.perf_counter()
+    try:
+        with observe_phase(phase):
+            yield
+    finally:
+        record_duration(phase, time.perf_counter() - start)
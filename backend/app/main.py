@@ -7,6 +7,7 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi import HTTPException, status
 from datetime import datetime
 import os
+import asyncio
 
 # Middleware to limit request body size
 class RequestSizeLimitMiddleware(BaseHTTPMiddleware):
@@ -30,6 +31,15 @@ class RequestSizeLimitMiddleware(BaseHTTPMiddleware):
         
         return await call_next(request)
 
+# Middleware adding the X-RateLimit-* headers for rate-limited requests
+class RateLimitHeadersMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        rate_limit = getattr(request.state, "rate_limit", None)
+        if rate_limit is not None:
+            response.headers.update(rate_limit.headers())
+        return response
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="scraPy - Intelligent Web Scraping API with AI-powered extraction",
@@ -41,6 +51,7 @@ app = FastAPI(
 
 # Add request size limit middleware
 app.add_middleware(RequestSizeLimitMiddleware)
+app.add_middleware(RateLimitHeadersMiddleware)
 
 from fastapi import Request
 from fastapi.responses import JSONResponse
@@ -73,7 +84,8 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
                 "message": str(exc.detail),
                 "details": {}
             }
-        }
+        },
+        headers=getattr(exc, "headers", None)
     )
 
 @app.exception_handler(RequestValidationError)
@@ -114,25 +126,58 @@ async def global_exception_handler(request: Request, exc: Exception):
         }
     )
 
-from app.core.database import engine, Base
+from app.core.database import engine
 from app.models import job
 from app.models.api_key import ApiKey
 from app.models.webhook import Webhook
+from app.models.schedule import Schedule
+from app.models.stats import StatsRollup
 from app.core.logging import logger
+from app.core.cache import listen_for_invalidations
+from app.services.api_key_cache import ApiKeyCache, API_KEY_INVALIDATION_CHANNEL
+from app.services.job_events import JobEventHub
+from app.services.usage import UsageBuffer
+from app.services.admission import QueueMonitor
+from app.services.fair_queue import PENDING_KEY
+from app.core.metrics import QUEUE_DEPTH, FAIR_QUEUE_PENDING, CONTENT_TYPE_LATEST, render_metrics
+from arq.constants import default_queue_name
+from fastapi.responses import Response
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting scraPy API server...")
     app.state.redis = await create_redis_pool()
     logger.info("Redis connection established")
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    logger.info("Database tables initialized")
+
+    # API key lookups are cached per process and in Redis; revocations arrive over pub/sub
+    app.state.api_key_cache = ApiKeyCache(app.state.redis)
+    app.state.api_key_listener = asyncio.create_task(
+        listen_for_invalidations(
+            app.state.redis,
+            API_KEY_INVALIDATION_CHANNEL,
+            app.state.api_key_cache.invalidate,
+            on_reconnect=app.state.api_key_cache.clear,
+        )
+    )
+    # Job event streams and long polls share one pub/sub connection
+    app.state.job_events = JobEventHub(app.state.redis)
+    # Request counts per API key, written to Redis in batches
+    app.state.usage_buffer = UsageBuffer()
+    app.state.usage_writer = asyncio.create_task(app.state.usage_buffer.run(app.state.redis))
+    # Queue depth and worker throughput for admission control, sampled in the background
+    app.state.queue_monitor = QueueMonitor()
+    app.state.queue_sampler = asyncio.create_task(app.state.queue_monitor.run(app.state.redis))
+    # The schema is managed by migrations (alembic upgrade head), run before the app starts
     logger.info("scraPy API server started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down scraPy API server...")
+    app.state.api_key_listener.cancel()
+    app.state.usage_writer.cancel()
+    app.state.queue_sampler.cancel()
+    await asyncio.gather(app.state.usage_writer, app.state.queue_sampler, return_exceptions=True)
+    await app.state.job_events.close()
     await app.state.redis.close()
     logger.info("scraPy API server shut down complete")
 
@@ -147,6 +192,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "Retry-After"],
 )
 
 @app.get("/debug/config")
@@ -263,6 +309,26 @@ async def health_check():
     status_code = 200 if health_status["status"] == "healthy" else 503
     return JSONResponse(content=health_status, status_code=status_code)
 
+@app.get(
+    "/metrics",
+    summary="Prometheus metrics",
+    description="API process metrics in the Prometheus text format, plus the current queue depths",
+    include_in_schema=False
+)
+async def metrics():
+    # Queue depths are read on scrape rather than tracked per job, so they
+    # cost one round trip per Prometheus scrape
+    try:
+        async with app.state.redis.pipeline(transaction=False) as pipe:
+            pipe.zcard(default_queue_name)
+            pipe.get(PENDING_KEY)
+            depth, pending = await pipe.execute()
+        QUEUE_DEPTH.set(depth)
+        FAIR_QUEUE_PENDING.set(max(int(pending or 0), 0))
+    except Exception as e:
+        logger.warning(f"Failed to read queue depth: {e}")
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 from app.api.v1.api import api_router
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
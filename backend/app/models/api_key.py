@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime, Integer
+from sqlalchemy import Column, String, Boolean, Date, DateTime, Integer, BigInteger
 from app.core.database import Base
 from datetime import datetime
 import uuid
@@ -13,5 +13,20 @@ class ApiKey(Base):
     name = Column(String)                   # Friendly name
     is_active = Column(Boolean, default=True)
     rate_limit = Column(Integer, default=60) # Requests per minute
+    rate_limit_per_second = Column(Integer, nullable=True) # Burst limit; None uses RATE_LIMIT_PER_SECOND
+    rate_limit_per_day = Column(Integer, nullable=True)    # None uses RATE_LIMIT_PER_DAY
     usage_count = Column(Integer, default=0) # Total requests
+    plan = Column(String, nullable=True)     # See PLAN_RETENTION_DAYS; None is DEFAULT_PLAN
+    queue_weight = Column(Integer, nullable=True) # Fair scheduling weight; None uses the plan's FAIR_QUEUE_WEIGHTS
     created_at = Column(DateTime, default=datetime.utcnow)
+
+class ApiKeyUsage(Base):
+    """Daily usage per key, flushed in bulk from the Redis counters (see app/services/usage.py)."""
+    __tablename__ = "api_key_usage"
+
+    api_key_id = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)             # UTC
+    requests = Column(BigInteger, default=0)
+    static_jobs = Column(BigInteger, default=0)
+    dynamic_jobs = Column(BigInteger, default=0)
+    llm_tokens = Column(BigInteger, default=0)       # Prompt + completion
@@ -1,14 +1,38 @@
-from sqlalchemy import Column, String, Integer, JSON, DateTime
+from sqlalchemy import Column, String, Integer, JSON, Text, DateTime, Index
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from app.core.config import settings
 from app.core.database import Base
 from datetime import datetime
 
 class Job(Base):
+    """
+    A scrape job. In Postgres the table is partitioned by plan, then by month
+    of created_at (see app/services/partitions.py), so expired jobs are
+    dropped a partition at a time. Both are part of the primary key, as
+    Postgres requires; look jobs up with select() rather than session.get().
+    """
     __tablename__ = "jobs"
+    __table_args__ = (
+        # Per-user history, newest first, and per-user status filters
+        Index("ix_jobs_user_id_created_at", "user_id", "created_at"),
+        Index("ix_jobs_user_id_status", "user_id", "status"),
+        # Result search: JSON containment and jsonpath, and full text
+        Index("ix_jobs_data", "data", postgresql_using="gin", postgresql_ops={"data": "jsonb_path_ops"}),
+        Index("ix_jobs_search_vector", "search_vector", postgresql_using="gin"),
+        {"postgresql_partition_by": "LIST (plan)"},
+    )
 
-    id = Column(String, primary_key=True, index=True)
+    id = Column(String, primary_key=True)
+    plan = Column(String, primary_key=True, default=settings.DEFAULT_PLAN) # Retention class
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
     url = Column(String, index=True)
     mode = Column(String)
+    user_id = Column(String, nullable=True) # Clerk User ID of the submitter
     status = Column(String)
-    data = Column(JSON)
+    data = Column(JSON().with_variant(JSONB(), "postgresql")) # Inline result, or a blob reference for large results
+    search_vector = Column(Text().with_variant(TSVECTOR(), "postgresql"), nullable=True) # Words of the result's text values
     error = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    snapshot = Column(JSON, nullable=True) # Blob reference to the fetched HTML, if requested
+    timings = Column(JSON, nullable=True) # Phase breakdown in ms, bytes downloaded, prompt tokens
+    batch_id = Column(String, nullable=True, index=True) # Set for jobs submitted through POST /scrape/batch
+    schedule_id = Column(String, nullable=True, index=True) # Set for runs of a recurring schedule
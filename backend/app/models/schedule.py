@@ -0,0 +1,25 @@
+from sqlalchemy import Column, String, Boolean, Integer, JSON, DateTime
+from app.core.database import Base
+from datetime import datetime
+import uuid
+
+class Schedule(Base):
+    __tablename__ = "schedules"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, index=True)                # Clerk User ID
+    plan = Column(String, nullable=True)                # Owner's plan when created, for the runs' retention
+    url = Column(String, nullable=False)
+    mode = Column(String, default="guided")
+    selectors = Column(JSON, nullable=True)
+    instruction = Column(String, nullable=True)
+    options = Column(JSON, nullable=True)
+    interval_seconds = Column(Integer, nullable=False)
+    is_active = Column(Boolean, default=True)
+    next_run_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_run_at = Column(DateTime, nullable=True)
+    last_changed_at = Column(DateTime, nullable=True)
+    last_content_hash = Column(String, nullable=True)   # SHA-256 of the normalized page
+    last_data = Column(JSON, nullable=True)             # Last extracted fields, for diffing
+    last_job_id = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
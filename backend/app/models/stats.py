@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, DateTime, BigInteger
+from app.core.database import Base
+
+class StatsRollup(Base):
+    """
+    Job counters per scope ("global" or "user:{id}") and time bucket, kept
+    up to date from the Redis counters by the flush_stats cron (see app/services/stats.py).
+    """
+    __tablename__ = "stats_rollups"
+
+    scope = Column(String, primary_key=True)
+    granularity = Column(String, primary_key=True)    # hour, day, all
+    bucket_start = Column(DateTime, primary_key=True)  # UTC; epoch for "all"
+    jobs = Column(BigInteger, default=0)               # Jobs that reached a terminal status
+    completed = Column(BigInteger, default=0)
+    failed = Column(BigInteger, default=0)
+    cancelled = Column(BigInteger, default=0)
+    duration_ms = Column(BigInteger, default=0)        # Sum over completed and failed jobs
+    bytes = Column(BigInteger, default=0)              # Sum of bytes downloaded
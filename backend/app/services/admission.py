@@ -0,0 +1,151 @@
+import asyncio
+import json
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from arq.constants import default_queue_name
+from redis.asyncio import Redis
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.metrics import ADMISSION_DECISIONS, ESTIMATED_QUEUE_WAIT
+from app.core.plans import resolve_plan
+from app.services.fair_queue import PENDING_KEY, TenantShare, pending_jobs, push_jobs, try_dispatch
+
+# Admission control keeps the queue from growing past what the workers can
+# finish in reasonable time. Workers count the scrape jobs they finish in
+# FINISHED_KEY; each API process samples that counter and the queue depth
+# (the arq queue plus the per-user queues in front of it, see fair_queue.py)
+# every ADMISSION_REFRESH_SECONDS (QueueMonitor), so deciding on a request
+# costs nothing. Jobs admitted to the low-priority lane wait in LOW_LANE_KEY
+# until a worker sees the queue nearly empty and moves them to their user's queue.
+FINISHED_KEY = "admission:finished"
+LOW_LANE_KEY = "admission:low"
+THROUGHPUT_SMOOTHING = 0.3 # EWMA weight of the latest sample
+
+NORMAL, LOW_PRIORITY, REJECTED = "normal", "low", "rejected"
+
+@dataclass(frozen=True)
+class Admission:
+    lane: str                        # normal, low or rejected
+    estimated_wait: Optional[float]  # Seconds until the job should start; None while unknown
+    retry_after: Optional[int] = None
+
+class QueueMonitor:
+    """Cached queue depth and worker throughput, refreshed in the background by run()."""
+    def __init__(self):
+        self.depth = 0
+        self.low_depth = 0
+        self.throughput: Optional[float] = None # Jobs finished per second, smoothed
+        self._last_sample: Optional[tuple] = None
+
+    async def refresh(self, redis: Redis) -> None:
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.zcard(default_queue_name)
+            pipe.get(PENDING_KEY)
+            pipe.llen(LOW_LANE_KEY)
+            pipe.get(FINISHED_KEY)
+            depth, pending, low_depth, finished = await pipe.execute()
+        now, finished = time.monotonic(), int(finished or 0)
+        depth += max(int(pending or 0), 0)
+
+        if self._last_sample is not None:
+            last_finished, last_at, was_busy = self._last_sample
+            rate = max(finished - last_finished, 0) / max(now - last_at, 1e-6)
+            # Idle periods say nothing about capacity; only sample while there was work
+            if rate > 0 or was_busy:
+                self.throughput = rate if self.throughput is None else (
+                    THROUGHPUT_SMOOTHING * rate + (1 - THROUGHPUT_SMOOTHING) * self.throughput
+                )
+        self._last_sample = (finished, now, depth > 0)
+        self.depth, self.low_depth = depth, low_depth
+        wait = self.estimated_wait()
+        if wait is not None:
+            ESTIMATED_QUEUE_WAIT.set(wait)
+
+    async def run(self, redis: Redis, interval: Optional[float] = None) -> None:
+        interval = interval or settings.ADMISSION_REFRESH_SECONDS
+        while True:
+            try:
+                await self.refresh(redis)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Failed to refresh queue stats: {e}")
+            await asyncio.sleep(interval)
+
+    def estimated_wait(self, ahead: int = 0) -> Optional[float]:
+        """Seconds for the workers to get through the queue plus `ahead` more jobs."""
+        if self.throughput is None:
+            return None
+        return (self.depth + ahead) / max(self.throughput, settings.ADMISSION_MIN_THROUGHPUT)
+
+    def admit(self, plan: Optional[str], jobs: int = 1) -> Admission:
+        """Where `jobs` new jobs of a `plan` user should go, given the cached queue state."""
+        plan = resolve_plan(plan)
+        wait = self.estimated_wait()
+        if not settings.ADMISSION_ENABLED or wait is None or self.depth + jobs <= settings.ADMISSION_MIN_DEPTH:
+            decision = Admission(NORMAL, wait)
+        else:
+            max_wait = settings.ADMISSION_MAX_WAIT.get(plan, math.inf)
+            low_max_wait = settings.ADMISSION_LOW_PRIORITY_MAX_WAIT.get(plan, max_wait)
+            if self.estimated_wait(jobs) <= max_wait:
+                decision = Admission(NORMAL, wait)
+            elif self.estimated_wait(self.low_depth + jobs) <= low_max_wait:
+                decision = Admission(LOW_PRIORITY, self.estimated_wait(self.low_depth))
+            else:
+                # Come back when the queue should have drained below the threshold
+                retry_after = min(max(math.ceil(self.estimated_wait(jobs) - max_wait), 1), 3600)
+                decision = Admission(REJECTED, wait, retry_after)
+        ADMISSION_DECISIONS.labels(plan, decision.lane).inc(jobs)
+        return decision
+
+async def record_job_finished(redis: Redis) -> None:
+    """Count a finished scrape job towards throughput. Never raises."""
+    try:
+        await redis.incr(FINISHED_KEY)
+    except Exception as e:
+        logger.warning(f"Failed to count finished job: {e}")
+
+async def push_low_priority(redis: Redis, tenant: str, job_kwargs: Dict[str, Any], share: TenantShare) -> None:
+    """Park a job's scrape_task arguments in the low-priority lane."""
+    await redis.rpush(LOW_LANE_KEY, json.dumps({
+        "tenant": tenant, "weight": share.weight, "max_in_flight": share.max_in_flight, "job": job_kwargs,
+    }))
+
+async def promote_low_priority(redis: Redis, below: Optional[int] = None) -> int:
+    """
+    Move low-priority jobs to their users' queues while fewer than `below`
+    jobs are waiting there and in arq. Returns how many were moved; jobs
+    cancelled while parked are dropped when they are dispatched.
+    """
+    below = below or settings.LOW_PRIORITY_PROMOTE_BELOW
+    room = below - await redis.zcard(default_queue_name) - await pending_jobs(redis)
+    if room <= 0:
+        return 0
+    entries = await redis.lpop(LOW_LANE_KEY, room) or []
+    for i, entry in enumerate(entries):
+        parked = json.loads(entry)
+        try:
+            await push_jobs(redis, parked["tenant"], [parked["job"]], TenantShare(parked["weight"], parked["max_in_flight"]))
+        except Exception:
+            # Put the rest back at the head of the lane, in order
+            await redis.lpush(LOW_LANE_KEY, *reversed(entries[i:]))
+            raise
+    if entries:
+        await try_dispatch(redis)
+    return len(entries)
+
+async def run_low_priority_promoter(redis: Redis, interval: Optional[float] = None) -> None:
+    """Worker background task calling promote_low_priority every LOW_PRIORITY_PROMOTE_INTERVAL."""
+    interval = interval or settings.LOW_PRIORITY_PROMOTE_INTERVAL
+    while True:
+        try:
+            promoted = await promote_low_priority(redis)
+            if promoted:
+                logger.info(f"Moved {promoted} low-priority jobs into the queue")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Failed to promote low-priority jobs: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,113 @@
+import json
+from typing import Any, Dict, Optional
+from redis.asyncio import Redis
+from sqlalchemy import select
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.logging import logger
+from app.core.metrics import record_cache_lookup
+from app.models.api_key import ApiKey
+
+# Channel the API publishes a key hash on whenever that key changes (e.g. revoked)
+API_KEY_INVALIDATION_CHANNEL = "api_keys:invalidate"
+
+# Unknown keys are remembered briefly so a flood of bad keys doesn't reach Postgres
+NEGATIVE_TTL = 10.0
+
+def api_key_cache_key(key_hash: str) -> str:
+    return f"auth:apikey:{key_hash}"
+
+def api_key_record(api_key: ApiKey) -> Dict[str, Any]:
+    """The fields authentication needs, as cached."""
+    return {
+        "id": api_key.id,
+        "user_id": api_key.user_id,
+        "is_active": api_key.is_active,
+        "rate_limit": api_key.rate_limit,
+        "rate_limit_per_second": api_key.rate_limit_per_second,
+        "rate_limit_per_day": api_key.rate_limit_per_day,
+        "plan": api_key.plan,
+        "queue_weight": api_key.queue_weight,
+    }
+
+async def load_api_key(key_hash: str) -> Optional[Dict[str, Any]]:
+    """Look the key up in Postgres, bypassing the caches."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(ApiKey).where(ApiKey.key_hash == key_hash))
+        api_key = result.scalar_one_or_none()
+    return api_key_record(api_key) if api_key else None
+
+async def invalidate_api_key(redis: Redis, key_hash: str, record: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Replace the shared entry with the key's new state (or drop it) and tell
+    every API process to forget its local copy.
+
+    Writing the new state rather than deleting means a request that read the
+    old row just before the change can't put it back (entries are only added with NX).
+    """
+    key = api_key_cache_key(key_hash)
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            if record is not None:
+                pipe.set(key, json.dumps(record), ex=settings.API_KEY_REDIS_TTL)
+            else:
+                pipe.delete(key)
+            pipe.publish(API_KEY_INVALIDATION_CHANNEL, key_hash)
+            await pipe.execute()
+    except Exception as e:
+        # Other processes fall back to the local cache TTL if the message is lost
+        logger.warning(f"Failed to publish API key invalidation: {e}")
+
+class ApiKeyCache:
+    """
+    Two-level cache of API key lookups, keyed by the SHA-256 hash of the key:
+    an in-process TTL LRU in front of a Redis entry shared by all API processes,
+    in front of Postgres.
+
+    Local entries are dropped on pub/sub invalidation; API_KEY_CACHE_TTL only
+    bounds staleness if an invalidation message is missed.
+    """
+    def __init__(self, redis: Redis, maxsize: int = 10000, ttl: Optional[float] = None):
+        self.redis = redis
+        self._cache = TTLCache(maxsize=maxsize, ttl=settings.API_KEY_CACHE_TTL if ttl is None else ttl)
+
+    async def get(self, key_hash: str) -> Optional[Dict[str, Any]]:
+        """The cached key record, or None if no key has this hash."""
+        cached = self._cache.get(key_hash)
+        record_cache_lookup("api_key_local", cached is not None)
+        if cached is not None:
+            return cached or None # False marks an unknown key
+
+        record = await self._get_shared(key_hash)
+        if record is None:
+            record = await load_api_key(key_hash)
+            if record is not None:
+                await self._set_shared(key_hash, record)
+
+        if record is None:
+            self._cache.set(key_hash, False, ttl=NEGATIVE_TTL)
+        else:
+            self._cache.set(key_hash, record)
+        return record
+
+    async def _get_shared(self, key_hash: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = await self.redis.get(api_key_cache_key(key_hash))
+        except Exception as e:
+            logger.warning(f"API key cache read failed, using the database: {e}")
+            return None
+        record_cache_lookup("api_key_redis", raw is not None)
+        return json.loads(raw) if raw else None
+
+    async def _set_shared(self, key_hash: str, record: Dict[str, Any]) -> None:
+        try:
+            await self.redis.set(api_key_cache_key(key_hash), json.dumps(record), ex=settings.API_KEY_REDIS_TTL, nx=True)
+        except Exception as e:
+            logger.warning(f"API key cache write failed: {e}")
+
+    def invalidate(self, key_hash: str) -> None:
+        self._cache.pop(key_hash)
+
+    def clear(self) -> None:
+        self._cache.clear()
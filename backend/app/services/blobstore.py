@@ -0,0 +1,209 @@
+import os
+import json
+import asyncio
+import hashlib
+import tempfile
+from abc import ABC, abstractmethod
+import zstandard
+from typing import Any, AsyncIterator, Dict, Optional
+from app.core.config import settings
+
+# Marker key for a result that lives in the blob store instead of inline
+BLOB_REF_KEY = "$blob"
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+class BlobStore(ABC):
+    """
+    Content-addressed blob storage.
+
+    Keys are the SHA-256 of the uncompressed content, so identical results are
+    stored once. Values are stored as given (callers compress them).
+    """
+    @abstractmethod
+    async def put(self, key: str, data: bytes) -> None:
+        ...
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes:
+        ...
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    async def iter_chunks(self, key: str, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        data = await self.get(key)
+        for i in range(0, len(data), chunk_size):
+            yield data[i:i + chunk_size]
+
+class LocalBlobStore(BlobStore):
+    """Blobs as files under a root directory, sharded by key prefix."""
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def _write(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _read(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    async def put(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self._write, key, data)
+
+    async def get(self, key: str) -> bytes:
+        return await asyncio.to_thread(self._read, key)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(os.path.exists, self._path(key))
+
+    async def iter_chunks(self, key: str, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        f = await asyncio.to_thread(open, self._path(key), "rb")
+        try:
+            while True:
+                chunk = await asyncio.to_thread(f.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            f.close()
+
+class S3BlobStore(BlobStore):
+    """
+    Blobs in an S3-compatible bucket.
+
+    Set BLOB_S3_ENDPOINT_URL to run against a local stand-in such as MinIO.
+    """
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key: Optional[str] = None,
+        secret_key: Optional[str] = None,
+    ):
+        import boto3  # Only needed for the s3 backend
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+        )
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    async def put(self, key: str, data: bytes) -> None:
+        if await self.exists(key):
+            return
+        await asyncio.to_thread(self.client.put_object, Bucket=self.bucket, Key=self._key(key), Body=data)
+
+    async def get(self, key: str) -> bytes:
+        response = await asyncio.to_thread(self.client.get_object, Bucket=self.bucket, Key=self._key(key))
+        return await asyncio.to_thread(response["Body"].read)
+
+    async def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=self._key(key))
+            return True
+        except ClientError:
+            return False
+
+    async def iter_chunks(self, key: str, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        response = await asyncio.to_thread(self.client.get_object, Bucket=self.bucket, Key=self._key(key))
+        body = response["Body"]
+        try:
+            while True:
+                chunk = await asyncio.to_thread(body.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+_blob_store: Optional[BlobStore] = None
+
+def get_blob_store() -> BlobStore:
+    global _blob_store
+    if _blob_store is None:
+        if settings.BLOB_STORE_BACKEND == "s3":
+            _blob_store = S3BlobStore(
+                bucket=settings.BLOB_S3_BUCKET,
+                prefix=settings.BLOB_S3_PREFIX,
+                endpoint_url=settings.BLOB_S3_ENDPOINT_URL,
+                region=settings.BLOB_S3_REGION,
+                access_key=settings.BLOB_S3_ACCESS_KEY,
+                secret_key=settings.BLOB_S3_SECRET_KEY,
+            )
+        else:
+            _blob_store = LocalBlobStore(settings.BLOB_LOCAL_PATH)
+    return _blob_store
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and BLOB_REF_KEY in value
+
+async def store_blob(content: bytes, content_type: str) -> Dict[str, Any]:
+    """Compress and store content, returning a reference to it."""
+    key = hashlib.sha256(content).hexdigest()
+    compressed = zstandard.ZstdCompressor(level=settings.BLOB_ZSTD_LEVEL).compress(content)
+    await get_blob_store().put(key, compressed)
+    return {
+        BLOB_REF_KEY: key,
+        "encoding": "zstd",
+        "content_type": content_type,
+        "size": len(content),
+    }
+
+async def offload_result(data: Any) -> Any:
+    """
+    Move a job result to the blob store if its JSON encoding exceeds
+    BLOB_THRESHOLD_BYTES; smaller results are returned unchanged.
+    """
+    if data is None:
+        return None
+    encoded = json.dumps(data).encode()
+    if len(encoded) <= settings.BLOB_THRESHOLD_BYTES:
+        return data
+    return await store_blob(encoded, "application/json")
+
+async def load_blob(ref: Dict[str, Any]) -> bytes:
+    compressed = await get_blob_store().get(ref[BLOB_REF_KEY])
+    return zstandard.ZstdDecompressor().decompress(compressed, max_output_size=ref.get("size", 0))
+
+async def load_result(data: Any) -> Any:
+    """Inverse of offload_result: resolve a blob reference back to the result."""
+    if not is_blob_ref(data):
+        return data
+    return json.loads(await load_blob(data))
+
+async def stream_blob(ref: Dict[str, Any]) -> AsyncIterator[bytes]:
+    """Yield the decompressed content of a blob without loading it all in memory."""
+    decompressor = zstandard.ZstdDecompressor().decompressobj()
+    async for chunk in get_blob_store().iter_chunks(ref[BLOB_REF_KEY]):
+        out = decompressor.decompress(chunk)
+        if out:
+            yield out
@@ -0,0 +1,52 @@
+import re
+import hashlib
+from bs4 import BeautifulSoup, Comment
+from typing import Any, Dict, Optional
+
+# Elements whose contents change between requests without the page changing
+_VOLATILE_TAGS = ["script", "style", "noscript", "template", "svg"]
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_html(html: str) -> str:
+    """
+    Reduce a page to its visible text so cosmetic differences (inline scripts,
+    nonces, comments, whitespace) don't count as a change.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(_VOLATILE_TAGS):
+        tag.decompose()
+    for comment in soup.find_all(string=lambda s: isinstance(s, Comment)):
+        comment.extract()
+    return _WHITESPACE.sub(" ", soup.get_text(" ")).strip()
+
+def content_hash(html: str) -> str:
+    """SHA-256 of the normalized page content."""
+    return hashlib.sha256(normalize_html(html).encode()).hexdigest()
+
+def diff_fields(old: Optional[Any], new: Any) -> Dict[str, Any]:
+    """
+    Field-level diff between two extraction results.
+
+    Returns {"added": {...}, "removed": {...}, "changed": {key: {"old": ..., "new": ...}}};
+    all three are empty when nothing changed.
+    """
+    diff = {"added": {}, "removed": {}, "changed": {}}
+    if not isinstance(new, dict) or (old is not None and not isinstance(old, dict)):
+        # LLM extractions may return a list; compare those as a single value
+        if old != new:
+            diff["changed"]["$"] = {"old": old, "new": new}
+        return diff
+
+    old = old or {}
+    for key, value in new.items():
+        if key not in old:
+            diff["added"][key] = value
+        elif old[key] != value:
+            diff["changed"][key] = {"old": old[key], "new": value}
+    for key, value in old.items():
+        if key not in new:
+            diff["removed"][key] = value
+    return diff
+
+def has_changes(diff: Dict[str, Any]) -> bool:
+    return any(diff.values())
@@ -0,0 +1,174 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+from sqlalchemy import Select, select
+from app.core.config import settings
+from app.core.database import read_session
+from app.models.job import Job
+from app.services.blobstore import load_result
+from app.services.job_queries import SUMMARY_COLUMNS, filter_jobs
+
+# Exports stream jobs from a server-side cursor, EXPORT_BATCH_SIZE rows at a
+# time, and encode each batch as it arrives, so memory stays flat however
+# many jobs match.
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+BASE_FIELDS = tuple(c.key for c in SUMMARY_COLUMNS)
+EXTRA_FIELD = "data_extra"
+
+def export_query(user_id: str, **filters) -> Select:
+    """The user's jobs matching `filters`, oldest first, with their results."""
+    query = filter_jobs(select(*SUMMARY_COLUMNS, Job.data), user_id, **filters)
+    return query.order_by(Job.created_at, Job.id)
+
+async def iter_job_batches(query: Select) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield the query's rows as dicts in batches, resolving results kept in the blob store."""
+    async with read_session() as session:
+        result = await session.stream(query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        async for partition in result.partitions():
+            batch = []
+            for row in partition:
+                job = dict(row._mapping)
+                job["data"] = await load_result(job["data"])
+                batch.append(job)
+            yield batch
+
+def flatten(data: Any, prefix: str = "data") -> Dict[str, Any]:
+    """
+    Flatten a result into columns: nested objects become dotted names
+    (data.price.amount), lists and other values are kept whole.
+    """
+    if not isinstance(data, dict):
+        return {prefix: data} if data is not None else {}
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}"
+        if isinstance(value, dict) and value:
+            flat.update(flatten(value, name))
+        else:
+            flat[name] = value
+    return flat
+
+def _json_default(value: Any) -> str:
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+def _cell(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return json.dumps(value, default=_json_default)
+
+class _Columns:
+    """
+    Columns for the tabular formats. They are fixed when the first batch
+    arrives (a header can't change mid-stream); result fields first seen
+    later go into the data_extra column as JSON.
+    """
+    def __init__(self, first_batch: List[Dict[str, Any]]):
+        data_fields = {}
+        for job in first_batch:
+            data_fields.update(dict.fromkeys(flatten(job["data"])))
+        self.data_fields = list(data_fields)
+        self.names = list(BASE_FIELDS) + self.data_fields + [EXTRA_FIELD]
+
+    def row(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        flat = flatten(job["data"])
+        row = {f: job[f] for f in BASE_FIELDS}
+        row.update({f: _cell(flat.pop(f, None)) for f in self.data_fields})
+        row[EXTRA_FIELD] = json.dumps(flat, default=_json_default) if flat else None
+        return row
+
+async def encode_ndjson(batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        yield "".join(json.dumps(job, default=_json_default) + "\n" for job in batch).encode()
+
+async def encode_csv(batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = None
+    columns = None
+    async for batch in batches:
+        if columns is None:
+            columns = _Columns(batch)
+            writer = csv.DictWriter(buffer, fieldnames=columns.names)
+            writer.writeheader()
+        for job in batch:
+            row = columns.row(job)
+            row["created_at"] = _cell(row["created_at"])
+            writer.writerow(row)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if columns is None:
+        # No rows: just the header
+        csv.writer(buffer).writerow(list(BASE_FIELDS))
+        yield buffer.getvalue().encode()
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that collects what the Parquet writer emits, to be taken between row groups."""
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+async def encode_parquet(batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """One row group per batch. Result fields are string columns (JSON for non-text values)."""
+    import pyarrow as pa  # Only needed for Parquet exports
+    import pyarrow.parquet as pq
+
+    sink = _ChunkSink()
+    writer = None
+    columns = None
+    try:
+        async for batch in batches:
+            if writer is None:
+                columns = _Columns(batch)
+                schema = pa.schema(
+                    [(f, pa.timestamp("us") if f == "created_at" else pa.string()) for f in columns.names]
+                )
+                writer = pq.ParquetWriter(sink, schema, compression="zstd")
+            writer.write_table(pa.Table.from_pylist([columns.row(job) for job in batch], schema=schema))
+            yield sink.take()
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        # No rows: still a valid (empty) file
+        schema = pa.schema([(f, pa.string()) for f in BASE_FIELDS])
+        pq.ParquetWriter(sink, schema).close()
+    yield sink.take()
+
+async def gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) # wbits=31: gzip container
+    async for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+def export_stream(query: Select, fmt: str, gzip: bool = False) -> AsyncIterator[bytes]:
+    encode = {"ndjson": encode_ndjson, "csv": encode_csv, "parquet": encode_parquet}[fmt]
+    stream = encode(iter_job_batches(query))
+    return gzip_stream(stream) if gzip else stream
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from arq.constants import default_queue_name
+from redis.asyncio import Redis
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.plans import resolve_plan
+from app.core.redis import lua_script
+from app.services.job_store import read_job_status
+
+# Scrape jobs don't go straight into the shared arq queue. Each user's jobs
+# wait in their own list (queue_key), and dispatch() moves them into arq by
+# deficit round robin whenever arq holds fewer than FAIR_QUEUE_DISPATCH_BELOW
+# jobs, so a user with a huge batch only delays others by its share. A
+# user's jobs that are in arq or running are tracked in running_key
+# (dispatch time as score) and count against its in-flight cap; entries
+# older than FAIR_QUEUE_IN_FLIGHT_TTL are dropped in case a worker died
+# without releasing them.
+#
+# The scripts build the per-user key names themselves, so this needs a
+# single Redis instance (not Redis Cluster), as arq does.
+TENANTS_KEY = "fairq:tenants"     # Round robin order of users with queued jobs
+ACTIVE_KEY = "fairq:active"       # The same users, as a set
+WEIGHTS_KEY = "fairq:weights"     # user -> jobs per round
+CAPS_KEY = "fairq:caps"           # user -> max jobs in flight
+DEFICITS_KEY = "fairq:deficits"   # user -> unused credit from its current turn
+PENDING_KEY = "fairq:pending"     # Jobs waiting in all user queues
+QUEUE_PREFIX = "fairq:queue:"
+RUNNING_PREFIX = "fairq:running:"
+OWNER_PREFIX = "fairq:owner:"     # job_id -> user, while the job is in flight
+
+def queue_key(tenant: str) -> str:
+    return f"{QUEUE_PREFIX}{tenant}"
+
+def running_key(tenant: str) -> str:
+    return f"{RUNNING_PREFIX}{tenant}"
+
+def owner_key(job_id: str) -> str:
+    return f"{OWNER_PREFIX}{job_id}"
+
+# Append jobs to a user's queue (or put them back at its head) and make sure
+# the user is in the round robin. An empty weight keeps the stored share.
+PUSH_SCRIPT = """
+if ARGV[4] == '1' then
+    for i = #ARGV, 5, -1 do redis.call('LPUSH', KEYS[1], ARGV[i]) end
+else
+    for i = 5, #ARGV do redis.call('RPUSH', KEYS[1], ARGV[i]) end
+end
+if redis.call('SADD', KEYS[2], ARGV[1]) == 1 then
+    redis.call('RPUSH', KEYS[3], ARGV[1])
+end
+if ARGV[2] ~= '' then
+    redis.call('HSET', KEYS[4], ARGV[1], ARGV[2])
+    redis.call('HSET', KEYS[5], ARGV[1], ARGV[3])
+end
+return redis.call('INCRBY', KEYS[6], #ARGV - 4)
+"""
+
+# Deficit round robin. The user at the head of the ring gets its weight in
+# credit when its turn starts and dispatches one job per credit, as far as
+# the room in arq and its in-flight cap allow. Its turn ends, and it moves
+# to the back, once it is out of credit, capped or out of jobs (then it
+# leaves the ring); if only the room ran out it keeps its turn for the next
+# call. Returns user, job entry pairs, flattened.
+DISPATCH_SCRIPT = """
+local room = tonumber(ARGV[1]) - redis.call('ZCARD', KEYS[7])
+local out = {}
+local idle = 0
+while room > 0 do
+    local users = redis.call('LLEN', KEYS[1])
+    if users == 0 or idle >= users then break end
+    local tenant = redis.call('LINDEX', KEYS[1], 0)
+    local queue = ARGV[4] .. tenant
+    local running = ARGV[5] .. tenant
+    local queued = redis.call('LLEN', queue)
+    redis.call('ZREMRANGEBYSCORE', running, '-inf', ARGV[3])
+    local free = tonumber(redis.call('HGET', KEYS[4], tenant) or '1') - redis.call('ZCARD', running)
+    local deficit = tonumber(redis.call('HGET', KEYS[5], tenant) or '0')
+    if queued > 0 and free > 0 and deficit < 1 then
+        deficit = deficit + tonumber(redis.call('HGET', KEYS[3], tenant) or '1')
+    end
+    local take = math.max(math.min(math.floor(deficit), room, free, queued), 0)
+    if take > 0 then
+        for _, entry in ipairs(redis.call('LPOP', queue, take)) do
+            local job_id = cjson.decode(entry)['job_id']
+            redis.call('ZADD', running, ARGV[2], job_id)
+            redis.call('SET', ARGV[6] .. job_id, tenant, 'EX', ARGV[7])
+            out[#out + 1] = tenant
+            out[#out + 1] = entry
+        end
+        redis.call('DECRBY', KEYS[6], take)
+        deficit = deficit - take
+        room = room - take
+        idle = 0
+    else
+        idle = idle + 1
+    end
+    if queued == take then
+        redis.call('LPOP', KEYS[1])
+        redis.call('SREM', KEYS[2], tenant)
+        redis.call('HDEL', KEYS[5], tenant)
+    else
+        redis.call('HSET', KEYS[5], tenant, deficit)
+        if deficit < 1 or free <= take then
+            redis.call('LMOVE', KEYS[1], KEYS[1], 'LEFT', 'RIGHT')
+        end
+    end
+end
+return out
+"""
+
+# A job left flight (finished, failed, cancelled): free its slot
+RELEASE_SCRIPT = """
+local tenant = redis.call('GET', KEYS[1])
+if not tenant then return 0 end
+redis.call('DEL', KEYS[1])
+return redis.call('ZREM', ARGV[1] .. tenant, ARGV[2])
+"""
+
+_push_script = lua_script(PUSH_SCRIPT)
+_dispatch_script = lua_script(DISPATCH_SCRIPT)
+_release_script = lua_script(RELEASE_SCRIPT)
+
+@dataclass(frozen=True)
+class TenantShare:
+    weight: int         # Jobs dispatched per round robin turn
+    max_in_flight: int  # Jobs in arq or running at once
+
+def tenant_share(plan: Optional[str], weight: Optional[int] = None) -> TenantShare:
+    """A user's share of the workers: the API key's weight if it has one, else the plan's."""
+    plan = resolve_plan(plan)
+    return TenantShare(
+        weight=max(int(weight or settings.FAIR_QUEUE_WEIGHTS.get(plan, 1)), 1),
+        max_in_flight=max(settings.FAIR_QUEUE_MAX_IN_FLIGHT.get(plan, 1), 1),
+    )
+
+async def push_jobs(redis: Redis, tenant: str, jobs: Iterable[Dict[str, Any]], share: TenantShare) -> None:
+    """
+    Queue jobs (scrape_task arguments) behind the user's other waiting jobs.
+    Each gets a submitted_at (epoch seconds) unless it has one, so the worker
+    measures queue wait from here rather than from dispatch into arq.
+    """
+    now = time.time()
+    await _push(redis, tenant, [json.dumps({"submitted_at": now, **job}) for job in jobs], share)
+
+async def _push(redis: Redis, tenant: str, entries: List[Any], share: Optional[TenantShare], head: bool = False) -> None:
+    if not entries:
+        return
+    await _push_script(
+        keys=[queue_key(tenant), ACTIVE_KEY, TENANTS_KEY, WEIGHTS_KEY, CAPS_KEY, PENDING_KEY],
+        args=[
+            tenant,
+            share.weight if share else "",
+            share.max_in_flight if share else "",
+            1 if head else 0,
+            *entries,
+        ],
+        client=redis,
+    )
+
+async def dispatch(redis: Redis, below: Optional[int] = None) -> int:
+    """
+    Move queued jobs into arq, fairly across users, until arq holds `below`
+    jobs. Jobs cancelled while they waited are dropped. Returns how many
+    were enqueued.
+    """
+    now = time.time()
+    raw = await _dispatch_script(
+        keys=[TENANTS_KEY, ACTIVE_KEY, WEIGHTS_KEY, CAPS_KEY, DEFICITS_KEY, PENDING_KEY, default_queue_name],
+        args=[
+            below or settings.FAIR_QUEUE_DISPATCH_BELOW,
+            now,
+            now - settings.FAIR_QUEUE_IN_FLIGHT_TTL,
+            QUEUE_PREFIX,
+            RUNNING_PREFIX,
+            OWNER_PREFIX,
+            int(settings.FAIR_QUEUE_IN_FLIGHT_TTL),
+        ],
+        client=redis,
+    )
+    popped: List[Tuple[str, Any]] = [
+        (tenant.decode() if isinstance(tenant, bytes) else tenant, entry)
+        for tenant, entry in zip(raw[::2], raw[1::2])
+    ]
+    dispatched = 0
+    for i, (tenant, entry) in enumerate(popped):
+        job_kwargs = json.loads(entry)
+        job_id = job_kwargs["job_id"]
+        try:
+            if await read_job_status(redis, job_id) == "cancelled":
+                await release_job(redis, job_id)
+                continue
+            # Our job_id is the arq job id, so the job can be aborted
+            await redis.enqueue_job("scrape_task", _job_id=job_id, **job_kwargs)
+        except Exception:
+            await _requeue(redis, popped[i:])
+            raise
+        dispatched += 1
+    return dispatched
+
+async def _requeue(redis: Redis, popped: List[Tuple[str, Any]]) -> None:
+    """Put jobs dispatch() couldn't enqueue back at the head of their users' queues, in order."""
+    by_tenant: Dict[str, List[Any]] = defaultdict(list)
+    for tenant, entry in popped:
+        by_tenant[tenant].append(entry)
+        await release_job(redis, json.loads(entry)["job_id"])
+    for tenant, entries in by_tenant.items():
+        await _push(redis, tenant, entries, None, head=True)
+
+async def try_dispatch(redis: Redis) -> None:
+    """dispatch() for callers that shouldn't fail on it; the workers' dispatcher retries."""
+    try:
+        await dispatch(redis)
+    except Exception as e:
+        logger.warning(f"Failed to dispatch queued jobs: {e}")
+
+async def release_job(redis: Redis, job_id: str) -> bool:
+    """Free the in-flight slot a dispatched job holds. False if it holds none."""
+    released = await _release_script(
+        keys=[owner_key(job_id)], args=[RUNNING_PREFIX, job_id], client=redis
+    )
+    return bool(released)
+
+async def pending_jobs(redis: Redis) -> int:
+    """Jobs waiting in user queues, not yet in arq."""
+    return max(int(await redis.get(PENDING_KEY) or 0), 0)
+
+async def run_dispatcher(redis: Redis, interval: Optional[float] = None) -> None:
+    """
+    Worker background task calling dispatch() every FAIR_QUEUE_DISPATCH_INTERVAL.
+    Submissions and finished jobs dispatch right away; this catches up on
+    anything those missed.
+    """
+    interval = interval or settings.FAIR_QUEUE_DISPATCH_INTERVAL
+    while True:
+        try:
+            await dispatch(redis)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Failed to dispatch queued jobs: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,181 @@
+import json
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+from redis.asyncio import Redis
+from app.core.logging import logger
+from app.services.job_store import TERMINAL_STATUSES, job_channel, read_job_status
+
+# Events a watcher may fall behind by before the oldest are dropped
+QUEUE_SIZE = 100
+
+class JobEventHub:
+    """
+    One Redis pub/sub connection per process, shared by every watcher.
+
+    A channel is subscribed while anyone watches it, and each message on it
+    is copied into the in-memory queue of every watcher of that channel.
+    """
+    def __init__(self, redis: Redis, queue_size: int = QUEUE_SIZE, retry_delay: float = 1.0):
+        self.redis = redis
+        self.queue_size = queue_size
+        self.retry_delay = retry_delay
+        self.pubsub = redis.pubsub()
+        self._watchers: Dict[str, Set[asyncio.Queue]] = {}
+        self._lock = asyncio.Lock()
+        self._reader: Optional[asyncio.Task] = None
+
+    async def watch(self, channels: List[str]) -> asyncio.Queue:
+        """A new queue that receives the events published on `channels`."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        async with self._lock:
+            new = [channel for channel in channels if channel not in self._watchers]
+            for channel in channels:
+                self._watchers.setdefault(channel, set()).add(queue)
+            if new:
+                try:
+                    await self.pubsub.subscribe(*new)
+                except Exception:
+                    self._discard(channels, queue)
+                    raise
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read())
+        return queue
+
+    async def unwatch(self, channels: List[str], queue: asyncio.Queue) -> None:
+        async with self._lock:
+            unused = self._discard(channels, queue)
+            if unused:
+                try:
+                    await self.pubsub.unsubscribe(*unused)
+                except Exception as e:
+                    logger.warning(f"Failed to unsubscribe from job events: {e}")
+
+    def _discard(self, channels: List[str], queue: asyncio.Queue) -> List[str]:
+        """Remove the queue from the channels' watchers; returns the channels nobody watches now."""
+        unused = []
+        for channel in channels:
+            watchers = self._watchers.get(channel)
+            if watchers is None:
+                continue
+            watchers.discard(queue)
+            if not watchers:
+                del self._watchers[channel]
+                unused.append(channel)
+        return unused
+
+    async def _read(self) -> None:
+        while True:
+            try:
+                # May return None before the timeout (e.g. for subscribe confirmations)
+                message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # redis-py reconnects and resubscribes on the next read
+                logger.warning(f"Job event listener dropped: {e}")
+                await asyncio.sleep(self.retry_delay)
+                continue
+            if message is None:
+                continue
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            event = json.loads(message["data"])
+            for queue in self._watchers.get(channel, ()):
+                if queue.full():
+                    # A slow watcher loses its oldest event rather than holding up the rest
+                    queue.get_nowait()
+                queue.put_nowait(event)
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            await asyncio.gather(self._reader, return_exceptions=True)
+        await self.pubsub.aclose()
+
+class JobEventSubscription:
+    """
+    Subscription to job events published by write_job_record/update_job_fields.
+
+    Use as an async context manager, and read the job's current state *inside*
+    it, so no transition is lost between the read and the subscription.
+    """
+    def __init__(self, hub: JobEventHub, channels: List[str]):
+        self.hub = hub
+        self.channels = channels
+        self.queue = None
+
+    async def __aenter__(self) -> "JobEventSubscription":
+        self.queue = await self.hub.watch(self.channels)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.hub.unwatch(self.channels, self.queue)
+
+    async def events(
+        self,
+        heartbeat: float = 15.0,
+        timeout: Optional[float] = None,
+        stop_on_terminal: bool = False,
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yield job events as they arrive.
+
+        Yields None every `heartbeat` seconds without traffic so callers can send
+        a keep-alive and notice disconnected clients. Ends after `timeout` seconds,
+        or after the first terminal status if `stop_on_terminal` is set.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        last_sent = loop.time()
+        while True:
+            now = loop.time()
+            if now - last_sent >= heartbeat:
+                last_sent = now
+                yield None
+
+            wait = heartbeat - (now - last_sent)
+            if deadline is not None:
+                remaining = deadline - now
+                if remaining <= 0:
+                    return
+                wait = min(wait, remaining)
+
+            try:
+                event = await asyncio.wait_for(self.queue.get(), wait)
+            except asyncio.TimeoutError:
+                continue
+            last_sent = loop.time()
+
+            yield event
+            if stop_on_terminal and event.get("status") in TERMINAL_STATUSES:
+                return
+
+async def wait_for_terminal_status(hub: JobEventHub, job_id: str, timeout: float) -> Optional[str]:
+    """
+    Block until the job completes, fails or is cancelled, or `timeout` expires.
+
+    Returns the last known status (None if the job doesn't exist). Waits on the
+    job's pub/sub channel, so it costs no Redis round trips while blocked.
+    """
+    redis = hub.redis
+    status = await read_job_status(redis, job_id)
+    if status is None or status in TERMINAL_STATUSES or timeout <= 0:
+        return status
+
+    async with JobEventSubscription(hub, [job_channel(job_id)]) as subscription:
+        # The job may have finished between the first read and subscribing
+        status = await read_job_status(redis, job_id)
+        if status is None or status in TERMINAL_STATUSES:
+            return status
+
+        async for event in subscription.events(heartbeat=timeout, timeout=timeout, stop_on_terminal=True):
+            if event is not None:
+                status = event.get("status", status)
+    return status
+
+def format_sse(event: Optional[Dict[str, Any]]) -> str:
+    """Encode an event (or a heartbeat, for None) as a Server-Sent Events frame."""
+    if event is None:
+        return ": keep-alive\n\n"
+    return f"data: {json.dumps(event)}\n\n"
@@ -0,0 +1,64 @@
+from typing import Any, Dict, Optional
+from redis.asyncio import Redis
+from sqlalchemy import select
+from app.core.config import settings
+from app.core.database import read_session
+from app.core.logging import logger
+from app.models.job import Job
+from app.services.job_queries import DETAIL_COLUMNS, SUMMARY_COLUMNS
+from app.services.job_store import read_job_fields, touch_job_record, write_job_record
+
+# Job reads go through two tiers: the Redis record (hot, expiring) and the
+# jobs table, where the worker saves every job. Large results and snapshots
+# are blob references in either tier and are streamed from the blob store
+# by the endpoint. A job found only in Postgres is written back to Redis for
+# JOB_CACHE_COLD_TTL seconds, so polling it again doesn't hit the database.
+RECORD_COLUMNS = SUMMARY_COLUMNS + DETAIL_COLUMNS + (Job.user_id, Job.plan)
+
+def row_to_record(row: Any) -> Dict[str, Any]:
+    """A jobs row in the shape of a Redis job record."""
+    record = {k: v for k, v in row._mapping.items() if v is not None and k != "id"}
+    if "created_at" in record:
+        record["created_at"] = record["created_at"].isoformat()
+    return record
+
+def owned_by(record: Dict[str, Any], user_id: str) -> bool:
+    """Whether the user may see the job (jobs without a user_id predate per-user ownership)."""
+    return record.get("user_id") in (None, user_id)
+
+async def find_job(redis: Redis, job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    The job's record from Redis, else from Postgres (and cached in Redis).
+    None if neither has it or it isn't the user's.
+    """
+    record = await touch_job_record(redis, job_id, settings.JOB_CACHE_COLD_TTL, settings.JOB_CACHE_MAX_TTL)
+    if record:
+        return record if owned_by(record, user_id) else None
+
+    async with read_session() as session:
+        result = await session.execute(select(*RECORD_COLUMNS).where(Job.id == job_id))
+        row = result.first()
+    if row is None:
+        return None
+
+    record = row_to_record(row)
+    try:
+        await write_job_record(redis, job_id, record, ttl=settings.JOB_CACHE_COLD_TTL, publish=False)
+    except Exception as e:
+        logger.warning(f"Failed to cache job {job_id} in Redis: {e}")
+    return record if owned_by(record, user_id) else None
+
+async def find_job_status(redis: Redis, job_id: str, user_id: str) -> Optional[str]:
+    """
+    The job's status from Redis, else from Postgres, without loading its
+    results. None if neither has it or it isn't the user's.
+    """
+    fields = await read_job_fields(redis, job_id, ["status", "user_id"])
+    if not fields:
+        async with read_session() as session:
+            result = await session.execute(select(Job.status, Job.user_id).where(Job.id == job_id))
+            row = result.first()
+        if row is None:
+            return None
+        fields = dict(row._mapping)
+    return fields["status"] if owned_by(fields, user_id) else None
@@ -0,0 +1,88 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import Select, select, tuple_
+from app.models.job import Job
+
+# Columns listed in job history; the heavy ones are only loaded on request
+SUMMARY_COLUMNS = (Job.id, Job.url, Job.mode, Job.status, Job.error, Job.batch_id, Job.schedule_id, Job.created_at)
+DETAIL_COLUMNS = (Job.data, Job.snapshot, Job.timings)
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(created_at: datetime, job_id: str) -> str:
+    """Opaque cursor pointing just past a job in (created_at, id) descending order."""
+    raw = json.dumps([created_at.isoformat(), job_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, job_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(job_id)
+    except Exception:
+        raise InvalidCursor("Invalid cursor")
+
+def filter_jobs(
+    query: Select,
+    user_id: str,
+    status: Optional[str] = None,
+    mode: Optional[str] = None,
+    url_prefix: Optional[str] = None,
+    batch_id: Optional[str] = None,
+    schedule_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Select:
+    """
+    Restrict a job query to one user's jobs and the given filters. The user
+    and status conditions are served by the (user_id, created_at) and
+    (user_id, status) indexes. `since` is inclusive and `until` exclusive.
+    """
+    query = query.where(Job.user_id == user_id)
+    if status:
+        query = query.where(Job.status == status)
+    if mode:
+        query = query.where(Job.mode == mode)
+    if url_prefix:
+        query = query.where(Job.url.startswith(url_prefix, autoescape=True))
+    if batch_id:
+        query = query.where(Job.batch_id == batch_id)
+    if schedule_id:
+        query = query.where(Job.schedule_id == schedule_id)
+    if since:
+        query = query.where(Job.created_at >= since)
+    if until:
+        query = query.where(Job.created_at < until)
+    return query
+
+def history_query(
+    user_id: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    include_data: bool = False,
+    **filters,
+) -> Select:
+    """
+    One page of a user's jobs, newest first, by keyset pagination: the page
+    starts right after the cursor's (created_at, id), so each page is an index
+    range scan no matter how deep it is. Fetches one extra row to tell whether
+    there is a next page.
+    """
+    columns = SUMMARY_COLUMNS + (DETAIL_COLUMNS if include_data else ())
+    query = filter_jobs(select(*columns), user_id, **filters)
+    if cursor:
+        created_at, job_id = decode_cursor(cursor)
+        query = query.where(tuple_(Job.created_at, Job.id) < tuple_(created_at, job_id))
+    return query.order_by(Job.created_at.desc(), Job.id.desc()).limit(limit + 1)
+
+def history_page(rows: List[Any], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """The rows of a history_query as dicts, and the cursor for the next page (None on the last)."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return [dict(row._mapping) for row in rows], next_cursor
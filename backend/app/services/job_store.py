@@ -0,0 +1,240 @@
+import json
+import msgpack
+import zstandard
+from typing import Any, Dict, Iterable, List, Optional
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+from app.core.redis import lua_script
+
+JOB_TTL = 3600
+
+# Stored as plain hash fields so they can be read on their own (HGET/HMGET)
+SMALL_FIELDS = ("status", "url", "mode", "user_id", "created_at", "error", "schedule_id", "batch_id")
+# Everything else (data, snapshot, ...) is packed into one compressed field
+PAYLOAD_FIELD = "payload"
+# How many times the record was read through touch_job_record (not part of the record)
+READS_FIELD = "reads"
+
+# Reading a record pushes its expiry out to base_ttl * 2^reads seconds (at
+# most max_ttl) if that is later than the current one, so results that are
+# polled or revisited stay in Redis and the rest expire on schedule.
+# Returns the record as HGETALL did before the read: empty if it is
+# missing, false if it is a JSON string from before records were hashes.
+TOUCH_SCRIPT = """
+local kind = redis.call('TYPE', KEYS[1]).ok
+if kind == 'none' then
+    return {}
+elseif kind ~= 'hash' then
+    return false
+end
+local record = redis.call('HGETALL', KEYS[1])
+local reads = redis.call('HINCRBY', KEYS[1], ARGV[3], 1)
+local ttl = math.floor(math.min(tonumber(ARGV[2]), tonumber(ARGV[1]) * 2 ^ math.min(reads, 30)))
+if redis.call('TTL', KEYS[1]) < ttl then
+    redis.call('EXPIRE', KEYS[1], ttl)
+end
+return record
+"""
+_touch_script = lua_script(TOUCH_SCRIPT)
+
+# Sets fields ARGV[2..] (name, value, ...) only on an existing hash record,
+# giving it a TTL of ARGV[1] if it has none. Returns {user_id, batch_id},
+# 'missing' if the record expired, or 'legacy' for a JSON string record.
+UPDATE_SCRIPT = """
+local kind = redis.call('TYPE', KEYS[1]).ok
+if kind == 'none' then
+    return 'missing'
+elseif kind ~= 'hash' then
+    return 'legacy'
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+if redis.call('TTL', KEYS[1]) < 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return redis.call('HMGET', KEYS[1], 'user_id', 'batch_id')
+"""
+_update_script = lua_script(UPDATE_SCRIPT)
+
+# One-byte prefix on the payload field saying how it is encoded
+_RAW = b"m"   # msgpack
+_ZSTD = b"z"  # zstd-compressed msgpack
+# Below this size compression costs more CPU than it saves memory
+COMPRESS_MIN_BYTES = 256
+
+_compressor = zstandard.ZstdCompressor(level=3)
+_decompressor = zstandard.ZstdDecompressor()
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+def job_key(job_id: str) -> str:
+    return f"job:{job_id}"
+
+def batch_key(batch_id: str) -> str:
+    return f"batch:{batch_id}"
+
+# Pub/sub channels that status transitions are published on
+def job_channel(job_id: str) -> str:
+    return f"jobs:{job_id}"
+
+def user_channel(user_id: str) -> str:
+    return f"jobs:user:{user_id}"
+
+def batch_channel(batch_id: str) -> str:
+    return f"jobs:batch:{batch_id}"
+
+def event_channels(job_id: str, user_id: Optional[str] = None, batch_id: Optional[str] = None) -> List[str]:
+    channels = [job_channel(job_id)]
+    if user_id:
+        channels.append(user_channel(user_id))
+    if batch_id:
+        channels.append(batch_channel(batch_id))
+    return channels
+
+# Fields an event carries; watchers that want the result read the record
+EVENT_FIELDS = ("status", "batch_id")
+
+def _publish_event(pipe, job_id: str, event: Dict[str, Any]) -> None:
+    message = json.dumps({"job_id": job_id, **{k: event[k] for k in EVENT_FIELDS if event.get(k) is not None}})
+    for channel in event_channels(job_id, event.get("user_id"), event.get("batch_id")):
+        pipe.publish(channel, message)
+
+def encode_payload(payload: Dict[str, Any]) -> bytes:
+    packed = msgpack.packb(payload, use_bin_type=True)
+    if len(packed) < COMPRESS_MIN_BYTES:
+        return _RAW + packed
+    return _ZSTD + _compressor.compress(packed)
+
+def decode_payload(raw: bytes) -> Dict[str, Any]:
+    kind, body = raw[:1], raw[1:]
+    if kind == _ZSTD:
+        body = _decompressor.decompress(body)
+    return msgpack.unpackb(body, raw=False)
+
+def encode_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Split a job record into small hash fields plus one packed payload field."""
+    mapping = {}
+    payload = {}
+    for key, value in record.items():
+        if value is None:
+            continue
+        if key in SMALL_FIELDS:
+            mapping[key] = str(value)
+        else:
+            payload[key] = value
+    if payload:
+        mapping[PAYLOAD_FIELD] = encode_payload(payload)
+    return mapping
+
+def decode_record(mapping: Dict[bytes, bytes]) -> Dict[str, Any]:
+    record = {}
+    for key, value in mapping.items():
+        key = key.decode() if isinstance(key, bytes) else key
+        if key == READS_FIELD:
+            continue
+        if key == PAYLOAD_FIELD:
+            record.update(decode_payload(value))
+        else:
+            record[key] = value.decode() if isinstance(value, bytes) else value
+    return record
+
+async def write_job_record(
+    redis: Redis, job_id: str, record: Dict[str, Any], ttl: int = JOB_TTL, publish: bool = True
+) -> None:
+    """
+    Replace the job's Redis record and publish its status to the job's event
+    channels (unless `publish` is False, for records reloaded from Postgres).
+    """
+    key = job_key(job_id)
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.delete(key)
+        pipe.hset(key, mapping=encode_record(record))
+        pipe.expire(key, ttl)
+        if publish:
+            _publish_event(pipe, job_id, record)
+        await pipe.execute()
+
+async def update_job_fields(redis: Redis, job_id: str, ttl: int = JOB_TTL, **fields: Any) -> bool:
+    """
+    Overwrite some small fields of a record, keeping its TTL if it has one,
+    and publish the change to the job's event channels. A record that has
+    expired isn't recreated as a stub (False is returned); one still in the
+    old JSON format is rewritten as a hash.
+    """
+    fields = {k: v for k, v in fields.items() if v is not None}
+    if not fields:
+        return False
+    args = [ttl]
+    for name, value in fields.items():
+        args += [name, str(value)]
+    result = await _update_script(keys=[job_key(job_id)], args=args, client=redis)
+    if isinstance(result, bytes):
+        result = result.decode()
+    if result == "missing":
+        return False
+    if result == "legacy":
+        record = await read_job_record(redis, job_id)
+        if record is None:
+            return False
+        record.update(fields)
+        await write_job_record(redis, job_id, record, ttl)
+        return True
+
+    user_id, batch_id = result
+    event = dict(fields)
+    event["user_id"] = user_id.decode() if user_id else None
+    event["batch_id"] = batch_id.decode() if batch_id else None
+    async with redis.pipeline(transaction=False) as pipe:
+        _publish_event(pipe, job_id, event)
+        await pipe.execute()
+    return True
+
+async def read_job_record(redis: Redis, job_id: str) -> Optional[Dict[str, Any]]:
+    """Read the whole record, decoding the payload. None if it expired or never existed."""
+    key = job_key(job_id)
+    try:
+        mapping = await redis.hgetall(key)
+    except ResponseError:
+        # Record written as a JSON string before records became hashes
+        data = await redis.get(key)
+        return json.loads(data) if data else None
+    return decode_record(mapping) if mapping else None
+
+async def read_job_records(redis: Redis, job_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Read several whole records in one round trip, keyed by job id; missing ones are left out."""
+    async with redis.pipeline(transaction=False) as pipe:
+        for job_id in job_ids:
+            pipe.hgetall(job_key(job_id))
+        replies = await pipe.execute(raise_on_error=False)
+    records = {}
+    for job_id, mapping in zip(job_ids, replies):
+        if isinstance(mapping, ResponseError):
+            record = await read_job_record(redis, job_id)
+        else:
+            record = decode_record(mapping) if mapping else None
+        if record:
+            records[job_id] = record
+    return records
+
+async def touch_job_record(redis: Redis, job_id: str, base_ttl: int, max_ttl: int) -> Optional[Dict[str, Any]]:
+    """Read the whole record like read_job_record, extending its TTL by how often it is read (see TOUCH_SCRIPT)."""
+    raw = await _touch_script(keys=[job_key(job_id)], args=[base_ttl, max_ttl, READS_FIELD], client=redis)
+    if raw is None:
+        return await read_job_record(redis, job_id)
+    return decode_record(dict(zip(raw[::2], raw[1::2]))) if raw else None
+
+async def read_job_fields(redis: Redis, job_id: str, fields: Iterable[str]) -> Optional[Dict[str, Optional[str]]]:
+    """Read only some small fields, leaving the payload untouched in Redis."""
+    fields = list(fields)
+    key = job_key(job_id)
+    try:
+        values = await redis.hmget(key, fields)
+    except ResponseError:
+        record = await read_job_record(redis, job_id)
+        return {f: record.get(f) for f in fields} if record else None
+    if all(v is None for v in values):
+        return None
+    return {f: (v.decode() if isinstance(v, bytes) else v) for f, v in zip(fields, values)}
+
+async def read_job_status(redis: Redis, job_id: str) -> Optional[str]:
+    fields = await read_job_fields(redis, job_id, ["status"])
+    return fields["status"] if fields else None
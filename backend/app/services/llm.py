@@ -1,39 +1,72 @@
 import google.generativeai as genai
 from app.core.config import settings
-from typing import Dict, Any
+from app.core.tracing import span, record_count
+from typing import Dict, Any, Tuple
+import asyncio
 import json
+import re
 
 if settings.GEMINI_API_KEY:
     genai.configure(api_key=settings.GEMINI_API_KEY)
 
+async def _generate_gemini(prompt: str) -> Tuple[str, int, int]:
+    model = genai.GenerativeModel('gemini-2.0-flash')
+    # Use the async client so a slow response doesn't block the event loop
+    # and can be cancelled by the worker's LLM deadline
+    response = await model.generate_content_async(prompt)
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        return response.text, usage.prompt_token_count, usage.candidates_token_count
+    return response.text, 0, 0
+
+async def _generate_fake(prompt: str) -> Tuple[str, int, int]:
+    """
+    Offline stand-in for benchmarks and local runs (LLM_BACKEND=fake).
+
+    Waits FAKE_LLM_LATENCY seconds and answers with the page title and the
+    start of its text, so the rest of the pipeline sees a realistic result.
+    """
+    await asyncio.sleep(settings.FAKE_LLM_LATENCY)
+    title = re.search(r"<title[^>]*>(.*?)</title>", prompt, re.S | re.I)
+    text = re.sub(r"<[^>]+>", " ", prompt.split("HTML:", 1)[-1])
+    text = " ".join(text.split())
+    answer = json.dumps({"title": title.group(1).strip() if title else None, "summary": text[:200]})
+    # Roughly four characters per token
+    return answer, len(prompt) // 4, len(answer) // 4
+
 async def analyze_page(html_content: str, instruction: str) -> Dict[str, Any]:
-    if not settings.GEMINI_API_KEY:
+    if settings.LLM_BACKEND == "fake":
+        generate = _generate_fake
+    elif not settings.GEMINI_API_KEY:
         return {"error": "Gemini API key not configured"}
+    else:
+        generate = _generate_gemini
 
-    model = genai.GenerativeModel('gemini-2.0-flash')
-    
     # Truncate HTML to fit context window if necessary (simple approach)
-    truncated_html = html_content[:30000] 
-    
+    truncated_html = html_content[:30000]
+
     prompt = f"""
     You are a web scraping assistant. Extract data from the following HTML based on the user's instruction.
     Return ONLY a valid JSON object. Do not include markdown formatting.
-    
+
     Instruction: {instruction}
-    
+
     HTML:
     {truncated_html}
     """
-    
+
     try:
-        response = model.generate_content(prompt)
-        text = response.text.strip()
+        with span("llm"):
+            text, prompt_tokens, completion_tokens = await generate(prompt)
+        record_count("prompt_tokens", prompt_tokens)
+        record_count("completion_tokens", completion_tokens)
+        text = text.strip()
         # Clean up potential markdown code blocks
         if text.startswith("```json"):
             text = text[7:]
         if text.endswith("```"):
             text = text[:-3]
-            
+
         return json.loads(text)
     except Exception as e:
         return {"error": str(e)}
@@ -0,0 +1,140 @@
+import re
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.database import engine
+from app.core.logging import logger
+from app.core.plans import retention_days
+
+# In Postgres the jobs table is partitioned twice:
+#
+# jobs                     PARTITION BY LIST (plan)
+#   jobs_{plan}            PARTITION BY RANGE (created_at)
+#     jobs_{plan}_{YYYYMM} one month of one plan's jobs
+#
+# Each plan keeps its jobs for PLAN_RETENTION_DAYS[plan]. Once the newest
+# job a month partition can hold is that old, the whole partition is
+# dropped (or detached, for archiving) instead of deleting rows one by one.
+# Months are created JOB_PARTITION_PREMAKE_MONTHS ahead, so inserts never
+# find their partition missing.
+PLAN_NAME = re.compile(r"^[a-z][a-z0-9_]*$")
+LOCK_TIMEOUT = "5s" # Give up on a DDL rather than queue behind long queries
+
+def month_start(at: datetime) -> datetime:
+    return at.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def add_months(month: datetime, n: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + n
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+def _check_plan(plan: str) -> str:
+    # Plan names become table names and literals in DDL
+    if not PLAN_NAME.match(plan):
+        raise ValueError(f"Invalid plan name for a partition: {plan!r}")
+    return plan
+
+def plan_partition(plan: str) -> str:
+    return f"jobs_{_check_plan(plan)}"
+
+def month_partition(plan: str, month: datetime) -> str:
+    return f"{plan_partition(plan)}_{month:%Y%m}"
+
+def partition_month(plan: str, name: str) -> Optional[datetime]:
+    """The month a partition of `plan` holds, from its name (None if it isn't one of ours)."""
+    prefix = plan_partition(plan) + "_"
+    if not name.startswith(prefix):
+        return None
+    try:
+        return datetime.strptime(name[len(prefix):], "%Y%m")
+    except ValueError:
+        return None
+
+def create_plan_partition_sql(plan: str) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {plan_partition(plan)} PARTITION OF jobs "
+        f"FOR VALUES IN ('{plan}') PARTITION BY RANGE (created_at)"
+    )
+
+def create_month_partition_sql(plan: str, month: datetime) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {month_partition(plan, month)} PARTITION OF {plan_partition(plan)} "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+    )
+
+def partition_sql(plans: Iterable[str], first: datetime, last: datetime) -> List[str]:
+    """DDL creating each plan's partition and its months from `first` through `last`."""
+    statements = []
+    for plan in plans:
+        statements.append(create_plan_partition_sql(plan))
+        month = month_start(first)
+        while month <= last:
+            statements.append(create_month_partition_sql(plan, month))
+            month = add_months(month, 1)
+    return statements
+
+def expired_partitions(plan: str, names: Iterable[str], now: datetime) -> List[str]:
+    """Month partitions of `plan` whose every row is older than the plan's retention."""
+    cutoff = now - timedelta(days=retention_days(plan))
+    expired = []
+    for name in names:
+        month = partition_month(plan, name)
+        if month is not None and add_months(month, 1) <= cutoff:
+            expired.append(name)
+    return sorted(expired)
+
+async def _child_partitions(conn, parent: str) -> List[str]:
+    result = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :parent"
+        ),
+        {"parent": parent},
+    )
+    return [row[0] for row in result]
+
+async def ensure_job_partitions(now: Optional[datetime] = None) -> None:
+    """Create any missing plan and month partitions up to JOB_PARTITION_PREMAKE_MONTHS ahead."""
+    if engine.dialect.name != "postgresql":
+        return
+    now = now or datetime.utcnow()
+    last = add_months(month_start(now), settings.JOB_PARTITION_PREMAKE_MONTHS)
+    async with engine.begin() as conn:
+        await conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        for statement in partition_sql(settings.PLAN_RETENTION_DAYS, now, last):
+            await conn.execute(text(statement))
+
+async def maintain_job_partitions(ctx) -> List[str]:
+    """
+    Daily cron: premake upcoming months, then drop (or, with
+    JOB_PARTITION_DETACH_ONLY, detach) the months past their plan's
+    retention. Returns the partitions removed. Each removal is its own
+    short transaction, so one blocked partition doesn't hold up the rest.
+    """
+    if engine.dialect.name != "postgresql":
+        return []
+    now = datetime.utcnow()
+    await ensure_job_partitions(now)
+
+    removed = []
+    for plan in settings.PLAN_RETENTION_DAYS:
+        parent = plan_partition(plan)
+        async with engine.connect() as conn:
+            names = await _child_partitions(conn, parent)
+        for name in expired_partitions(plan, names, now):
+            if settings.JOB_PARTITION_DETACH_ONLY:
+                statement = f"ALTER TABLE {parent} DETACH PARTITION {name}"
+            else:
+                statement = f"DROP TABLE {name}"
+            try:
+                async with engine.begin() as conn:
+                    await conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+                    await conn.execute(text(statement))
+            except Exception as e:
+                logger.warning(f"Could not remove expired partition {name}, will retry: {e}")
+                continue
+            logger.info(f"{'Detached' if settings.JOB_PARTITION_DETACH_ONLY else 'Dropped'} expired partition {name}")
+            removed.append(name)
+    return removed
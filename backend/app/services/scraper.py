@@ -1,36 +1,95 @@
+import time
 import httpx
 from bs4 import BeautifulSoup
 from playwright.async_api import async_playwright
 from typing import Dict, Any, Optional
+from app.core.config import settings
+from app.core.metrics import BROWSERS_IN_USE
+from app.core.tracing import span, record_duration, record_count
 
-async def scrape_static(url: str, selectors: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
-    async with httpx.AsyncClient(follow_redirects=True) as client:
-        response = await client.get(url, headers={"User-Agent": "ScrapeFlow/1.0"})
-        response.raise_for_status()
-        html = response.text
-        
-        if not selectors:
-            return {"html": html}
-            
+class _HttpTimer:
+    """
+    httpx trace hook splitting a request into connect (DNS, TCP and TLS),
+    time to first byte and download time for the job trace.
+    """
+    def __init__(self):
+        self._started = {}
+
+    async def __call__(self, event_name: str, info: Dict[str, Any]) -> None:
+        # e.g. "connection.connect_tcp.started", "http11.receive_response_body.complete"
+        step, _, stage = event_name.rpartition(".")
+        step = step.split(".", 1)[-1]
+        now = time.perf_counter()
+        if stage == "started":
+            self._started[step] = now
+            return
+        if stage != "complete":
+            return
+        if step in ("connect_tcp", "connect_unix_socket", "start_tls"):
+            record_duration("connect", now - self._started.pop(step, now))
+        elif step == "receive_response_headers":
+            record_duration("ttfb", now - self._started.pop("send_request_headers", now))
+        elif step == "receive_response_body":
+            record_duration("download", now - self._started.pop(step, now))
+
+def extract_selectors(html: str, selectors: Dict[str, str]) -> Dict[str, Any]:
+    """Extract the text of the first element matching each CSS selector."""
+    with span("parse"):
         soup = BeautifulSoup(html, "html.parser")
         data = {}
         for key, selector in selectors.items():
             element = soup.select_one(selector)
             data[key] = element.get_text(strip=True) if element else None
-            
         return data
 
+async def fetch_static(url: str) -> str:
+    """Fetch the raw HTML of a page over plain HTTP."""
+    with span("fetch"):
+        async with httpx.AsyncClient(follow_redirects=True, timeout=settings.FETCH_TIMEOUT) as client:
+            response = await client.get(
+                url,
+                headers={"User-Agent": "ScrapeFlow/1.0"},
+                extensions={"trace": _HttpTimer()} # Kept across redirects
+            )
+            record_count("bytes_downloaded", len(response.content))
+            response.raise_for_status()
+            return response.text
+
+async def fetch_dynamic(url: str) -> str:
+    """Render a page in headless Chromium and return the resulting HTML."""
+    return (await scrape_dynamic(url))["html"]
+
+async def scrape_static(url: str, selectors: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    html = await fetch_static(url)
+
+    if not selectors:
+        return {"html": html}
+
+    return extract_selectors(html, selectors)
+
 async def scrape_dynamic(url: str, selectors: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    with span("render"), BROWSERS_IN_USE.track_inprogress():
+        return await _render(url, selectors)
+
+async def _render(url: str, selectors: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
         try:
             page = await browser.new_page()
-            await page.goto(url, wait_until="networkidle")
-            
+            # Playwright timeouts are in milliseconds
+            page.set_default_timeout(settings.RENDER_TIMEOUT * 1000)
+            response = await page.goto(url, wait_until="networkidle")
+            if response:
+                _record_navigation_timing(response.request.timing)
+                try:
+                    record_count("bytes_downloaded", len(await response.body()))
+                except Exception:
+                    pass # Body not retained (e.g. the page navigated away)
+
             if not selectors:
                 content = await page.content()
                 return {"html": content}
-            
+
             data = {}
             for key, selector in selectors.items():
                 try:
@@ -46,3 +105,18 @@ async def scrape_dynamic(url: str, selectors: Optional[Dict[str, str]] = None) -
         finally:
             await browser.close()
 
+def _record_navigation_timing(timing: Dict[str, float]) -> None:
+    """
+    Add the browser's resource timing for the main document to the job trace.
+
+    Values are milliseconds relative to the request start, -1 when not applicable
+    (e.g. no DNS lookup for a reused connection).
+    """
+    def between(start: str, end: str) -> float:
+        if timing.get(start, -1) < 0 or timing.get(end, -1) < 0:
+            return 0.0
+        return (timing[end] - timing[start]) / 1000
+
+    record_duration("connect", between("domainLookupStart", "connectEnd") or between("connectStart", "connectEnd"))
+    record_duration("ttfb", between("requestStart", "responseStart"))
+    record_duration("download", between("responseStart", "responseEnd"))
@@ -0,0 +1,84 @@
+import json
+from typing import Any, List, Optional
+from sqlalchemy import Select, cast, func
+from sqlalchemy.dialects.postgresql import JSONB, JSONPATH
+from sqlalchemy.sql.elements import ColumnElement
+from app.core.config import settings
+from app.core.database import engine
+from app.models.job import Job
+from app.services.job_queries import history_query
+
+# Result search runs in Postgres: jobs.data is JSONB with a GIN
+# (jsonb_path_ops) index serving containment and jsonpath predicates, and
+# jobs.search_vector holds the words of the result's text values, with its
+# own GIN index. Both are combined with the usual per-user history query,
+# so results are paged with the same keyset cursors.
+#
+# Results offloaded to the blob store only have a reference in jobs.data,
+# so JSON predicates don't see them; their text is still indexed, as the
+# worker builds search_vector before offloading.
+
+class InvalidSearch(ValueError):
+    pass
+
+def search_supported(bind: Optional[Any] = None) -> bool:
+    """Whether the database (`bind`, a session's engine or connection, else the app's engine) has full-text search."""
+    return (bind or engine).dialect.name == "postgresql"
+
+def result_text(data: Any, limit: Optional[int] = None) -> str:
+    """The text values of a result, depth first, joined by newlines and cut at `limit` characters."""
+    limit = settings.SEARCH_TEXT_MAX_CHARS if limit is None else limit
+    parts: List[str] = []
+    size = 0
+    stack = [data]
+    while stack and size < limit:
+        value = stack.pop()
+        if isinstance(value, str):
+            parts.append(value)
+            size += len(value) + 1
+        elif isinstance(value, dict):
+            stack.extend(reversed(list(value.values())))
+        elif isinstance(value, list):
+            stack.extend(reversed(value))
+    return "\n".join(parts)[:limit]
+
+def search_vector(data: Any, bind: Optional[Any] = None) -> Optional[ColumnElement]:
+    """SQL computing a result's search_vector for the database `bind`, or None where there is no full-text index."""
+    if not search_supported(bind):
+        return None
+    text = result_text(data)
+    return func.to_tsvector(settings.SEARCH_TEXT_CONFIG, text) if text else None
+
+def search_query(
+    user_id: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    include_data: bool = False,
+    q: Optional[str] = None,
+    jsonpath: Optional[str] = None,
+    contains: Optional[str] = None,
+    **filters,
+) -> Select:
+    """
+    A page of history_query narrowed by:
+
+    - q: web-search style text query ("price drop" -discount), against search_vector
+    - jsonpath: a jsonpath predicate on the result, e.g. `$.price < 20`
+    - contains: a JSON object the result must contain, e.g. {"in_stock": true}
+    """
+    query = history_query(user_id, limit, cursor, include_data, **filters)
+    if q:
+        query = query.where(
+            Job.search_vector.op("@@")(func.websearch_to_tsquery(settings.SEARCH_TEXT_CONFIG, q))
+        )
+    if jsonpath:
+        query = query.where(Job.data.op("@@")(cast(jsonpath, JSONPATH)))
+    if contains:
+        try:
+            value = json.loads(contains)
+        except ValueError:
+            raise InvalidSearch("contains must be a JSON object")
+        if not isinstance(value, dict):
+            raise InvalidSearch("contains must be a JSON object")
+        query = query.where(Job.data.op("@>")(cast(json.dumps(value), JSONB)))
+    return query
@@ -0,0 +1,229 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, read_session
+from app.core.logging import logger
+from app.models.stats import StatsRollup
+
+# Job counters are bumped when a job reaches a terminal status, so reading
+# stats never scans the jobs table. Each scope ("global" and "user:{id}")
+# has three kinds of Redis hash:
+#
+# stats:{scope}:all                 since the beginning
+# stats:{scope}:hour:{YYYYmmddHH}   expires after STATS_HOURLY_RETENTION_DAYS
+# stats:{scope}:day:{YYYYmmdd}      expires after STATS_DAILY_RETENTION_DAYS
+#
+# The same increments are added to stats:pending, which the flush_stats cron
+# moves into the stats_rollups table. The table is the durable copy, read
+# when Redis has lost a scope or a range is older than the Redis retention.
+# When a job creates a scope's all-time hash, the scope's rows in the table
+# are added to the new hashes, so Redis starts from the durable totals.
+STATS_FIELDS = ("jobs", "completed", "failed", "cancelled", "duration_ms", "bytes")
+STATS_PENDING_KEY = "stats:pending"
+STATS_FLUSHING_KEY = "stats:flushing"
+GRANULARITIES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+ALL_TIME = datetime(1970, 1, 1)
+
+def bucket_start(granularity: str, at: datetime) -> datetime:
+    if granularity == "hour":
+        return at.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return ALL_TIME
+
+def stats_key(scope: str, granularity: str, start: datetime = ALL_TIME) -> str:
+    if granularity == "hour":
+        return f"stats:{scope}:hour:{start:%Y%m%d%H}"
+    if granularity == "day":
+        return f"stats:{scope}:day:{start:%Y%m%d}"
+    return f"stats:{scope}:all"
+
+def user_scope(user_id: str) -> str:
+    return f"user:{user_id}"
+
+def _retention(granularity: str) -> Optional[timedelta]:
+    if granularity == "hour":
+        return timedelta(days=settings.STATS_HOURLY_RETENTION_DAYS)
+    if granularity == "day":
+        return timedelta(days=settings.STATS_DAILY_RETENTION_DAYS)
+    return None
+
+def job_stats_delta(status: str, duration: Optional[float] = None, bytes_downloaded: int = 0) -> Dict[str, int]:
+    delta = {"jobs": 1, status: 1}
+    if duration is not None:
+        delta["duration_ms"] = int(duration * 1000)
+    if bytes_downloaded:
+        delta["bytes"] = bytes_downloaded
+    return delta
+
+def _add_counts(pipe, scope: str, granularity: str, start: datetime, counts: Dict[str, int], at: datetime, pending: bool = True) -> None:
+    """Queue the increments of one Redis hash (and of stats:pending) on `pipe`."""
+    key = stats_key(scope, granularity, start)
+    for field, n in counts.items():
+        if n:
+            pipe.hincrby(key, field, n)
+            if pending:
+                pipe.hincrby(STATS_PENDING_KEY, f"{scope}|{granularity}|{start:%Y%m%d%H}|{field}", n)
+    retention = _retention(granularity)
+    if retention:
+        pipe.expire(key, int((start + GRANULARITIES[granularity] + retention - at).total_seconds()))
+
+async def record_job_stats(
+    redis: Redis,
+    user_id: Optional[str],
+    status: str,
+    duration: Optional[float] = None,
+    bytes_downloaded: int = 0,
+    at: Optional[datetime] = None,
+) -> None:
+    """
+    Count a job that just reached `status` (completed, failed or cancelled)
+    in every rollup it belongs to, in one round trip. Never raises: a lost
+    increment shouldn't fail the job.
+    """
+    at = at or datetime.utcnow()
+    delta = job_stats_delta(status, duration, bytes_downloaded)
+    scopes = ["global"] + ([user_scope(user_id)] if user_id else [])
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            for scope in scopes:
+                for granularity in ("all", *GRANULARITIES):
+                    _add_counts(pipe, scope, granularity, bucket_start(granularity, at), delta, at)
+            replies = await pipe.execute()
+        # The first reply of each scope is its all-time job count
+        per_scope = len(replies) // len(scopes)
+        for i, scope in enumerate(scopes):
+            if replies[i * per_scope] == delta["jobs"]:
+                await seed_scope(redis, scope, at)
+    except Exception as e:
+        logger.warning(f"Failed to record stats for a {status} job: {e}")
+
+async def seed_scope(redis: Redis, scope: str, at: datetime) -> None:
+    """
+    Add what stats_rollups has for a scope to its Redis hashes, which the
+    current job just created: jobs counted before Redis lost the scope, or
+    backfilled from the jobs table by migration 0005. Runs once per scope.
+    """
+    since = {g: bucket_start(g, at - _retention(g)) for g in GRANULARITIES}
+    async with read_session() as session:
+        result = await session.execute(select(StatsRollup).where(StatsRollup.scope == scope))
+        rows = [
+            r for r in result.scalars()
+            if r.granularity == "all" or (r.granularity in since and r.bucket_start >= since[r.granularity])
+        ]
+    if not rows:
+        return
+    async with redis.pipeline(transaction=False) as pipe:
+        for r in rows:
+            counts = {f: getattr(r, f) or 0 for f in STATS_FIELDS}
+            _add_counts(pipe, scope, r.granularity, r.bucket_start, counts, at, pending=False)
+        await pipe.execute()
+
+async def flush_stats(ctx) -> int:
+    """
+    Cron job adding the pending increments to stats_rollups in one statement.
+    Returns the number of rows touched.
+
+    The pending hash is renamed before it is read, so increments made during
+    the flush go to a new one. A flush that fails leaves stats:flushing in
+    place, and the next run retries it.
+    """
+    redis = ctx["redis"]
+    if not await redis.exists(STATS_FLUSHING_KEY):
+        try:
+            await redis.rename(STATS_PENDING_KEY, STATS_FLUSHING_KEY)
+        except Exception:
+            return 0 # Nothing pending
+
+    rows: Dict[Tuple[str, str, datetime], Dict[str, int]] = defaultdict(lambda: dict.fromkeys(STATS_FIELDS, 0))
+    for field, value in (await redis.hgetall(STATS_FLUSHING_KEY)).items():
+        field = field.decode() if isinstance(field, bytes) else field
+        scope, granularity, start, name = field.rsplit("|", 3)
+        if name in STATS_FIELDS:
+            rows[(scope, granularity, datetime.strptime(start, "%Y%m%d%H"))][name] += int(value)
+
+    if rows:
+        stmt = insert(StatsRollup).values([
+            {"scope": scope, "granularity": granularity, "bucket_start": start, **counts}
+            for (scope, granularity, start), counts in rows.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StatsRollup.scope, StatsRollup.granularity, StatsRollup.bucket_start],
+            set_={f: getattr(StatsRollup, f) + getattr(stmt.excluded, f) for f in STATS_FIELDS},
+        )
+        async with AsyncSessionLocal() as session:
+            await session.execute(stmt)
+            await session.commit()
+
+    await redis.delete(STATS_FLUSHING_KEY)
+    return len(rows)
+
+def summarize(counts: Dict[str, int]) -> Dict[str, Any]:
+    """Derived figures for one set of counters."""
+    finished = counts.get("completed", 0) + counts.get("failed", 0)
+    jobs = counts.get("jobs", 0)
+    return {
+        "jobs": jobs,
+        "completed": counts.get("completed", 0),
+        "failed": counts.get("failed", 0),
+        "cancelled": counts.get("cancelled", 0),
+        "success_rate": round(counts.get("completed", 0) / jobs * 100, 1) if jobs else 0.0,
+        "avg_duration_ms": round(counts.get("duration_ms", 0) / finished, 1) if finished else None,
+        "bytes": counts.get("bytes", 0),
+    }
+
+def _decode(raw: Dict) -> Dict[str, int]:
+    return {(k.decode() if isinstance(k, bytes) else k): int(v) for k, v in raw.items()}
+
+async def _read_redis(redis: Redis, scope: str, granularity: str, starts: List[datetime]) -> Optional[Tuple[Dict, List[Dict]]]:
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.hgetall(stats_key(scope, "all"))
+        for start in starts:
+            pipe.hgetall(stats_key(scope, granularity, start))
+        replies = await pipe.execute()
+    if not replies[0]:
+        return None # Never counted, or Redis lost it
+    return _decode(replies[0]), [_decode(r) for r in replies[1:]]
+
+async def _read_table(scope: str, granularity: str, starts: List[datetime]) -> Tuple[Dict, List[Dict]]:
+    async with read_session() as session:
+        result = await session.execute(
+            select(StatsRollup)
+            .where(StatsRollup.scope == scope)
+            .where(
+                (StatsRollup.granularity == "all")
+                | ((StatsRollup.granularity == granularity) & (StatsRollup.bucket_start >= starts[0]))
+            )
+        )
+        rows = {(r.granularity, r.bucket_start): {f: getattr(r, f) or 0 for f in STATS_FIELDS} for r in result.scalars()}
+    return rows.get(("all", ALL_TIME), {}), [rows.get((granularity, start), {}) for start in starts]
+
+async def read_stats(redis: Redis, scope: str, granularity: str, buckets: int) -> Dict[str, Any]:
+    """
+    Totals and the last `buckets` hours or days of a scope, oldest first.
+    Costs one Redis round trip (or one indexed query) whatever the job count.
+    """
+    now = datetime.utcnow()
+    step = GRANULARITIES[granularity]
+    last = bucket_start(granularity, now)
+    starts = [last - step * i for i in reversed(range(buckets))]
+
+    result = None
+    if now - starts[0] < _retention(granularity):
+        try:
+            result = await _read_redis(redis, scope, granularity, starts)
+        except Exception as e:
+            logger.warning(f"Stats read from Redis failed, using the rollup table: {e}")
+    if result is None:
+        result = await _read_table(scope, granularity, starts)
+
+    totals, series = result
+    return {
+        **summarize(totals),
+        "granularity": granularity,
+        "series": [{"bucket": start.isoformat(), **summarize(counts)} for start, counts in zip(starts, series)],
+    }
@@ -0,0 +1,213 @@
+import asyncio
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+from redis.asyncio import Redis
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, read_session
+from app.core.logging import logger
+from app.core.redis import lua_script
+from app.models.api_key import ApiKey, ApiKeyUsage
+
+# Usage is metered per API key and UTC day in Redis, then added to Postgres
+# (api_key_usage rows and api_keys.usage_count) in bulk by the flush_usage cron.
+#
+# usage:pending:{api_key_id}  hash of "{day}:{counter}" -> delta not yet in Postgres
+# usage:dirty                 set of key ids with a pending hash
+USAGE_COUNTERS = ("requests", "static_jobs", "dynamic_jobs", "llm_tokens")
+USAGE_DIRTY_KEY = "usage:dirty"
+USAGE_PENDING_PREFIX = "usage:pending:"
+
+# Takes up to ARGV[1] dirty keys and returns {id, fields, id, fields, ...},
+# deleting what it returns so increments after this point go to a new hash
+DRAIN_SCRIPT = """
+local ids = redis.call('SPOP', KEYS[1], ARGV[1])
+local out = {}
+for _, id in ipairs(ids) do
+    local key = ARGV[2] .. id
+    out[#out + 1] = id
+    out[#out + 1] = redis.call('HGETALL', key)
+    redis.call('DEL', key)
+end
+return out
+"""
+_drain_script = lua_script(DRAIN_SCRIPT)
+
+def usage_pending_key(api_key_id: str) -> str:
+    return f"{USAGE_PENDING_PREFIX}{api_key_id}"
+
+def _today() -> str:
+    return datetime.utcnow().date().isoformat()
+
+async def record_usage(redis: Redis, deltas: Dict[Tuple[str, str], int], day: Optional[str] = None) -> None:
+    """Add {(api_key_id, counter): n} to the pending counters in one round trip."""
+    if not deltas:
+        return
+    day = day or _today()
+    async with redis.pipeline(transaction=False) as pipe:
+        for (api_key_id, counter), n in deltas.items():
+            pipe.hincrby(usage_pending_key(api_key_id), f"{day}:{counter}", n)
+        pipe.sadd(USAGE_DIRTY_KEY, *{api_key_id for api_key_id, _ in deltas})
+        await pipe.execute()
+
+def job_usage(api_key_id: str, dynamic: bool, trace: Dict) -> Dict[Tuple[str, str], int]:
+    """Usage of one finished job, from its options and timing breakdown."""
+    usage = {(api_key_id, "dynamic_jobs" if dynamic else "static_jobs"): 1}
+    tokens = trace.get("prompt_tokens", 0) + trace.get("completion_tokens", 0)
+    if tokens:
+        usage[(api_key_id, "llm_tokens")] = tokens
+    return usage
+
+class UsageBuffer:
+    """
+    Per-process buffer of API request counts, written to Redis every
+    USAGE_BUFFER_INTERVAL so authenticated requests don't pay a round trip each.
+    """
+    def __init__(self):
+        self._counts: Counter = Counter()
+
+    def add(self, api_key_id: str, counter: str = "requests", n: int = 1) -> None:
+        self._counts[(api_key_id, counter)] += n
+
+    async def flush(self, redis: Redis) -> None:
+        counts, self._counts = self._counts, Counter()
+        try:
+            await record_usage(redis, counts)
+        except Exception as e:
+            logger.warning(f"Failed to write usage counters, retrying later: {e}")
+            self._counts.update(counts)
+
+    async def run(self, redis: Redis, interval: Optional[float] = None) -> None:
+        interval = settings.USAGE_BUFFER_INTERVAL if interval is None else interval
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await self.flush(redis)
+        finally:
+            # Don't drop the last interval's counts on shutdown
+            await self.flush(redis)
+
+def _parse_pending(fields: Iterable) -> Dict[Tuple[str, str], int]:
+    """{(day, counter): delta} from a flat HGETALL reply or a decoded mapping."""
+    if isinstance(fields, dict):
+        items = fields.items()
+    else:
+        fields = list(fields)
+        items = zip(fields[::2], fields[1::2])
+    parsed = {}
+    for field, value in items:
+        field = field.decode() if isinstance(field, bytes) else field
+        day, _, counter = field.partition(":")
+        if counter in USAGE_COUNTERS:
+            parsed[(day, counter)] = int(value)
+    return parsed
+
+async def _write_usage(drained: Dict[str, Dict[Tuple[str, str], int]]) -> None:
+    rows: Dict[Tuple[str, str], Dict[str, int]] = defaultdict(lambda: dict.fromkeys(USAGE_COUNTERS, 0))
+    for api_key_id, deltas in drained.items():
+        for (day, counter), n in deltas.items():
+            rows[(api_key_id, day)][counter] += n
+
+    stmt = insert(ApiKeyUsage).values([
+        {"api_key_id": api_key_id, "day": date.fromisoformat(day), **counts}
+        for (api_key_id, day), counts in rows.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ApiKeyUsage.api_key_id, ApiKeyUsage.day],
+        set_={c: getattr(ApiKeyUsage, c) + getattr(stmt.excluded, c) for c in USAGE_COUNTERS},
+    )
+
+    request_deltas = [
+        {"key_id": api_key_id, "delta": sum(n for (_, c), n in deltas.items() if c == "requests")}
+        for api_key_id, deltas in drained.items()
+    ]
+    request_deltas = [d for d in request_deltas if d["delta"]]
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(stmt)
+        if request_deltas:
+            table = ApiKey.__table__
+            await session.execute(
+                update(table)
+                .where(table.c.id == bindparam("key_id"))
+                .values(usage_count=func.coalesce(table.c.usage_count, 0) + bindparam("delta")),
+                request_deltas,
+            )
+        await session.commit()
+
+async def flush_usage(ctx) -> int:
+    """
+    Cron job moving the pending Redis counters into Postgres, a batch of keys
+    per statement. Returns the number of keys flushed.
+
+    A batch is removed from Redis before it is written; if the write fails
+    the deltas are put back. A worker killed in between loses that batch,
+    at most a minute of usage for those keys.
+    """
+    redis = ctx["redis"]
+    flushed = 0
+    while True:
+        raw = await _drain_script(keys=[USAGE_DIRTY_KEY], args=[settings.USAGE_FLUSH_BATCH, USAGE_PENDING_PREFIX], client=redis)
+        if not raw:
+            break
+        drained = {}
+        for api_key_id, fields in zip(raw[::2], raw[1::2]):
+            api_key_id = api_key_id.decode() if isinstance(api_key_id, bytes) else api_key_id
+            deltas = _parse_pending(fields)
+            if deltas:
+                drained[api_key_id] = deltas
+
+        if drained:
+            try:
+                await _write_usage(drained)
+            except Exception:
+                logger.exception(f"Failed to flush usage for {len(drained)} keys, requeueing")
+                for api_key_id, deltas in drained.items():
+                    by_day = defaultdict(dict)
+                    for (day, counter), n in deltas.items():
+                        by_day[day][(api_key_id, counter)] = n
+                    for day, day_deltas in by_day.items():
+                        await record_usage(redis, day_deltas, day=day)
+                raise
+            flushed += len(drained)
+
+        if len(raw) // 2 < settings.USAGE_FLUSH_BATCH:
+            break
+
+    if flushed:
+        logger.info(f"Flushed usage for {flushed} API keys")
+    return flushed
+
+async def get_usage(redis: Redis, api_key: ApiKey, days: int) -> Dict:
+    """
+    Usage of one key: all-time requests and a daily breakdown for the last
+    `days` days, adding the counters not yet flushed to the flushed rows.
+    """
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    totals: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(USAGE_COUNTERS, 0))
+
+    async with read_session() as session:
+        result = await session.execute(
+            select(ApiKeyUsage)
+            .where(ApiKeyUsage.api_key_id == api_key.id)
+            .where(ApiKeyUsage.day >= since)
+        )
+        for row in result.scalars():
+            for counter in USAGE_COUNTERS:
+                totals[row.day.isoformat()][counter] += getattr(row, counter) or 0
+
+    pending = _parse_pending(await redis.hgetall(usage_pending_key(api_key.id)))
+    pending_requests = 0
+    for (day, counter), n in pending.items():
+        if counter == "requests":
+            pending_requests += n
+        if day >= since.isoformat():
+            totals[day][counter] += n
+
+    return {
+        "api_key_id": api_key.id,
+        "usage_count": (api_key.usage_count or 0) + pending_requests,
+        "days": [{"day": day, **totals[day]} for day in sorted(totals, reverse=True)],
+    }
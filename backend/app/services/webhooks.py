@@ -0,0 +1,96 @@
+import json
+import time
+import hmac
+import hashlib
+import httpx
+from typing import Any, Dict, List
+from redis.asyncio import Redis
+from sqlalchemy import select
+from app.core.cache import TTLCache
+from app.core.metrics import record_cache_lookup, WEBHOOK_DELIVERY_SECONDS
+from app.core.database import AsyncSessionLocal
+from app.models.webhook import Webhook
+from app.core.logging import logger, log_webhook_dispatched
+
+# Channel the API publishes a user_id on whenever that user's webhooks change
+WEBHOOK_INVALIDATION_CHANNEL = "webhooks:invalidate"
+
+async def invalidate_webhook_subscriptions(redis: Redis, user_id: str) -> None:
+    """Tell every worker to drop its cached subscriptions for this user."""
+    try:
+        await redis.publish(WEBHOOK_INVALIDATION_CHANNEL, user_id)
+    except Exception as e:
+        # Workers fall back to the cache TTL if the message is lost
+        logger.warning(f"Failed to publish webhook invalidation for {user_id}: {e}")
+
+class WebhookSubscriptionCache:
+    """
+    Per-user cache of webhook subscriptions, kept in worker memory.
+
+    Entries are dropped on pub/sub invalidation; the TTL only bounds staleness
+    if an invalidation message is missed.
+    """
+    def __init__(self, maxsize: int = 10000, ttl: float = 600.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, user_id: str) -> List[Dict[str, Any]]:
+        webhooks = self._cache.get(user_id)
+        record_cache_lookup("webhook_subscriptions", webhooks is not None)
+        if webhooks is not None:
+            return webhooks
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(Webhook).where(Webhook.user_id == user_id))
+            webhooks = [
+                {"id": w.id, "url": w.url, "events": w.events or [], "secret": w.secret}
+                for w in result.scalars().all()
+            ]
+
+        self._cache.set(user_id, webhooks)
+        return webhooks
+
+    async def has_subscribers(self, user_id: str, event: str) -> bool:
+        return any(event in w["events"] for w in await self.get(user_id))
+
+    def invalidate(self, user_id: str) -> None:
+        self._cache.pop(user_id)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+async def deliver_webhooks(webhooks: List[Dict[str, Any]], payload: Dict[str, Any]) -> None:
+    """Sign and POST the payload to every webhook subscribed to its event."""
+    event = payload["event"]
+    job_id = payload.get("job_id")
+    payload_json = json.dumps(payload)
+
+    async with httpx.AsyncClient() as client:
+        for webhook in webhooks:
+            if event not in webhook["events"]:
+                continue
+
+            # Sign payload
+            signature = hmac.new(
+                webhook["secret"].encode(),
+                payload_json.encode(),
+                hashlib.sha256
+            ).hexdigest()
+
+            start = time.perf_counter()
+            try:
+                await client.post(
+                    webhook["url"],
+                    content=payload_json,
+                    headers={
+                        "Content-Type": "application/json",
+                        "X-ScraPy-Signature": signature,
+                        "X-ScraPy-Event": event
+                    },
+                    timeout=10.0
+                )
+                WEBHOOK_DELIVERY_SECONDS.labels("success").observe(time.perf_counter() - start)
+                log_webhook_dispatched(job_id, webhook["url"], True)
+            except Exception as e:
+                WEBHOOK_DELIVERY_SECONDS.labels("failure").observe(time.perf_counter() - start)
+                logger.error(f"Failed to send webhook to {webhook['url']}: {e}")
+                log_webhook_dispatched(job_id, webhook["url"], False)
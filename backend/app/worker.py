@@ -1,184 +1,606 @@
 import asyncio
-import json
-import httpx
-import hmac
-import hashlib
-from arq import create_pool
+import time
+import uuid
+from arq import Retry, create_pool, cron
 from arq.connections import RedisSettings
 from app.core.config import settings
-from app.services.scraper import scrape_static, scrape_dynamic
+from app.services.scraper import scrape_static, scrape_dynamic, fetch_static, fetch_dynamic, extract_selectors
+from app.services.blobstore import offload_result, load_result, store_blob
+from app.services.job_store import write_job_record, read_job_status, update_job_fields
+from app.services.change_detection import content_hash, diff_fields, has_changes
 from app.services.llm import analyze_page
+from app.services.usage import flush_usage, job_usage, record_usage
+from app.services.stats import flush_stats, record_job_stats
+from app.services.partitions import ensure_job_partitions, maintain_job_partitions
+from app.services.search import search_vector
+from app.services.admission import record_job_finished, run_low_priority_promoter
+from app.services.fair_queue import release_job, run_dispatcher, try_dispatch
+from app.core.plans import resolve_plan
 from app.core.database import AsyncSessionLocal
 from app.models.job import Job
-from app.models.webhook import Webhook
+from app.models.schedule import Schedule
+from app.services.webhooks import (
+    WebhookSubscriptionCache,
+    WEBHOOK_INVALIDATION_CHANNEL,
+    deliver_webhooks,
+)
+from app.core.cache import listen_for_invalidations
+from app.core.metrics import observe_phase, start_metrics_server, JOB_SECONDS, JOBS_IN_FLIGHT
+from app.core.concurrency import ConcurrencyController, job_class
+from app.core.tracing import JobTrace, start_trace, span
+from app.core.errors import PhaseTimeoutException
 from sqlalchemy import select, update
-from datetime import datetime
-from app.core.logging import logger, log_job_completed, log_job_failed, log_webhook_dispatched
+from datetime import datetime, timedelta, timezone
+from app.core.logging import logger, log_job_completed, log_job_failed
 
-async def dispatch_webhook(ctx, job_id: str, user_id: str):
+async def dispatch_webhook(ctx, job_id: str, user_id: str, payload: dict):
     """
     Task to dispatch webhooks for a completed job.
+
+    The payload is built by scrape_task from the job data it already has in memory,
+    so no database round trip is needed here.
     """
-    async with AsyncSessionLocal() as session:
-        # Fetch job details
-        result = await session.execute(select(Job).where(Job.id == job_id))
-        job = result.scalar_one_or_none()
-        
-        if not job:
-            return
+    webhooks = await ctx["webhook_cache"].get(user_id)
+    if not webhooks:
+        return
 
-        # Fetch user's webhooks
-        result = await session.execute(select(Webhook).where(Webhook.user_id == user_id))
-        webhooks = result.scalars().all()
-        
-        if not webhooks:
-            return
+    await deliver_webhooks(webhooks, payload)
 
-        payload = {
-            "event": "job.completed",
-            "job_id": job.id,
-            "url": job.url,
-            "status": job.status,
-            "data": job.data,
-            "created_at": job.created_at.isoformat(),
-            "completed_at": datetime.utcnow().isoformat()
-        }
-        
-        payload_json = json.dumps(payload)
-        
-        async with httpx.AsyncClient() as client:
-            for webhook in webhooks:
-                if "job.completed" in webhook.events:
-                    # Sign payload
-                    signature = hmac.new(
-                        webhook.secret.encode(),
-                        payload_json.encode(),
-                        hashlib.sha256
-                    ).hexdigest()
-                    
-                    try:
-                        await client.post(
-                            webhook.url,
-                            content=payload_json,
-                            headers={
-                                "Content-Type": "application/json",
-                                "X-ScraPy-Signature": signature,
-                                "X-ScraPy-Event": "job.completed"
-                            },
-                            timeout=10.0
-                        )
-                        log_webhook_dispatched(job_id, webhook.url, True)
-                    except Exception as e:
-                        logger.error(f"Failed to send webhook to {webhook.url}: {e}")
-                        log_webhook_dispatched(job_id, webhook.url, False)
+async def run_phase(phase: str, awaitable, timeout: float):
+    """
+    Await one phase of a job under its own deadline.
+
+    On timeout the awaitable is cancelled, so its cleanup (closing the browser,
+    the HTTP client or the DB session) runs before the job is marked failed.
+    """
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise PhaseTimeoutException(phase, timeout)
+
+def job_key(job_id: str, plan: str, created_at: datetime):
+    """Match one job by its full primary key, which lets Postgres prune to its partition."""
+    return (Job.id == job_id) & (Job.plan == plan) & (Job.created_at == created_at)
 
-async def scrape_task(ctx, job_id: str, url: str, mode: str, selectors: dict = None, instruction: str = None, options: dict = None, user_id: str = None):
+def start_job_trace(ctx, submitted_at: float = None) -> JobTrace:
+    """
+    Start the timing breakdown of the current job, beginning with its time in
+    the queue: since submission (user queue and low-priority lane included)
+    when the job carries submitted_at, else since arq's enqueue.
+    """
+    trace = start_trace()
+    if submitted_at:
+        trace.add_duration("queue_wait", max(time.time() - submitted_at, 0))
+    elif ctx.get("enqueue_time"):
+        trace.add_duration("queue_wait", max((datetime.now(timezone.utc) - ctx["enqueue_time"]).total_seconds(), 0))
+    return trace
+
+async def meter_job(ctx, api_key_id: str, dynamic: bool, trace: JobTrace):
+    """Count a finished job against the API key it was submitted with; never fails the job."""
+    if not api_key_id:
+        return
+    try:
+        await record_usage(ctx["redis"], job_usage(api_key_id, dynamic, trace.to_dict()))
+    except Exception as e:
+        logger.warning(f"Failed to record usage for API key {api_key_id}: {e}")
+
+async def scrape_task(ctx, job_id: str, url: str, mode: str, selectors: dict = None, instruction: str = None, options: dict = None, user_id: str = None, batch_id: str = None, api_key_id: str = None, plan: str = None, submitted_at: float = None):
+    """
+    Run a scrape job once its class (static or dynamic) has a free slot in
+    this worker; if none frees up within ADAPTIVE_SLOT_WAIT, put the job
+    back in the queue for another worker.
+    """
+    args = dict(
+        job_id=job_id, url=url, mode=mode, selectors=selectors, instruction=instruction, options=options,
+        user_id=user_id, batch_id=batch_id, api_key_id=api_key_id, plan=plan, submitted_at=submitted_at,
+    )
+    controller = ctx.get("concurrency")
+    if controller is None:
+        return await run_scrape_task(ctx, **args)
+
+    limiter = controller.limiter(job_class(options))
+    # After ADAPTIVE_MAX_DEFERRALS the job runs here even over the limit
+    deferrals_left = ctx.get("job_try", 1) <= settings.ADAPTIVE_MAX_DEFERRALS
+    if not await limiter.acquire(settings.ADAPTIVE_SLOT_WAIT, force=not deferrals_left):
+        # Still dispatched as far as fair scheduling goes (see on_job_end)
+        ctx["deferred"] = True
+        raise Retry(defer=1)
+
+    started, status = time.perf_counter(), None
+    try:
+        status = await run_scrape_task(ctx, **args)
+    finally:
+        # Cancelled jobs (status None) say nothing about load
+        await limiter.release(time.perf_counter() - started if status else None, status == "failed")
+
+async def run_scrape_task(ctx, job_id: str, url: str, mode: str, selectors: dict = None, instruction: str = None, options: dict = None, user_id: str = None, batch_id: str = None, api_key_id: str = None, plan: str = None, submitted_at: float = None):
+    """The scrape job itself. Returns its final status, or None if it was cancelled before starting."""
     logger.info(f"Starting scrape job {job_id} for {url} in {mode} mode")
     start_time = datetime.utcnow()
+    trace = start_job_trace(ctx, submitted_at)
+
+    # The job may have been cancelled while it was still queued
+    if await read_job_status(ctx["redis"], job_id) == "cancelled":
+        logger.info(f"Job {job_id} was cancelled before it started")
+        return
     
-    # Create job in DB if it doesn't exist, update status to processing
+    # Create job in DB if it doesn't exist, update status to processing.
+    # Updates name the full key (id, plan, created_at) so they only touch
+    # the job's own partition.
+    plan = resolve_plan(plan)
     async with AsyncSessionLocal() as session:
-        existing_job = await session.get(Job, job_id)
+        existing = await session.execute(
+            select(Job.plan, Job.created_at).where(Job.id == job_id)
+        )
+        existing_job = existing.first()
         if not existing_job:
+            created_at = start_time
             new_job = Job(
                 id=job_id,
+                plan=plan,
+                created_at=created_at,
                 url=url,
                 mode=mode,
-                status="processing"
+                status="processing",
+                user_id=user_id,
+                batch_id=batch_id
             )
             session.add(new_job)
         else:
+            plan, created_at = existing_job
             await session.execute(
-                update(Job).where(Job.id == job_id).values(status="processing")
+                update(Job).where(job_key(job_id, plan, created_at)).values(status="processing")
             )
         await session.commit()
 
+    # Let clients watching this job know it has started
+    await update_job_fields(ctx["redis"], job_id, status="processing")
+
+    # Rendering with a browser gets its own (longer) deadline than a plain fetch
+    dynamic = bool(options and options.get("renderJs"))
+    if dynamic:
+        fetch, fetch_phase, fetch_timeout = scrape_dynamic, "render", settings.RENDER_TIMEOUT
+    else:
+        fetch, fetch_phase, fetch_timeout = scrape_static, "fetch", settings.FETCH_TIMEOUT
+
+    want_snapshot = bool(options and options.get("snapshot"))
+    html_content = None
+
     try:
-        # 1. Scrape Content
-        # 1. Scrape & Extract
-        if mode == "guided" and selectors:
-            if options and options.get("renderJs"):
-                data = await scrape_dynamic(url, selectors)
+        async with asyncio.timeout(settings.JOB_TIMEOUT):
+            # 1. Scrape & Extract
+            if mode == "guided" and selectors and not want_snapshot:
+                data = await run_phase(fetch_phase, fetch(url, selectors), fetch_timeout)
             else:
-                data = await scrape_static(url, selectors)
-        
-        elif mode == "smart" and instruction:
-            # For smart mode, we need the raw HTML first
-            if options and options.get("renderJs"):
-                result = await scrape_dynamic(url)
-            else:
-                result = await scrape_static(url)
-            
-            html_content = result.get("html", "")
-            data = await analyze_page(html_content, instruction)
-            
-        else:
-            # Default: just return title and meta description using LLM (or could be simple soup)
-            if options and options.get("renderJs"):
-                result = await scrape_dynamic(url)
-            else:
-                result = await scrape_static(url)
-                
-            html_content = result.get("html", "")
-            data = await analyze_page(html_content, "Extract the page title and main summary.")
+                # Smart mode, the default and snapshots need the raw HTML first
+                result = await run_phase(fetch_phase, fetch(url), fetch_timeout)
+                html_content = result.get("html", "")
+
+                if mode == "guided" and selectors:
+                    data = extract_selectors(html_content, selectors)
+                else:
+                    if mode == "smart" and instruction:
+                        prompt = instruction
+                    else:
+                        # Default: just return title and meta description using LLM
+                        prompt = "Extract the page title and main summary."
+                    data = await run_phase("llm", analyze_page(html_content, prompt), settings.LLM_TIMEOUT)
+
+            # 2. Save Results
+            async def persist():
+                with span("persist"):
+                    # Large results and snapshots go to the blob store; the DB row
+                    # and the Redis record only hold references to them
+                    stored_data = await offload_result(data)
+                    snapshot = None
+                    if want_snapshot:
+                        snapshot = await store_blob(html_content.encode(), "text/html; charset=utf-8")
+
+                    with observe_phase("db"):
+                        async with AsyncSessionLocal() as session:
+                            await session.execute(
+                                update(Job).where(job_key(job_id, plan, created_at)).values(
+                                    status="completed",
+                                    data=stored_data,
+                                    search_vector=search_vector(data, session.bind),
+                                    snapshot=snapshot,
+                                    # Everything but the write itself
+                                    timings=trace.to_dict()
+                                )
+                            )
+                            await session.commit()
 
-        # 3. Save Results
+                # Update Redis so API sees the change immediately
+                await write_job_record(ctx["redis"], job_id, {
+                    "status": "completed",
+                    "url": url,
+                    "mode": mode,
+                    "data": stored_data,
+                    "snapshot": snapshot,
+                    "timings": trace.to_dict(),
+                    "user_id": user_id,
+                    "batch_id": batch_id,
+                    "created_at": start_time.isoformat() # Approximate
+                })
+
+            await run_phase("persist", persist(), settings.PERSIST_TIMEOUT)
+
+    except asyncio.CancelledError:
+        # Aborted through DELETE /scrape/{job_id}; the API records the cancelled
+        # status. Browser pages and connections were released as the phase unwound.
+        logger.info(f"Job {job_id} cancelled")
+        raise
+
+    except Exception as e:
+        if isinstance(e, TimeoutError):
+            error_msg = f"Job exceeded its {settings.JOB_TIMEOUT:g}s deadline"
+        else:
+            error_msg = str(e)
+        logger.error(f"Job {job_id} failed: {error_msg}")
+        log_job_failed(job_id, error_msg)
+        duration = (datetime.utcnow() - start_time).total_seconds()
+        JOB_SECONDS.labels(mode, "failed").observe(duration)
         async with AsyncSessionLocal() as session:
             await session.execute(
-                update(Job).where(Job.id == job_id).values(
-                    status="completed",
-                    data=data
+                update(Job).where(job_key(job_id, plan, created_at)).values(
+                    status="failed",
+                    error=error_msg,
+                    timings=trace.to_dict()
                 )
             )
             await session.commit()
             
-        # Update Redis so API sees the change immediately
-        await ctx["redis"].set(f"job:{job_id}", json.dumps({
-            "status": "completed",
+        # Update Redis with error
+        await write_job_record(ctx["redis"], job_id, {
+            "status": "failed",
             "url": url,
             "mode": mode,
-            "data": data,
-            "created_at": datetime.utcnow().isoformat() # Approximate
-        }), ex=3600)
-        
-        duration = (datetime.utcnow() - start_time).total_seconds()
-        log_job_completed(job_id, duration)
-            
-        # 4. Dispatch Webhook
-        if user_id:
-            await ctx["redis"].enqueue_job("dispatch_webhook", job_id, user_id)
+            "error": error_msg,
+            "timings": trace.to_dict(),
+            "user_id": user_id,
+            "batch_id": batch_id,
+            "created_at": start_time.isoformat()
+        })
+        # Failed jobs still used a fetch (and maybe LLM tokens)
+        await meter_job(ctx, api_key_id, dynamic, trace)
+        await record_job_finished(ctx["redis"])
+        await record_job_stats(ctx["redis"], user_id, "failed", duration, trace.to_dict().get("bytes_downloaded", 0))
+        return "failed"
+
+    # The job is saved as completed; nothing from here on may fail it
+    duration = (datetime.utcnow() - start_time).total_seconds()
+    JOB_SECONDS.labels(mode, "completed").observe(duration)
+    log_job_completed(job_id, duration)
+    await meter_job(ctx, api_key_id, dynamic, trace)
+    await record_job_finished(ctx["redis"])
+    await record_job_stats(ctx["redis"], user_id, "completed", duration, trace.to_dict().get("bytes_downloaded", 0))
 
+    # 3. Dispatch Webhook (only if the user is subscribed to this event)
+    try:
+        if user_id and await ctx["webhook_cache"].has_subscribers(user_id, "job.completed"):
+            payload = {
+                "event": "job.completed",
+                "job_id": job_id,
+                "url": url,
+                "status": "completed",
+                "data": data,
+                "created_at": start_time.isoformat(),
+                "completed_at": datetime.utcnow().isoformat()
+            }
+            await ctx["redis"].enqueue_job("dispatch_webhook", job_id, user_id, payload)
     except Exception as e:
-        error_msg = str(e)
-        logger.error(f"Job {job_id} failed: {error_msg}")
-        log_job_failed(job_id, error_msg)
+        logger.error(f"Failed to enqueue the job.completed webhook for job {job_id}: {e}")
+    return "completed"
+
+async def run_due_schedules(ctx):
+    """
+    Cron task: enqueue a run for every active schedule that is due.
+
+    next_run_at is advanced when the run is claimed, so a schedule is only
+    enqueued once per interval even if several workers tick at the same time.
+    """
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Schedule)
+            .where(Schedule.is_active == True)
+            .where(Schedule.next_run_at <= now)
+            .order_by(Schedule.next_run_at)
+            .limit(settings.SCHEDULER_BATCH_SIZE)
+        )
+        due = result.scalars().all()
+
+        for schedule in due:
+            claimed = await session.execute(
+                update(Schedule)
+                .where(Schedule.id == schedule.id)
+                .where(Schedule.next_run_at == schedule.next_run_at)
+                .values(next_run_at=now + timedelta(seconds=schedule.interval_seconds))
+            )
+            if claimed.rowcount:
+                await ctx["redis"].enqueue_job(
+                    "scheduled_scrape_task",
+                    schedule.id,
+                    _job_id=f"schedule:{schedule.id}:{int(now.timestamp())}"
+                )
+        await session.commit()
+
+    if due:
+        logger.info(f"Scheduler enqueued {len(due)} due schedule(s)")
+
+async def scheduled_scrape_task(ctx, schedule_id: str):
+    """
+    Re-run a saved job spec and report only what changed.
+
+    The fetched page is normalized and hashed first; if the hash matches the
+    previous run, extraction, LLM calls, DB writes and webhooks are all skipped.
+    """
+    trace = start_job_trace(ctx)
+    async with AsyncSessionLocal() as session:
+        schedule = await session.get(Schedule, schedule_id)
+    if not schedule or not schedule.is_active:
+        return
+
+    url, mode, options = schedule.url, schedule.mode, schedule.options or {}
+    if options.get("renderJs"):
+        fetch, fetch_phase, fetch_timeout = fetch_dynamic, "render", settings.RENDER_TIMEOUT
+    else:
+        fetch, fetch_phase, fetch_timeout = fetch_static, "fetch", settings.FETCH_TIMEOUT
+
+    try:
+        async with asyncio.timeout(settings.JOB_TIMEOUT):
+            html_content = await run_phase(fetch_phase, fetch(url), fetch_timeout)
+
+            page_hash = content_hash(html_content)
+            if page_hash == schedule.last_content_hash:
+                logger.info(f"Schedule {schedule_id}: no change at {url}")
+                return
+
+            # Page changed; extract the fields again
+            if mode == "guided" and schedule.selectors:
+                data = extract_selectors(html_content, schedule.selectors)
+            else:
+                if mode == "smart" and schedule.instruction:
+                    prompt = schedule.instruction
+                else:
+                    prompt = "Extract the page title and main summary."
+                data = await run_phase("llm", analyze_page(html_content, prompt), settings.LLM_TIMEOUT)
+    except Exception as e:
+        if isinstance(e, TimeoutError):
+            error_msg = f"Job exceeded its {settings.JOB_TIMEOUT:g}s deadline"
+        else:
+            error_msg = str(e)
+        logger.error(f"Schedule {schedule_id} run failed: {error_msg}")
+        await record_failed_run(ctx, schedule, trace, error_msg)
+        return
+
+    is_first_run = schedule.last_content_hash is None
+    diff = diff_fields(await load_result(schedule.last_data), data)
+    now = datetime.utcnow()
+
+    if not is_first_run and not has_changes(diff):
+        # The page text moved but the extracted fields didn't; just remember the new hash
         async with AsyncSessionLocal() as session:
             await session.execute(
-                update(Job).where(Job.id == job_id).values(
-                    status="failed",
-                    error=error_msg
+                update(Schedule).where(Schedule.id == schedule_id).values(
+                    last_content_hash=page_hash,
+                    last_run_at=now
                 )
             )
             await session.commit()
-            
-        # Update Redis with error
-        await ctx["redis"].set(f"job:{job_id}", json.dumps({
-            "status": "failed",
+        logger.info(f"Schedule {schedule_id}: page changed but extracted fields did not")
+        return
+
+    job_id = str(uuid.uuid4())
+
+    async def persist():
+        with span("persist"):
+            stored_data = await offload_result(data)
+            with observe_phase("db"):
+                async with AsyncSessionLocal() as session:
+                    session.add(Job(
+                        id=job_id,
+                        plan=resolve_plan(schedule.plan),
+                        created_at=now,
+                        url=url,
+                        mode=mode,
+                        status="completed",
+                        user_id=schedule.user_id,
+                        data=stored_data,
+                        search_vector=search_vector(data, session.bind),
+                        timings=trace.to_dict(),
+                        schedule_id=schedule_id
+                    ))
+                    await session.execute(
+                        update(Schedule).where(Schedule.id == schedule_id).values(
+                            last_content_hash=page_hash,
+                            last_data=stored_data,
+                            last_job_id=job_id,
+                            last_run_at=now,
+                            last_changed_at=now
+                        )
+                    )
+                    await session.commit()
+
+        await write_job_record(ctx["redis"], job_id, {
+            "status": "completed",
             "url": url,
             "mode": mode,
-            "error": error_msg,
-            "created_at": datetime.utcnow().isoformat()
-        }), ex=3600)
+            "data": stored_data,
+            "timings": trace.to_dict(),
+            "user_id": schedule.user_id,
+            "schedule_id": schedule_id,
+            "created_at": now.isoformat()
+        })
+
+    await run_phase("persist", persist(), settings.PERSIST_TIMEOUT)
+    timings = trace.to_dict()
+    await record_job_stats(ctx["redis"], schedule.user_id, "completed", timings["total_ms"] / 1000, timings.get("bytes_downloaded", 0))
+
+    if is_first_run:
+        logger.info(f"Schedule {schedule_id}: recorded baseline in job {job_id}")
+        return
+
+    logger.info(f"Schedule {schedule_id}: change detected, job {job_id}")
+    user_id = schedule.user_id
+    if user_id and await ctx["webhook_cache"].has_subscribers(user_id, "job.changed"):
+        payload = {
+            "event": "job.changed",
+            "job_id": job_id,
+            "schedule_id": schedule_id,
+            "url": url,
+            "status": "completed",
+            "data": data,
+            "diff": diff,
+            "created_at": now.isoformat(),
+            "completed_at": datetime.utcnow().isoformat()
+        }
+        await ctx["redis"].enqueue_job("dispatch_webhook", job_id, user_id, payload)
+
+async def record_failed_run(ctx, schedule: Schedule, trace: JobTrace, error_msg: str) -> None:
+    """
+    Store a failed scheduled run as a failed job, as run_scrape_task does,
+    and send a job.failed webhook: nobody is polling a scheduled run.
+    The schedule keeps its last hash and data, so the next run diffs
+    against the last successful one.
+    """
+    job_id = str(uuid.uuid4())
+    now = datetime.utcnow()
+    timings = trace.to_dict()
+    log_job_failed(job_id, error_msg)
+    async with AsyncSessionLocal() as session:
+        session.add(Job(
+            id=job_id,
+            plan=resolve_plan(schedule.plan),
+            created_at=now,
+            url=schedule.url,
+            mode=schedule.mode,
+            status="failed",
+            user_id=schedule.user_id,
+            error=error_msg,
+            timings=timings,
+            schedule_id=schedule.id
+        ))
+        await session.execute(
+            update(Schedule).where(Schedule.id == schedule.id).values(last_run_at=now)
+        )
+        await session.commit()
+
+    await write_job_record(ctx["redis"], job_id, {
+        "status": "failed",
+        "url": schedule.url,
+        "mode": schedule.mode,
+        "error": error_msg,
+        "timings": timings,
+        "user_id": schedule.user_id,
+        "schedule_id": schedule.id,
+        "created_at": now.isoformat()
+    })
+    await record_job_stats(ctx["redis"], schedule.user_id, "failed", timings["total_ms"] / 1000, timings.get("bytes_downloaded", 0))
+
+    user_id = schedule.user_id
+    try:
+        if user_id and await ctx["webhook_cache"].has_subscribers(user_id, "job.failed"):
+            payload = {
+                "event": "job.failed",
+                "job_id": job_id,
+                "schedule_id": schedule.id,
+                "url": schedule.url,
+                "status": "failed",
+                "error": error_msg,
+                "created_at": now.isoformat()
+            }
+            await ctx["redis"].enqueue_job("dispatch_webhook", job_id, user_id, payload)
+    except Exception as e:
+        logger.error(f"Failed to enqueue the job.failed webhook for schedule {schedule.id}: {e}")
 
 async def startup(ctx):
     # Use the settings we already parsed in WorkerSettings
     ctx["redis"] = await create_pool(WorkerSettings.redis_settings)
 
+    # Webhook subscriptions are cached per user and invalidated by the API over pub/sub
+    webhook_cache = WebhookSubscriptionCache()
+    ctx["webhook_cache"] = webhook_cache
+    ctx["webhook_listener"] = asyncio.create_task(
+        listen_for_invalidations(
+            ctx["redis"],
+            WEBHOOK_INVALIDATION_CHANNEL,
+            webhook_cache.invalidate,
+            on_reconnect=webhook_cache.clear,
+        )
+    )
+
+    if settings.WORKER_METRICS_PORT:
+        # Prometheus scrapes the worker on its own port; the API serves /metrics
+        try:
+            start_metrics_server(settings.WORKER_METRICS_PORT)
+        except OSError as e:
+            # Most likely another worker on this host has the port; run without metrics
+            logger.error(f"Worker metrics disabled, can't listen on port {settings.WORKER_METRICS_PORT}: {e}")
+
+    # Low-priority jobs are queued from their lane as the queue drains, and
+    # queued jobs are dispatched into arq fairly across users
+    ctx["low_priority_promoter"] = asyncio.create_task(run_low_priority_promoter(ctx["redis"]))
+    ctx["dispatcher"] = asyncio.create_task(run_dispatcher(ctx["redis"]))
+
+    # Per-class concurrency limits for scrape jobs, tuned as the worker runs
+    if settings.ADAPTIVE_CONCURRENCY_ENABLED:
+        ctx["concurrency"] = ConcurrencyController()
+        ctx["concurrency_controller"] = asyncio.create_task(ctx["concurrency"].run())
+
+    # Don't wait for the daily cron if the upcoming months are missing
+    try:
+        await ensure_job_partitions()
+    except Exception as e:
+        logger.warning(f"Failed to create job partitions: {e}")
+
+async def on_job_start(ctx):
+    JOBS_IN_FLIGHT.inc()
+
+async def on_job_end(ctx):
+    JOBS_IN_FLIGHT.dec()
+    # A scrape job's user may now dispatch another one, unless the job went
+    # back to the queue to wait for a slot
+    if ctx.get("deferred"):
+        return
+    try:
+        released = await release_job(ctx["redis"], ctx["job_id"])
+    except Exception as e:
+        logger.warning(f"Failed to release job {ctx['job_id']}: {e}")
+        released = False
+    if released:
+        await try_dispatch(ctx["redis"])
+
 async def shutdown(ctx):
+    ctx["webhook_listener"].cancel()
+    ctx["low_priority_promoter"].cancel()
+    ctx["dispatcher"].cancel()
+    if "concurrency_controller" in ctx:
+        ctx["concurrency_controller"].cancel()
     await ctx["redis"].close()
 
 class WorkerSettings:
-    functions = [scrape_task, dispatch_webhook]
+    functions = [scrape_task, dispatch_webhook, scheduled_scrape_task]
+    cron_jobs = [
+        cron(run_due_schedules, second=0), # Every minute
+        cron(flush_usage, second=30), # Every minute, between scheduler ticks
+        cron(flush_stats, second=45),
+        cron(maintain_job_partitions, hour=3, minute=15, second=0), # Daily, off-peak
+    ]
+
+    # Allow DELETE /scrape/{job_id} to cancel queued and running jobs
+    allow_abort_jobs = True
+    # With adaptive concurrency the per-class limits do the limiting; arq only
+    # needs enough slots for every class at its maximum
+    max_jobs = (
+        sum(settings.ADAPTIVE_MAX_CONCURRENCY.values())
+        if settings.ADAPTIVE_CONCURRENCY_ENABLED else settings.WORKER_MAX_JOBS
+    )
+    # scrape_task defers a job (arq Retry) while its class has no free slot
+    max_tries = settings.ADAPTIVE_MAX_DEFERRALS + 1
+    # scrape_task enforces JOB_TIMEOUT itself; arq's timeout is only a backstop
+    # that leaves room for waiting for a slot and recording the failure
+    job_timeout = settings.JOB_TIMEOUT + settings.PERSIST_TIMEOUT + settings.ADAPTIVE_SLOT_WAIT + 5
     
     # Parse Redis URL for production support
     from urllib.parse import urlparse
@@ -199,3 +621,5 @@ class WorkerSettings:
         
     on_startup = startup
     on_shutdown = shutdown
+    on_job_start = on_job_start
+    on_job_end = on_job_end
@@ -0,0 +1,97 @@
+"""
+Compare Redis memory and read latency of job records stored as JSON strings
+(the old format) and as hashes with a compressed payload (app/services/job_store.py).
+
+Usage:
+    python -m benchmarks.bench_job_records --jobs 2000 --redis-url redis://localhost:6379
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from redis.asyncio import Redis
+from app.core.config import settings
+from app.services.job_store import JOB_TTL, job_key, write_job_record, read_job_record, read_job_status
+from benchmarks.stats import percentile
+
+def sample_records():
+    base = {
+        "status": "completed",
+        "url": "https://example.com/products/widget-3000",
+        "mode": "guided",
+        "user_id": "user_2abcDEFghiJKLmnoPQRstu",
+        "created_at": "2025-01-01T12:00:00.000000",
+    }
+    return {
+        "guided": {**base, "data": {"title": "Widget 3000", "price": "$19.99", "stock": "In stock"}},
+        "smart": {**base, "mode": "smart", "data": {
+            "title": "Widget 3000",
+            "summary": "A versatile widget for every workshop. " * 40,
+            "specs": {f"spec_{i}": f"value {i}" for i in range(40)},
+        }},
+        "large": {**base, "mode": "smart", "data": {
+            "items": [{"name": f"Product {i}", "price": f"${i}.99", "url": f"https://example.com/p/{i}"} for i in range(500)],
+        }},
+    }
+
+async def timed(n, fn):
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        await fn(i)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+async def bench_shape(redis: Redis, name: str, record: dict, jobs: int):
+    legacy_ids = [f"bench-legacy-{uuid.uuid4()}" for _ in range(jobs)]
+    hash_ids = [f"bench-hash-{uuid.uuid4()}" for _ in range(jobs)]
+    try:
+        for job_id in legacy_ids:
+            await redis.set(job_key(job_id), json.dumps(record), ex=JOB_TTL)
+        for job_id in hash_ids:
+            await write_job_record(redis, job_id, record)
+
+        legacy_mem = statistics.mean([await redis.memory_usage(job_key(j)) for j in legacy_ids[:200]])
+        hash_mem = statistics.mean([await redis.memory_usage(job_key(j)) for j in hash_ids[:200]])
+
+        async def legacy_get(i):
+            json.loads(await redis.get(job_key(legacy_ids[i])))
+
+        async def hash_get(i):
+            await read_job_record(redis, hash_ids[i])
+
+        async def hash_status(i):
+            await read_job_status(redis, hash_ids[i])
+
+        results = {
+            "legacy GET+json": await timed(jobs, legacy_get),
+            "hash HGETALL+decode": await timed(jobs, hash_get),
+            "hash HGET status": await timed(jobs, hash_status),
+        }
+    finally:
+        for chunk in range(0, jobs, 500):
+            await redis.delete(*[job_key(j) for j in legacy_ids[chunk:chunk + 500]])
+            await redis.delete(*[job_key(j) for j in hash_ids[chunk:chunk + 500]])
+
+    print(f"\n== {name} result ({len(json.dumps(record))} bytes as JSON) ==")
+    print(f"memory/job: legacy {legacy_mem:,.0f} B | hash {hash_mem:,.0f} B | saved {100 * (1 - hash_mem / legacy_mem):.1f}%")
+    for label, samples in results.items():
+        print(f"  {label:<22} p50 {percentile(samples, 50):7.1f}us  p99 {percentile(samples, 99):7.1f}us")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=2000, help="records per shape and format")
+    parser.add_argument("--redis-url", default=settings.redis_connection_url)
+    args = parser.parse_args()
+
+    redis = Redis.from_url(args.redis_url)
+    try:
+        for name, record in sample_records().items():
+            await bench_shape(redis, name, record, args.jobs)
+    finally:
+        await redis.aclose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,172 @@
+"""
+Local HTTP fixture server for benchmarks: a deterministic corpus of realistic
+pages (product, article, listing, and JS-rendered pages) served with
+configurable latency, so scrape jobs can be benchmarked without the internet.
+
+Usage:
+    python -m benchmarks.fixtures --port 8765 --latency-ms 100 --jitter-ms 50
+
+Pages:
+    /pages/{product|article|listing}/{n}   static HTML
+    /dynamic/{n}                           content injected by JavaScript
+"""
+import argparse
+import asyncio
+import json
+import random
+from contextlib import asynccontextmanager
+from functools import lru_cache
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse, PlainTextResponse
+from starlette.routing import Route
+
+PAGE_KINDS = ("product", "article", "listing")
+
+# Selectors that find something on every static page kind
+SELECTORS = {"title": "h1", "summary": ".summary", "price": ".price"}
+
+_WORDS = (
+    "data performance widget network latency browser cache queue storage "
+    "pipeline premium compact durable wireless portable modern classic design "
+    "analysis report market growth customer service quality feature release "
+    "update system platform engine module review rating value shipping stock"
+).split()
+
+def _sentence(rng: random.Random, words: int = 12) -> str:
+    text = " ".join(rng.choice(_WORDS) for _ in range(words))
+    return text.capitalize() + "."
+
+def _paragraphs(rng: random.Random, count: int) -> str:
+    return "\n".join(f"<p>{' '.join(_sentence(rng) for _ in range(5))}</p>" for _ in range(count))
+
+def _layout(title: str, body: str) -> str:
+    # Boilerplate that real pages carry around the content
+    nav = "".join(f'<li><a href="/pages/listing/{i}">Category {i}</a></li>' for i in range(20))
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<meta name="description" content="{title} - fixture page">
+<style>body {{ font-family: sans-serif; }} .grid {{ display: grid; }}</style>
+<script>window.analytics = {{ page: "{title}" }};</script>
+</head>
+<body>
+<header><nav><ul>{nav}</ul></nav></header>
+<main>
+{body}
+</main>
+<footer><p>&copy; Fixture Corp</p></footer>
+</body>
+</html>"""
+
+@lru_cache(maxsize=4096)
+def render_page(kind: str, n: int) -> str:
+    rng = random.Random(f"{kind}:{n}")
+    if kind == "product":
+        title = f"Widget {n} {rng.choice(_WORDS).title()}"
+        specs = "".join(f"<tr><th>{rng.choice(_WORDS)}</th><td>{rng.randint(1, 999)}</td></tr>" for _ in range(15))
+        reviews = "".join(
+            f'<div class="review"><span class="stars">{rng.randint(1, 5)}</span><p>{_sentence(rng, 25)}</p></div>'
+            for _ in range(rng.randint(5, 30))
+        )
+        body = f"""<h1>{title}</h1>
+<p class="summary">{_sentence(rng, 20)}</p>
+<span class="price">${rng.randint(5, 500)}.{rng.randint(0, 99):02d}</span>
+{_paragraphs(rng, 4)}
+<table class="specs">{specs}</table>
+<section class="reviews">{reviews}</section>"""
+    elif kind == "article":
+        title = f"{_sentence(rng, 6)[:-1]} ({n})"
+        body = f"""<article>
+<h1>{title}</h1>
+<p class="summary">{_sentence(rng, 30)}</p>
+<p class="byline">By {rng.choice(_WORDS).title()} {rng.choice(_WORDS).title()}</p>
+{_paragraphs(rng, rng.randint(10, 40))}
+</article>"""
+    elif kind == "listing":
+        title = f"Category {n}"
+        items = "".join(
+            f'<div class="item"><a href="/pages/product/{rng.randint(0, 10000)}" class="name">{_sentence(rng, 4)}</a>'
+            f'<span class="price">${rng.randint(5, 500)}</span></div>'
+            for _ in range(60)
+        )
+        body = f'<h1>{title}</h1>\n<p class="summary">{_sentence(rng, 15)}</p>\n<div class="grid">{items}</div>'
+    else:
+        raise KeyError(kind)
+    return _layout(title, body)
+
+@lru_cache(maxsize=4096)
+def render_dynamic_page(n: int, delay_ms: int = 200) -> str:
+    """A page whose content only exists after its script runs."""
+    content = render_page("product", n).split("<main>", 1)[1].split("</main>", 1)[0]
+    return _layout(f"Loading {n}", f"""<div id="app">Loading...</div>
+<script>
+setTimeout(function () {{
+  document.getElementById("app").innerHTML = {json.dumps(content)};
+}}, {delay_ms});
+</script>""")
+
+def create_app(latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 0) -> Starlette:
+    rng = random.Random(seed)
+
+    async def delay():
+        wait = latency_ms + (rng.uniform(0, jitter_ms) if jitter_ms else 0)
+        if wait:
+            await asyncio.sleep(wait / 1000)
+
+    async def page(request):
+        kind, n = request.path_params["kind"], request.path_params["n"]
+        if kind not in PAGE_KINDS:
+            return PlainTextResponse("Not found", status_code=404)
+        await delay()
+        return HTMLResponse(render_page(kind, n))
+
+    async def dynamic(request):
+        await delay()
+        return HTMLResponse(render_dynamic_page(request.path_params["n"]))
+
+    return Starlette(routes=[
+        Route("/pages/{kind}/{n:int}", page),
+        Route("/dynamic/{n:int}", dynamic),
+    ])
+
+@asynccontextmanager
+async def fixture_server(port: int, latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 0):
+    """Serve the corpus from the current event loop while the block runs."""
+    config = uvicorn.Config(
+        create_app(latency_ms, jitter_ms, seed),
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+        access_log=False,
+    )
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result() # Raise the startup error, e.g. port in use
+        await asyncio.sleep(0.05)
+    try:
+        yield server
+    finally:
+        server.should_exit = True
+        await task
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="fixed delay before each response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra random delay, uniform in [0, jitter]")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(args.latency_ms, args.jitter_ms, args.seed),
+        host="127.0.0.1",
+        port=args.port,
+        log_level="warning",
+    )
+
+if __name__ == "__main__":
+    main()
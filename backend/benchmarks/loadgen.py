@@ -0,0 +1,302 @@
+"""
+Open-loop load generator for the API tier.
+
+Requests are sent on a fixed schedule (or Poisson arrivals) at the target
+rate regardless of how fast the server answers, so a slow server shows up as
+rising latency instead of a silently lower request rate. Latency is measured
+from each request's scheduled send time, which avoids coordinated omission.
+
+Usage:
+    python -m benchmarks.loadgen --base-url http://localhost:8000 --rps 200 --duration 60 \\
+        --mix submit=1,poll=6,history=1,stats=1 --api-key sk_live_xxx --output run.json
+    python -m benchmarks.loadgen ... --auth jwt --token "$CLERK_JWT" --compare run.json
+
+Operations:
+    submit   POST /api/v1/scrape/ with a body from --payload
+    poll     GET  /api/v1/scrape/{job_id}/status for a job submitted earlier
+    history  GET  /api/v1/scrape/history/all
+    stats    GET  /api/v1/stats/
+
+--payload takes a JSON file holding one request body or a list of them
+(used round-robin). "{n}" in any string is replaced by the request number.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from benchmarks.stats import LatencyHistogram
+
+API_PREFIX = "/api/v1"
+OPERATIONS = ("submit", "poll", "history", "stats")
+
+DEFAULT_PAYLOAD = {"url": "https://example.com/?n={n}", "mode": "guided", "selectors": {"title": "h1"}}
+
+class OpStats:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.ok = 0
+        self.errors: Counter = Counter()
+        self.dropped = 0
+
+    def to_dict(self, elapsed: float) -> Dict[str, Any]:
+        return {
+            "requests": self.ok + sum(self.errors.values()),
+            "ok": self.ok,
+            "achieved_rps": round(self.ok / elapsed, 2),
+            "errors": dict(self.errors),
+            "dropped": self.dropped,
+            "latency_ms": self.latency.summary(),
+        }
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def load_payloads(path: Optional[str]) -> List[Any]:
+    if not path:
+        return [DEFAULT_PAYLOAD]
+    with open(path) as f:
+        payload = json.load(f)
+    return payload if isinstance(payload, list) else [payload]
+
+def render_payload(template: Any, n: int) -> Any:
+    if isinstance(template, str):
+        return template.replace("{n}", str(n))
+    if isinstance(template, dict):
+        return {k: render_payload(v, n) for k, v in template.items()}
+    if isinstance(template, list):
+        return [render_payload(v, n) for v in template]
+    return template
+
+def classify_error(exc: Exception) -> str:
+    if isinstance(exc, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(exc, httpx.ConnectError):
+        return "connect_error"
+    return type(exc).__name__
+
+class LoadGenerator:
+    def __init__(self, client: httpx.AsyncClient, args):
+        self.client = client
+        self.args = args
+        self.payloads = load_payloads(args.payload)
+        self.job_ids: deque = deque(maxlen=10_000)
+        self.rng = random.Random(args.seed)
+        self.counter = 0
+        # Requests beyond the pool size wait here: httpx's own pool gets slow
+        # (CPU-bound) with hundreds of queued requests and would skew the client
+        self.connection_slots = asyncio.Semaphore(args.connections)
+
+    async def request(self, op: str) -> httpx.Response:
+        if op == "submit":
+            self.counter += 1
+            body = render_payload(self.payloads[self.counter % len(self.payloads)], self.counter)
+            response = await self.client.post(f"{API_PREFIX}/scrape/", json=body)
+            if response.status_code == 200:
+                self.job_ids.append(response.json()["job_id"])
+            return response
+        if op == "poll":
+            job_id = self.rng.choice(self.job_ids)
+            return await self.client.get(f"{API_PREFIX}/scrape/{job_id}/status")
+        if op == "history":
+            return await self.client.get(f"{API_PREFIX}/scrape/history/all")
+        return await self.client.get(f"{API_PREFIX}/stats/")
+
+    async def fire(self, op: str, scheduled: float, stats: OpStats) -> None:
+        try:
+            async with self.connection_slots:
+                response = await self.request(op)
+        except httpx.HTTPError as e:
+            stats.errors[classify_error(e)] += 1
+            return
+        except asyncio.CancelledError:
+            stats.errors["unfinished"] += 1
+            raise
+        finally:
+            # From the scheduled send time: queueing in this client counts too
+            stats.latency.record(time.perf_counter() - scheduled)
+        if response.status_code < 400:
+            stats.ok += 1
+        else:
+            stats.errors[f"http_{response.status_code}"] += 1
+
+    async def seed_jobs(self, count: int) -> None:
+        """Submit some jobs up front so poll has something to read from the start."""
+        for _ in range(count):
+            await self.request("submit")
+        if not self.job_ids:
+            raise RuntimeError("Could not submit any seed job; check the URL and credentials")
+
+    async def run(self, duration: float) -> Tuple[Dict[str, OpStats], float]:
+        """
+        Send requests on schedule for `duration` seconds, then wait for the
+        stragglers. Returns per-operation stats and the elapsed time including
+        that drain, which achieved throughput is computed over.
+        """
+        ops, weights = zip(*self.args.mix.items())
+        stats = {op: OpStats() for op in ops}
+        in_flight = set()
+        start = time.perf_counter()
+        scheduled = start
+        n = 0
+        while True:
+            if self.args.arrival == "poisson":
+                scheduled += self.rng.expovariate(self.args.rps)
+            else:
+                scheduled = start + n / self.args.rps
+            n += 1
+            if scheduled - start >= duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            op = self.rng.choices(ops, weights)[0]
+            if len(in_flight) >= self.args.max_in_flight:
+                # The client itself is saturated; count it rather than slow the schedule
+                stats[op].dropped += 1
+                continue
+            task = asyncio.create_task(self.fire(op, scheduled, stats[op]))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        if in_flight:
+            _, pending = await asyncio.wait(in_flight, timeout=self.args.timeout + 5)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        return stats, time.perf_counter() - start
+
+def build_report(args, stats: Dict[str, OpStats], elapsed: float) -> Dict[str, Any]:
+    overall = LatencyHistogram()
+    errors: Counter = Counter()
+    for op_stats in stats.values():
+        overall.merge(op_stats.latency)
+        errors.update(op_stats.errors)
+    ok = sum(s.ok for s in stats.values())
+    return {
+        "label": args.label,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "base_url": args.base_url,
+            "rps": args.rps,
+            "duration": args.duration,
+            "arrival": args.arrival,
+            "mix": args.mix,
+            "auth": args.auth,
+            "payload": args.payload,
+        },
+        "offered_rps": args.rps,
+        "elapsed_s": round(elapsed, 2),
+        "achieved_rps": round(ok / elapsed, 2),
+        "requests": ok + sum(errors.values()),
+        "ok": ok,
+        "errors": dict(errors),
+        "dropped": sum(s.dropped for s in stats.values()),
+        "latency_ms": overall.summary(),
+        "ops": {op: s.to_dict(elapsed) for op, s in stats.items()},
+    }
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    def delta(new, old):
+        if old in (None, 0) or new is None:
+            return ""
+        return f" ({(new - old) / old * 100:+.0f}%)"
+
+    def line(name, current, previous):
+        latency, old_latency = current["latency_ms"], (previous or {}).get("latency_ms", {})
+        cells = [f"{current['achieved_rps']:8.1f} rps{delta(current['achieved_rps'], (previous or {}).get('achieved_rps'))}"]
+        for key in ("p50", "p99", "p99.9"):
+            if key in latency:
+                cells.append(f"{key} {latency[key]:8.1f}ms{delta(latency[key], old_latency.get(key))}")
+        errors = ", ".join(f"{k} x{v}" for k, v in current["errors"].items())
+        print(f"  {name:<8} " + "  ".join(cells) + (f"  errors: {errors}" if errors else ""))
+
+    print(f"\n== {report['label'] or 'run'}: offered {report['offered_rps']} rps for {report['config']['duration']}s "
+          f"({report['elapsed_s']}s with drain) ==")
+    line("all", report, baseline)
+    for op, op_report in report["ops"].items():
+        line(op, op_report, (baseline or {}).get("ops", {}).get(op))
+    if report["dropped"]:
+        print(f"  dropped {report['dropped']} requests: client hit --max-in-flight")
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rps", type=float, default=50, help="target request rate")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of unmeasured load first")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("submit=1,poll=6,history=1,stats=1"),
+                        help="weighted operations, e.g. submit=1,poll=6,history=1,stats=1")
+    parser.add_argument("--arrival", choices=("uniform", "poisson"), default="uniform")
+    parser.add_argument("--auth", choices=("api-key", "jwt"), default="api-key")
+    parser.add_argument("--api-key", default=os.environ.get("SCRAPY_API_KEY"), help="or set SCRAPY_API_KEY")
+    parser.add_argument("--token", default=os.environ.get("SCRAPY_TOKEN"), help="JWT for --auth jwt, or set SCRAPY_TOKEN")
+    parser.add_argument("--payload", help="JSON file with a submit body or a list of them")
+    parser.add_argument("--seed-jobs", type=int, default=20, help="jobs submitted before the run, for poll")
+    parser.add_argument("--timeout", type=float, default=10.0, help="per-request timeout")
+    parser.add_argument("--connections", type=int, default=500, help="HTTP connection pool size")
+    parser.add_argument("--max-in-flight", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--label", default=git_revision(), help="name for this run (default: git revision)")
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--compare", help="report from an earlier run to print deltas against")
+    args = parser.parse_args()
+
+    if args.auth == "api-key":
+        if not args.api_key:
+            parser.error("--api-key (or SCRAPY_API_KEY) is required for --auth api-key")
+        headers = {"X-API-Key": args.api_key}
+    else:
+        if not args.token:
+            parser.error("--token (or SCRAPY_TOKEN) is required for --auth jwt")
+        headers = {"Authorization": f"Bearer {args.token}"}
+
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers, timeout=args.timeout, limits=limits) as client:
+        generator = LoadGenerator(client, args)
+        if "poll" in args.mix:
+            await generator.seed_jobs(args.seed_jobs)
+        if args.warmup:
+            await generator.run(args.warmup)
+        stats, elapsed = await generator.run(args.duration)
+
+    report = build_report(args, stats, elapsed)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        sys.exit(130)
@@ -0,0 +1,72 @@
+"""Small helpers shared by the benchmark scripts."""
+import statistics
+from typing import Dict, Iterable, List
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def summarize(samples: Iterable[float], digits: int = 1) -> Dict[str, float]:
+    """mean/p50/p95/p99/max of a list of samples (empty dict if there are none)."""
+    samples = list(samples)
+    if not samples:
+        return {}
+    return {
+        "mean": round(statistics.mean(samples), digits),
+        "p50": round(percentile(samples, 50), digits),
+        "p95": round(percentile(samples, 95), digits),
+        "p99": round(percentile(samples, 99), digits),
+        "max": round(max(samples), digits),
+    }
+
+class LatencyHistogram:
+    """
+    HDR-style latency histogram: constant memory, mergeable, and accurate to
+    better than 0.2% at any magnitude (each power of two is split into 1024 buckets).
+
+    Values are recorded in microseconds; percentiles are reported in milliseconds.
+    """
+    SUB_BUCKET_BITS = 10
+    PERCENTILES = (("p50", 50), ("p90", 90), ("p99", 99), ("p99.9", 99.9))
+
+    def __init__(self):
+        self.counts: Dict[tuple, int] = {}
+        self.total = 0
+        self.max_us = 0
+
+    def _bucket(self, value_us: int) -> tuple:
+        shift = max(value_us.bit_length() - self.SUB_BUCKET_BITS, 0)
+        return shift, value_us >> shift
+
+    def record(self, seconds: float) -> None:
+        value_us = max(int(seconds * 1_000_000), 0)
+        key = self._bucket(value_us)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.total += 1
+        self.max_us = max(self.max_us, value_us)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.total += other.total
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, pct: float) -> float:
+        if not self.total:
+            return 0.0
+        target = max(1, round(self.total * pct / 100))
+        seen = 0
+        for shift, sub in sorted(self.counts, key=lambda k: k[1] << k[0]):
+            seen += self.counts[(shift, sub)]
+            if seen >= target:
+                # Upper edge of the bucket, never above the largest value seen
+                return min((sub + 1) << shift, self.max_us) / 1000
+        return self.max_us / 1000
+
+    def summary(self) -> Dict[str, float]:
+        if not self.total:
+            return {}
+        return {
+            **{label: round(self.percentile(pct), 2) for label, pct in self.PERCENTILES},
+            "max": round(self.max_us / 1000, 2),
+        }
@@ -1,14 +1,11 @@
-import asyncio
-from app.core.database import engine, Base
-from app.models.job import Job
-from app.models.api_key import ApiKey
-from app.models.webhook import Webhook
+from alembic import command
+from alembic.config import Config
 
-async def create_tables():
-    print("Creating tables...")
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    print("Tables created successfully.")
+# The schema is managed by migrations; this is the same as `alembic upgrade head`
+def create_tables():
+    print("Migrating database...")
+    command.upgrade(Config("alembic.ini"), "head")
+    print("Database is up to date.")
 
 if __name__ == "__main__":
-    asyncio.run(create_tables())
+    create_tables()
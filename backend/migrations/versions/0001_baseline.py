@@ -0,0 +1,138 @@
+"""Baseline: the schema create_all used to build
+
+Databases created before migrations were introduced have some or all of
+these tables, possibly without the columns and indexes added since, as
+create_all never altered existing tables. This revision fills in whatever
+is missing, so every database reaches the same starting point.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+metadata = sa.MetaData()
+
+sa.Table(
+    "jobs", metadata,
+    sa.Column("id", sa.String, primary_key=True),
+    sa.Column("url", sa.String),
+    sa.Column("mode", sa.String),
+    sa.Column("user_id", sa.String, nullable=True),
+    sa.Column("status", sa.String),
+    sa.Column("data", sa.JSON),
+    sa.Column("error", sa.String, nullable=True),
+    sa.Column("snapshot", sa.JSON, nullable=True),
+    sa.Column("timings", sa.JSON, nullable=True),
+    sa.Column("batch_id", sa.String, nullable=True),
+    sa.Column("schedule_id", sa.String, nullable=True),
+    sa.Column("created_at", sa.DateTime),
+    sa.Index("ix_jobs_id", "id"),
+    sa.Index("ix_jobs_url", "url"),
+    sa.Index("ix_jobs_batch_id", "batch_id"),
+    sa.Index("ix_jobs_schedule_id", "schedule_id"),
+    sa.Index("ix_jobs_user_id_created_at", "user_id", "created_at"),
+    sa.Index("ix_jobs_user_id_status", "user_id", "status"),
+)
+
+sa.Table(
+    "api_keys", metadata,
+    sa.Column("id", sa.String, primary_key=True),
+    sa.Column("key_prefix", sa.String),
+    sa.Column("key_hash", sa.String),
+    sa.Column("user_id", sa.String),
+    sa.Column("name", sa.String),
+    sa.Column("is_active", sa.Boolean),
+    sa.Column("rate_limit", sa.Integer),
+    sa.Column("rate_limit_per_second", sa.Integer, nullable=True),
+    sa.Column("rate_limit_per_day", sa.Integer, nullable=True),
+    sa.Column("usage_count", sa.Integer),
+    sa.Column("created_at", sa.DateTime),
+    sa.Index("ix_api_keys_key_prefix", "key_prefix"),
+    sa.Index("ix_api_keys_key_hash", "key_hash"),
+    sa.Index("ix_api_keys_user_id", "user_id"),
+)
+
+sa.Table(
+    "api_key_usage", metadata,
+    sa.Column("api_key_id", sa.String, primary_key=True),
+    sa.Column("day", sa.Date, primary_key=True),
+    sa.Column("requests", sa.BigInteger),
+    sa.Column("static_jobs", sa.BigInteger),
+    sa.Column("dynamic_jobs", sa.BigInteger),
+    sa.Column("llm_tokens", sa.BigInteger),
+)
+
+sa.Table(
+    "webhooks", metadata,
+    sa.Column("id", sa.String, primary_key=True),
+    sa.Column("url", sa.String, nullable=False),
+    sa.Column("events", sa.JSON),
+    sa.Column("secret", sa.String, nullable=False),
+    sa.Column("user_id", sa.String),
+    sa.Column("created_at", sa.DateTime),
+    sa.Index("ix_webhooks_user_id", "user_id"),
+)
+
+sa.Table(
+    "schedules", metadata,
+    sa.Column("id", sa.String, primary_key=True),
+    sa.Column("user_id", sa.String),
+    sa.Column("url", sa.String, nullable=False),
+    sa.Column("mode", sa.String),
+    sa.Column("selectors", sa.JSON, nullable=True),
+    sa.Column("instruction", sa.String, nullable=True),
+    sa.Column("options", sa.JSON, nullable=True),
+    sa.Column("interval_seconds", sa.Integer, nullable=False),
+    sa.Column("is_active", sa.Boolean),
+    sa.Column("next_run_at", sa.DateTime),
+    sa.Column("last_run_at", sa.DateTime, nullable=True),
+    sa.Column("last_changed_at", sa.DateTime, nullable=True),
+    sa.Column("last_content_hash", sa.String, nullable=True),
+    sa.Column("last_data", sa.JSON, nullable=True),
+    sa.Column("last_job_id", sa.String, nullable=True),
+    sa.Column("created_at", sa.DateTime),
+    sa.Index("ix_schedules_user_id", "user_id"),
+    sa.Index("ix_schedules_next_run_at", "next_run_at"),
+)
+
+sa.Table(
+    "stats_rollups", metadata,
+    sa.Column("scope", sa.String, primary_key=True),
+    sa.Column("granularity", sa.String, primary_key=True),
+    sa.Column("bucket_start", sa.DateTime, primary_key=True),
+    sa.Column("jobs", sa.BigInteger),
+    sa.Column("completed", sa.BigInteger),
+    sa.Column("failed", sa.BigInteger),
+    sa.Column("cancelled", sa.BigInteger),
+    sa.Column("duration_ms", sa.BigInteger),
+    sa.Column("bytes", sa.BigInteger),
+)
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    existing_tables = set(inspector.get_table_names())
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            table.create(op.get_bind())
+            continue
+        columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns:
+                op.add_column(table.name, column.copy())
+        indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                op.create_index(index.name, table.name, [c.name for c in index.columns])
+
+
+def downgrade() -> None:
+    for table in reversed(metadata.sorted_tables):
+        op.drop_table(table.name)
@@ -0,0 +1,119 @@
+"""Partition jobs by plan and month; add plan to api_keys and schedules
+
+On Postgres the jobs table is rebuilt as LIST (plan) partitions, each
+RANGE partitioned by month of created_at (see app/services/partitions.py),
+and the existing rows are copied into the default plan. The primary key
+becomes (id, plan, created_at), since a partitioned table's keys must
+include the partition columns. Other databases just get the plan column.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+from app.core.config import settings
+from app.services.partitions import add_months, month_start, partition_sql
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+JOB_COLUMNS = (
+    "id", "plan", "created_at", "url", "mode", "user_id", "status", "data",
+    "error", "snapshot", "timings", "batch_id", "schedule_id",
+)
+JOB_INDEXES = {
+    "ix_jobs_url": ["url"],
+    "ix_jobs_batch_id": ["batch_id"],
+    "ix_jobs_schedule_id": ["schedule_id"],
+    "ix_jobs_user_id_created_at": ["user_id", "created_at"],
+    "ix_jobs_user_id_status": ["user_id", "status"],
+}
+
+
+def _drop_indexes(table: str) -> None:
+    # Index names are per schema in Postgres, so the old table's would clash
+    for index in sa.inspect(op.get_bind()).get_indexes(table):
+        op.drop_index(index["name"], table_name=table)
+
+
+def _create_jobs(partitioned: bool) -> None:
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.String, nullable=False),
+        sa.Column("plan", sa.String, nullable=False),
+        sa.Column("created_at", sa.DateTime, nullable=False),
+        sa.Column("url", sa.String),
+        sa.Column("mode", sa.String),
+        sa.Column("user_id", sa.String, nullable=True),
+        sa.Column("status", sa.String),
+        sa.Column("data", sa.JSON),
+        sa.Column("error", sa.String, nullable=True),
+        sa.Column("snapshot", sa.JSON, nullable=True),
+        sa.Column("timings", sa.JSON, nullable=True),
+        sa.Column("batch_id", sa.String, nullable=True),
+        sa.Column("schedule_id", sa.String, nullable=True),
+        sa.PrimaryKeyConstraint(*(("id", "plan", "created_at") if partitioned else ("id",)), name="jobs_pkey"),
+        **({"postgresql_partition_by": "LIST (plan)"} if partitioned else {}),
+    )
+    for name, columns in JOB_INDEXES.items():
+        op.create_index(name, "jobs", columns)
+
+
+def upgrade() -> None:
+    op.add_column("api_keys", sa.Column("plan", sa.String, nullable=True))
+    op.add_column("schedules", sa.Column("plan", sa.String, nullable=True))
+
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        op.add_column("jobs", sa.Column("plan", sa.String, nullable=False, server_default=settings.DEFAULT_PLAN))
+        return
+
+    op.rename_table("jobs", "jobs_legacy")
+    _drop_indexes("jobs_legacy")
+    op.execute("ALTER TABLE jobs_legacy RENAME CONSTRAINT jobs_pkey TO jobs_legacy_pkey")
+    _create_jobs(partitioned=True)
+
+    # Partitions for every month that has jobs, through the premade months
+    now = datetime.utcnow()
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM jobs_legacy")).scalar() or now
+    last = add_months(month_start(now), settings.JOB_PARTITION_PREMAKE_MONTHS)
+    for statement in partition_sql(settings.PLAN_RETENTION_DAYS, min(oldest, now), last):
+        op.execute(statement)
+
+    columns = ", ".join(JOB_COLUMNS)
+    source = ", ".join(
+        "CAST(:plan AS VARCHAR)" if c == "plan"
+        else "coalesce(created_at, timezone('utc', now()))" if c == "created_at"
+        else c
+        for c in JOB_COLUMNS
+    )
+    bind.execute(
+        sa.text(f"INSERT INTO jobs ({columns}) SELECT {source} FROM jobs_legacy"),
+        {"plan": settings.DEFAULT_PLAN},
+    )
+    op.drop_table("jobs_legacy")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.rename_table("jobs", "jobs_partitioned")
+        _drop_indexes("jobs_partitioned")
+        op.execute("ALTER TABLE jobs_partitioned RENAME CONSTRAINT jobs_pkey TO jobs_partitioned_pkey")
+        _create_jobs(partitioned=False)
+        columns = ", ".join(c for c in JOB_COLUMNS if c != "plan")
+        # A job id is unique across plans, so keep the first copy if ever there are two
+        op.execute(
+            f"INSERT INTO jobs ({columns}) SELECT DISTINCT ON (id) {columns} FROM jobs_partitioned ORDER BY id, created_at"
+        )
+        op.execute("DROP TABLE jobs_partitioned CASCADE")
+    else:
+        with op.batch_alter_table("jobs") as batch:
+            batch.drop_column("plan")
+
+    op.drop_column("schedules", "plan")
+    op.drop_column("api_keys", "plan")
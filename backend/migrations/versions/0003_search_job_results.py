@@ -0,0 +1,47 @@
+"""Searchable job results: JSONB data with a GIN index, and a full-text column
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from app.core.config import settings
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        op.add_column("jobs", sa.Column("search_vector", sa.Text, nullable=True))
+        return
+
+    # Rewrites every partition once; json and jsonb hold the same documents
+    op.execute("ALTER TABLE jobs ALTER COLUMN data TYPE jsonb USING data::jsonb")
+    op.add_column("jobs", sa.Column("search_vector", TSVECTOR, nullable=True))
+    # Index the text of inline results; the worker fills in new jobs (and
+    # those it offloads to the blob store) as they complete
+    op.get_bind().execute(
+        sa.text(
+            "UPDATE jobs SET search_vector = jsonb_to_tsvector(CAST(:config AS regconfig), data, '[\"string\"]') "
+            "WHERE data IS NOT NULL AND NOT data ? '$blob'"
+        ),
+        {"config": settings.SEARCH_TEXT_CONFIG},
+    )
+    op.create_index("ix_jobs_data", "jobs", ["data"], postgresql_using="gin", postgresql_ops={"data": "jsonb_path_ops"})
+    op.create_index("ix_jobs_search_vector", "jobs", ["search_vector"], postgresql_using="gin")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_jobs_search_vector", table_name="jobs")
+        op.drop_index("ix_jobs_data", table_name="jobs")
+        op.execute("ALTER TABLE jobs ALTER COLUMN data TYPE json USING data::json")
+        op.drop_column("jobs", "search_vector")
+    else:
+        with op.batch_alter_table("jobs") as batch:
+            batch.drop_column("search_vector")
@@ -0,0 +1,21 @@
+"""Per-key fair scheduling weight
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("api_keys", sa.Column("queue_weight", sa.Integer, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("api_keys", "queue_weight")
@@ -0,0 +1,106 @@
+"""Backfill stats_rollups from the jobs that finished before stats were counted
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+from collections import defaultdict
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# Copied from app.services.stats as of this revision, so later changes to
+# the service don't change what this migration does
+STATS_FIELDS = ("jobs", "completed", "failed", "cancelled", "duration_ms", "bytes")
+GRANULARITIES = ("hour", "day")
+ALL_TIME = datetime(1970, 1, 1)
+
+
+def bucket_start(granularity, at):
+    if granularity == "hour":
+        return at.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return ALL_TIME
+
+
+def job_stats_delta(status, duration, bytes_downloaded):
+    delta = {"jobs": 1, status: 1}
+    if duration is not None:
+        delta["duration_ms"] = int(duration * 1000)
+    if bytes_downloaded:
+        delta["bytes"] = bytes_downloaded
+    return delta
+
+
+jobs = sa.table(
+    "jobs",
+    sa.column("user_id", sa.String),
+    sa.column("status", sa.String),
+    sa.column("created_at", sa.DateTime),
+    sa.column("timings", sa.JSON),
+)
+stats_rollups = sa.table(
+    "stats_rollups",
+    sa.column("scope", sa.String),
+    sa.column("granularity", sa.String),
+    sa.column("bucket_start", sa.DateTime),
+    *(sa.column(field, sa.BigInteger) for field in STATS_FIELDS),
+)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    # Jobs since the first counted hour are in the rollups already. Jobs have
+    # no finish time, so they are bucketed by when they were created.
+    counted_since = conn.execute(
+        sa.select(sa.func.min(stats_rollups.c.bucket_start)).where(stats_rollups.c.granularity == "hour")
+    ).scalar()
+    query = sa.select(jobs).where(jobs.c.status.in_(("completed", "failed", "cancelled")))
+    if counted_since is not None:
+        query = query.where(jobs.c.created_at < counted_since)
+
+    if conn.dialect.name == "postgresql":
+        # Server-side cursor; aiosqlite doesn't have one
+        conn = conn.execution_options(stream_results=True, yield_per=1000)
+
+    rows = defaultdict(lambda: dict.fromkeys(STATS_FIELDS, 0))
+    for job in conn.execute(query):
+        timings = job.timings or {}
+        duration = (timings.get("total_ms") or 0) / 1000 if job.status != "cancelled" else None
+        delta = job_stats_delta(job.status, duration, timings.get("bytes_downloaded") or 0)
+        for scope in ["global"] + ([f"user:{job.user_id}"] if job.user_id else []):
+            for granularity in ("all", *GRANULARITIES):
+                counts = rows[(scope, granularity, bucket_start(granularity, job.created_at))]
+                for field, n in delta.items():
+                    counts[field] += n
+
+    if counted_since is None:
+        if rows:
+            op.bulk_insert(stats_rollups, [
+                {"scope": scope, "granularity": granularity, "bucket_start": start, **counts}
+                for (scope, granularity, start), counts in rows.items()
+            ])
+        return
+    # Only the all-time rows can exist already
+    for (scope, granularity, start), counts in rows.items():
+        key = (
+            (stats_rollups.c.scope == scope)
+            & (stats_rollups.c.granularity == granularity)
+            & (stats_rollups.c.bucket_start == start)
+        )
+        updated = conn.execute(
+            stats_rollups.update().where(key).values({f: stats_rollups.c[f] + n for f, n in counts.items()})
+        )
+        if not updated.rowcount:
+            conn.execute(stats_rollups.insert().values(scope=scope, granularity=granularity, bucket_start=start, **counts))
+
+
+def downgrade() -> None:
+    # The backfilled counts can't be told apart from counted ones
+    pass
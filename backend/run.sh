@@ -1,3 +1,4 @@
 #!/bin/bash
+alembic upgrade head || exit 1
 arq app.worker.WorkerSettings &
 uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
@@ -1,5 +1,9 @@
 #!/bin/bash
 
+# Bring the schema up to date before anything uses it
+echo "Running database migrations..."
+alembic upgrade head || exit 1
+
 # Start FastAPI server in background immediately to satisfy Render timeout
 echo "Starting FastAPI server..."
 uvicorn app.main:app --host 0.0.0.0 --port ${PORT:-8000} &
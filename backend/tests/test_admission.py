@@ -0,0 +1,63 @@
+import asyncio
+import uuid
+import pytest
+from arq.connections import ArqRedis
+from arq.constants import default_queue_name, job_key_prefix
+from app.core.config import settings
+from app.services.admission import LOW_LANE_KEY, QueueMonitor, promote_low_priority, push_low_priority
+from app.services.fair_queue import (
+    ACTIVE_KEY, CAPS_KEY, DEFICITS_KEY, PENDING_KEY, TENANTS_KEY, WEIGHTS_KEY,
+    TenantShare, owner_key, queue_key, running_key,
+)
+
+
+def _monitor(depth, throughput, low_depth=0):
+    monitor = QueueMonitor()
+    monitor.depth, monitor.low_depth, monitor.throughput = depth, low_depth, throughput
+    return monitor
+
+
+def test_admission_lanes_follow_the_plan_thresholds(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_MIN_DEPTH", 10)
+    monkeypatch.setattr(settings, "ADMISSION_MAX_WAIT", {"free": 60, "pro": 600})
+    monkeypatch.setattr(settings, "ADMISSION_LOW_PRIORITY_MAX_WAIT", {"free": 300, "pro": 600})
+
+    assert _monitor(5, 0.1).admit("free").lane == "normal"  # Short queue
+    assert _monitor(500, None).admit("free").lane == "normal"  # No throughput sample yet
+    assert _monitor(100, 10).admit("free").lane == "normal"  # 10s wait
+
+    low = _monitor(1000, 10).admit("free")  # 100s wait
+    assert (low.lane, low.estimated_wait) == ("low", 100)
+    assert _monitor(1000, 10).admit("pro").lane == "normal"
+
+    rejected = _monitor(5000, 10).admit("free")  # 500s wait
+    assert rejected.lane == "rejected"
+    assert rejected.retry_after == 441  # Until the wait is back under 60s
+
+
+def test_promotion_moves_jobs_to_their_users_queue_while_there_is_room():
+    async def run():
+        redis = ArqRedis.from_url(settings.redis_connection_url)
+        try:
+            await redis.ping()
+        except Exception:
+            pytest.skip("Redis is not available")
+        ids = [uuid.uuid4().hex for _ in range(3)]
+        share = TenantShare(weight=1, max_in_flight=10)
+        try:
+            await redis.delete(default_queue_name, LOW_LANE_KEY, PENDING_KEY, TENANTS_KEY, ACTIVE_KEY, queue_key("u1"))
+            for job_id in ids:
+                await push_low_priority(redis, "u1", {"job_id": job_id, "url": "https://example.com", "mode": "guided"}, share)
+            promoted = await promote_low_priority(redis, below=2)
+            queued = await redis.zrange(default_queue_name, 0, -1)
+            left = await redis.llen(LOW_LANE_KEY)
+        finally:
+            await redis.delete(default_queue_name, LOW_LANE_KEY, PENDING_KEY, TENANTS_KEY, ACTIVE_KEY,
+                               WEIGHTS_KEY, CAPS_KEY, DEFICITS_KEY, queue_key("u1"), running_key("u1"),
+                               *[job_key_prefix + i for i in ids], *[owner_key(i) for i in ids])
+            await redis.aclose()
+        # Two slots: two jobs are moved and dispatched, the last one waits in the lane
+        assert promoted == 2 and left == 1
+        assert sorted(queued) == sorted(i.encode() for i in ids[:2])
+
+    asyncio.run(run())
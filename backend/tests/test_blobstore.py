@@ -0,0 +1,50 @@
+import asyncio
+import json
+import pytest
+from app.core.config import settings
+from app.services import blobstore
+from app.services.blobstore import BlobStore, LocalBlobStore, offload_result, load_result, stream_blob, is_blob_ref
+
+
+def _use_local_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(blobstore, "_blob_store", LocalBlobStore(str(tmp_path)))
+    monkeypatch.setattr(settings, "BLOB_THRESHOLD_BYTES", 100)
+
+
+def test_small_results_stay_inline(monkeypatch, tmp_path):
+    _use_local_store(monkeypatch, tmp_path)
+    data = {"title": "Example"}
+    assert asyncio.run(offload_result(data)) == data
+
+
+def test_large_results_round_trip(monkeypatch, tmp_path):
+    _use_local_store(monkeypatch, tmp_path)
+    data = {"items": [f"item {i}" for i in range(200)]}
+
+    ref = asyncio.run(offload_result(data))
+    assert is_blob_ref(ref)
+    assert ref["size"] == len(json.dumps(data).encode())
+    assert asyncio.run(load_result(ref)) == data
+
+    async def collect():
+        return b"".join([chunk async for chunk in stream_blob(ref)])
+
+    assert json.loads(asyncio.run(collect())) == data
+
+
+def test_identical_content_is_stored_once(monkeypatch, tmp_path):
+    _use_local_store(monkeypatch, tmp_path)
+    data = {"items": ["x" * 50] * 10}
+    first = asyncio.run(offload_result(data))
+    second = asyncio.run(offload_result(data))
+    assert first == second
+    assert len([p for p in tmp_path.rglob("*") if p.is_file()]) == 1
+
+
+def test_stores_must_implement_every_operation():
+    class PutOnly(BlobStore):
+        async def put(self, key, data):
+            pass
+
+    with pytest.raises(TypeError):
+        PutOnly()
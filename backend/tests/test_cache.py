@@ -0,0 +1,49 @@
+import asyncio
+from app.core.cache import TTLCache
+from app.services.webhooks import WebhookSubscriptionCache
+from app.services.api_key_cache import ApiKeyCache
+
+
+def test_ttl_cache_expiry():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=-1)  # already expired
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert "b" not in cache
+
+
+def test_ttl_cache_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # touch a so b is least recently used
+    cache.set("c", 3)
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+
+def test_webhook_cache_uses_cached_subscriptions():
+    cache = WebhookSubscriptionCache()
+    cache._cache.set("user_1", [{"id": "w1", "url": "https://example.com/hook", "events": ["job.completed"], "secret": "s"}])
+    cache._cache.set("user_2", [])
+
+    assert asyncio.run(cache.has_subscribers("user_1", "job.completed"))
+    assert not asyncio.run(cache.has_subscribers("user_1", "job.changed"))
+    assert not asyncio.run(cache.has_subscribers("user_2", "job.completed"))
+
+    cache.invalidate("user_1")
+    assert "user_1" not in cache._cache
+
+
+def test_api_key_cache_serves_local_entries():
+    cache = ApiKeyCache(redis=None)
+    cache._cache.set("hash_1", {"id": "k1", "user_id": "user_1", "is_active": True, "rate_limit": 60})
+    cache._cache.set("hash_2", False)  # known-unknown key
+
+    assert asyncio.run(cache.get("hash_1"))["user_id"] == "user_1"
+    assert asyncio.run(cache.get("hash_2")) is None
+
+    cache.invalidate("hash_1")
+    assert "hash_1" not in cache._cache
@@ -0,0 +1,29 @@
+from app.services.change_detection import content_hash, diff_fields, has_changes
+
+
+def test_hash_ignores_scripts_comments_and_whitespace():
+    a = "<html><body><h1>Price</h1>  <p>$10</p><script>var nonce='abc'</script></body></html>"
+    b = "<html><body><!-- build 42 --><h1>Price</h1>\n<p>$10</p><script>var nonce='xyz'</script></body></html>"
+    assert content_hash(a) == content_hash(b)
+
+
+def test_hash_changes_with_visible_text():
+    a = "<html><body><p>$10</p></body></html>"
+    b = "<html><body><p>$12</p></body></html>"
+    assert content_hash(a) != content_hash(b)
+
+
+def test_diff_fields():
+    diff = diff_fields({"price": "$10", "title": "Widget", "stock": "3"}, {"price": "$12", "title": "Widget", "rating": "4.5"})
+    assert diff == {
+        "added": {"rating": "4.5"},
+        "removed": {"stock": "3"},
+        "changed": {"price": {"old": "$10", "new": "$12"}},
+    }
+    assert has_changes(diff)
+    assert not has_changes(diff_fields({"a": 1}, {"a": 1}))
+
+
+def test_diff_non_dict_results():
+    diff = diff_fields([1, 2], [1, 2, 3])
+    assert diff["changed"]["$"] == {"old": [1, 2], "new": [1, 2, 3]}
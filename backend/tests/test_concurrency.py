@@ -0,0 +1,65 @@
+import asyncio
+from app.core.concurrency import ClassLimiter, ConcurrencyController, job_class
+from app.core.config import settings
+
+
+def test_aimd_steps(monkeypatch):
+    monkeypatch.setattr(settings, "ADAPTIVE_MIN_SAMPLES", 2)
+    monkeypatch.setattr(settings, "ADAPTIVE_TARGET_LATENCY", {"static": 10.0, "dynamic": 30.0})
+    monkeypatch.setattr(settings, "ADAPTIVE_MAX_RSS_MB", 1000)
+
+    async def run():
+        controller = ConcurrencyController()
+        static, dynamic = controller.limiter("static"), controller.limiter("dynamic")
+        await static.set_limit(10)
+        await dynamic.set_limit(4)
+
+        # Busy static slots grow the limit by one; idle dynamic ones hold
+        static.saturated = True
+        assert await controller.adjust(0.0, 0) == {"static": ("increase", "demand"), "dynamic": ("hold", "steady")}
+        assert static.slots == 11
+
+        # Slow renders cut only the dynamic limit
+        dynamic.durations = [40.0, 45.0]
+        decisions = await controller.adjust(0.0, 0)
+        assert decisions["dynamic"] == ("decrease", "latency") and dynamic.limit == 4 * 0.7
+
+        # Memory pressure cuts every class that is running jobs
+        static.active = 1
+        decisions = await controller.adjust(0.0, 2000 * 1024 * 1024)
+        assert decisions == {"static": ("decrease", "memory"), "dynamic": ("hold", "steady")}
+
+        # Failures count once there are enough samples
+        static.active, static.durations, static.failures = 0, [1.0, 1.0, 1.0], 2
+        assert (await controller.adjust(0.0, 0))["static"] == ("decrease", "errors")
+
+    asyncio.run(run())
+
+
+def test_slots_wait_and_time_out():
+    async def run():
+        limiter = ClassLimiter("dynamic", initial=1, minimum=1, maximum=4)
+        assert await limiter.acquire(0.01)
+        assert not await limiter.acquire(0.01)
+        assert limiter.saturated
+
+        # A waiter gets the slot as soon as it is released
+        waiter = asyncio.create_task(limiter.acquire(1))
+        await asyncio.sleep(0)
+        await limiter.release(2.5)
+        assert await waiter
+        assert limiter.durations == [2.5]
+
+        # Raising the limit wakes waiters too; force takes a slot regardless
+        waiter = asyncio.create_task(limiter.acquire(1))
+        await asyncio.sleep(0)
+        await limiter.set_limit(2)
+        assert await waiter
+        assert await limiter.acquire(0.01, force=True) and limiter.active == 3
+
+    asyncio.run(run())
+
+
+def test_job_class():
+    assert job_class(None) == "static"
+    assert job_class({"renderJs": True}) == "dynamic"
@@ -0,0 +1,32 @@
+import asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.core import database
+
+
+def test_pool_options_only_apply_to_postgres():
+    options = database.engine_options("postgresql+asyncpg://u:p@db/app")
+    assert options["echo"] is False
+    assert options["pool_size"] == database.settings.DB_POOL_SIZE
+    assert options["connect_args"]["statement_cache_size"] == database.settings.DB_STATEMENT_CACHE_SIZE
+    assert "pool_size" not in database.engine_options("sqlite+aiosqlite:///:memory:")
+
+
+def test_read_session_falls_back_to_the_primary(monkeypatch):
+    primary = create_async_engine("sqlite+aiosqlite:///:memory:")
+    # Nothing listens on port 1: connecting to the replica fails at once
+    replica = create_async_engine("postgresql+asyncpg://u:p@127.0.0.1:1/app")
+    monkeypatch.setattr(database, "AsyncSessionLocal", sessionmaker(primary, class_=AsyncSession))
+    monkeypatch.setattr(database, "ReplicaSessionLocal", sessionmaker(replica, class_=AsyncSession))
+    monkeypatch.setattr(database, "_replica_down_until", 0.0)
+
+    async def run():
+        async with database.read_session() as session:
+            assert session.bind is primary
+            assert (await session.execute(text("SELECT 1"))).scalar() == 1
+        assert database._replica_down_until > 0
+        await primary.dispose()
+        await replica.dispose()
+
+    asyncio.run(run())
@@ -0,0 +1,57 @@
+import asyncio
+import csv
+import gzip
+import io
+from datetime import datetime
+import pytest
+from app.services.export import encode_csv, encode_ndjson, encode_parquet, flatten, gzip_stream
+
+
+def _job(i, data):
+    return {
+        "id": f"job-{i}", "url": f"https://example.com/{i}", "mode": "guided", "status": "completed",
+        "error": None, "batch_id": "b1", "schedule_id": None, "created_at": datetime(2025, 1, 1, 0, i), "data": data,
+    }
+
+BATCHES = [
+    [_job(0, {"title": "A", "price": {"amount": 1}}), _job(1, {"title": "B", "price": {"amount": 2}})],
+    [_job(2, {"title": "C", "tags": ["x", "y"]})],
+]
+
+
+async def _batches():
+    for batch in BATCHES:
+        yield batch
+
+
+def _collect(stream):
+    async def run():
+        return b"".join([chunk async for chunk in stream])
+    return asyncio.run(run())
+
+
+def test_flatten_nested_results():
+    assert flatten({"a": {"b": 1, "c": {}}, "d": [1]}) == {"data.a.b": 1, "data.a.c": {}, "data.d": [1]}
+    assert flatten("text") == {"data": "text"}
+
+
+def test_csv_columns_come_from_first_batch():
+    rows = list(csv.DictReader(io.StringIO(_collect(encode_csv(_batches())).decode())))
+    assert [r["data.title"] for r in rows] == ["A", "B", "C"]
+    assert rows[1]["data.price.amount"] == "2"
+    assert rows[2]["data_extra"] == '{"data.tags": ["x", "y"]}'
+    assert rows[0]["created_at"] == "2025-01-01T00:00:00"
+
+
+def test_gzipped_ndjson():
+    lines = gzip.decompress(_collect(gzip_stream(encode_ndjson(_batches())))).decode().splitlines()
+    assert len(lines) == 3
+    assert '"created_at": "2025-01-01T00:02:00"' in lines[2]
+
+
+def test_parquet_writes_a_row_group_per_batch():
+    pq = pytest.importorskip("pyarrow.parquet")
+    content = _collect(encode_parquet(_batches()))
+    parquet = pq.ParquetFile(io.BytesIO(content))
+    assert parquet.num_row_groups == 2
+    assert parquet.read().column("data.title").to_pylist() == ["A", "B", "C"]
@@ -0,0 +1,106 @@
+import asyncio
+import time
+import uuid
+import pytest
+from arq.connections import ArqRedis
+from arq.constants import default_queue_name
+from arq.jobs import Job
+from app.core.config import settings
+from app.services.fair_queue import TenantShare, dispatch, pending_jobs, push_jobs, release_job
+from app.services.job_store import write_job_record
+
+
+def _jobs(tenant, n):
+    return [{"job_id": f"{tenant}-{uuid.uuid4().hex}", "url": "https://example.com", "mode": "guided"} for _ in range(n)]
+
+
+def _run(test):
+    async def run():
+        redis = ArqRedis.from_url(settings.redis_connection_url)
+        try:
+            await redis.ping()
+        except Exception:
+            pytest.skip("Redis is not available")
+
+        async def clear():
+            for pattern in ("fairq:*", "arq:*", "job:*"):
+                keys = [key async for key in redis.scan_iter(pattern)]
+                if keys:
+                    await redis.delete(*keys)
+
+        await clear()
+        try:
+            await test(redis)
+        finally:
+            await clear()
+            await redis.aclose()
+
+    asyncio.run(run())
+
+
+async def _queued_by_tenant(redis):
+    queued = await redis.zrange(default_queue_name, 0, -1)
+    counts = {}
+    for job_id in queued:
+        tenant = job_id.decode().split("-")[0]
+        counts[tenant] = counts.get(tenant, 0) + 1
+    return counts
+
+
+def test_dispatch_shares_the_queue_by_weight():
+    async def test(redis):
+        # "big" submitted a large batch first; "small" still gets its share
+        await push_jobs(redis, "big", _jobs("big", 20), TenantShare(weight=1, max_in_flight=100))
+        await push_jobs(redis, "small", _jobs("small", 4), TenantShare(weight=2, max_in_flight=100))
+
+        assert await dispatch(redis, below=6) == 6
+        assert await _queued_by_tenant(redis) == {"big": 2, "small": 4}
+        assert await pending_jobs(redis) == 18
+
+    _run(test)
+
+
+def test_dispatch_respects_the_in_flight_cap():
+    async def test(redis):
+        jobs = _jobs("capped", 5)
+        await push_jobs(redis, "capped", jobs, TenantShare(weight=10, max_in_flight=2))
+
+        assert await dispatch(redis, below=50) == 2
+        assert await dispatch(redis, below=50) == 0
+        # A finished job frees a slot for the next one
+        assert await release_job(redis, jobs[0]["job_id"])
+        assert await dispatch(redis, below=50) == 1
+        assert await _queued_by_tenant(redis) == {"capped": 3}
+
+    _run(test)
+
+
+def test_dispatch_drops_cancelled_jobs():
+    async def test(redis):
+        jobs = _jobs("u", 3)
+        await write_job_record(redis, jobs[0]["job_id"], {"status": "cancelled"}, publish=False)
+        await push_jobs(redis, "u", jobs, TenantShare(weight=5, max_in_flight=2))
+
+        # The cancelled job doesn't keep its in-flight slot
+        assert await dispatch(redis, below=50) == 1
+        assert await dispatch(redis, below=50) == 1
+        queued = await redis.zrange(default_queue_name, 0, -1)
+        assert sorted(queued) == sorted(job["job_id"].encode() for job in jobs[1:])
+
+    _run(test)
+
+
+def test_jobs_carry_their_submit_time_through_the_user_queue():
+    async def test(redis):
+        jobs = _jobs("u", 1)
+        before = time.time()
+        await push_jobs(redis, "u", jobs, TenantShare(weight=1, max_in_flight=2))
+        await asyncio.sleep(0.2)
+        assert await dispatch(redis, below=50) == 1
+
+        # Queue wait counts the time spent waiting in the user's queue
+        info = await Job(jobs[0]["job_id"], redis).info()
+        submitted_at = info.kwargs["submitted_at"]
+        assert before <= submitted_at <= info.enqueue_time.timestamp() - 0.2
+
+    _run(test)
@@ -0,0 +1,20 @@
+import asyncio
+from app.core.config import settings
+from app.core.tracing import start_trace
+from app.services.llm import analyze_page
+
+
+def test_fake_backend_answers_offline(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_BACKEND", "fake")
+    monkeypatch.setattr(settings, "FAKE_LLM_LATENCY", 0)
+    html = "<html><head><title>Fixture Page</title></head><body><p>Hello world</p></body></html>"
+
+    async def run():
+        trace = start_trace()
+        return await analyze_page(html, "Extract the title"), trace.to_dict()
+
+    result, timings = asyncio.run(run())
+    assert result["title"] == "Fixture Page"
+    assert "Hello world" in result["summary"]
+    assert timings["prompt_tokens"] > 0
+    assert "llm_ms" in timings
@@ -0,0 +1,86 @@
+import asyncio
+import uuid
+import pytest
+from redis.asyncio import Redis
+from app.core.config import settings
+from app.services.job_events import JobEventHub, JobEventSubscription, wait_for_terminal_status
+from app.services.job_store import job_channel, job_key, update_job_fields, user_channel, write_job_record
+
+
+def _run(test):
+    async def run():
+        redis = Redis.from_url(settings.redis_connection_url)
+        try:
+            await redis.ping()
+        except Exception:
+            pytest.skip("Redis is not available")
+        hub = JobEventHub(redis)
+        try:
+            await test(redis, hub)
+        finally:
+            await hub.close()
+            await redis.aclose()
+
+    asyncio.run(run())
+
+
+def test_watchers_share_one_subscription_and_get_small_events():
+    async def test(redis, hub):
+        job_id, user_id = uuid.uuid4().hex, uuid.uuid4().hex
+        record = {"status": "pending", "user_id": user_id, "url": "https://example.com"}
+        await write_job_record(redis, job_id, record, publish=False)
+        try:
+            async with JobEventSubscription(hub, [job_channel(job_id)]) as job_watch, \
+                    JobEventSubscription(hub, [job_channel(job_id), user_channel(user_id)]) as user_watch:
+                assert await redis.pubsub_numsub(job_channel(job_id)) == [(job_channel(job_id).encode(), 1)]
+
+                await write_job_record(redis, job_id, {**record, "status": "completed", "data": {"title": "x" * 1000}})
+                expected = {"job_id": job_id, "status": "completed"}
+                for watch in (job_watch, user_watch):
+                    events = watch.events(heartbeat=2, stop_on_terminal=True)
+                    assert await events.__anext__() == expected
+                # Both of the second watcher's channels carried the event
+                assert await user_watch.queue.get() == expected
+
+            # Unsubscribed once the last watcher left
+            assert await redis.pubsub_numsub(job_channel(job_id)) == [(job_channel(job_id).encode(), 0)]
+        finally:
+            await redis.delete(job_key(job_id))
+
+    _run(test)
+
+
+def test_a_slow_watcher_loses_its_oldest_events():
+    async def test(redis, hub):
+        hub.queue_size = 2
+        job_id = uuid.uuid4().hex
+        await write_job_record(redis, job_id, {"status": "pending"}, publish=False)
+        try:
+            async with JobEventSubscription(hub, [job_channel(job_id)]) as watch:
+                for status in ("pending", "processing", "completed"):
+                    await update_job_fields(redis, job_id, status=status)
+                await asyncio.sleep(0.2)
+                assert [(await watch.queue.get())["status"] for _ in range(2)] == ["processing", "completed"]
+        finally:
+            await redis.delete(job_key(job_id))
+
+    _run(test)
+
+
+def test_wait_for_terminal_status_wakes_on_the_event():
+    async def test(redis, hub):
+        job_id = uuid.uuid4().hex
+        await write_job_record(redis, job_id, {"status": "processing"}, publish=False)
+
+        async def finish():
+            await asyncio.sleep(0.2)
+            await update_job_fields(redis, job_id, status="failed")
+
+        try:
+            task = asyncio.create_task(finish())
+            assert await wait_for_terminal_status(hub, job_id, timeout=5) == "failed"
+            await task
+        finally:
+            await redis.delete(job_key(job_id))
+
+    _run(test)
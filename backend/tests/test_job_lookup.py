@@ -0,0 +1,49 @@
+import asyncio
+import uuid
+from datetime import datetime
+import pytest
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.core import database
+from app.core.config import settings
+from app.models.job import Job
+from app.services.job_lookup import find_job, find_job_status
+from app.services.job_store import job_key, write_job_record
+
+
+def test_jobs_are_only_found_for_their_owner(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'lookup.db'}")
+    monkeypatch.setattr(database, "AsyncSessionLocal", sessionmaker(engine, class_=AsyncSession))
+    monkeypatch.setattr(database, "ReplicaSessionLocal", None)
+
+    async def run():
+        redis = Redis.from_url(settings.redis_connection_url)
+        try:
+            await redis.ping()
+        except Exception:
+            pytest.skip("Redis is not available")
+        cold, hot = uuid.uuid4().hex, uuid.uuid4().hex
+        async with engine.begin() as conn:
+            await conn.run_sync(Job.__table__.create)
+        async with database.AsyncSessionLocal() as session:
+            session.add(Job(id=cold, plan="free", created_at=datetime.utcnow(), url="https://example.com", mode="guided", status="completed", user_id="u1"))
+            await session.commit()
+        await write_job_record(redis, hot, {"status": "processing", "user_id": "u1"}, publish=False)
+        try:
+            # Postgres fallback, then the same job from the record it cached
+            assert await find_job_status(redis, cold, "u2") is None
+            assert await find_job_status(redis, cold, "u1") == "completed"
+            assert await find_job(redis, cold, "u2") is None
+            assert (await find_job(redis, cold, "u1"))["status"] == "completed"
+            assert await find_job(redis, cold, "u2") is None
+            assert await find_job_status(redis, cold, "u2") is None
+
+            assert await find_job(redis, hot, "u2") is None
+            assert await find_job_status(redis, hot, "u1") == "processing"
+        finally:
+            await redis.delete(job_key(cold), job_key(hot))
+            await redis.aclose()
+            await engine.dispose()
+
+    asyncio.run(run())
@@ -0,0 +1,24 @@
+from datetime import datetime
+import pytest
+from sqlalchemy.dialects import postgresql
+from app.services.job_queries import InvalidCursor, decode_cursor, encode_cursor, history_query
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2025, 1, 2, 3, 4, 5, 678901)
+    assert decode_cursor(encode_cursor(created_at, "job-1")) == (created_at, "job-1")
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor")
+
+
+def test_history_query_uses_keyset_and_skips_data_by_default():
+    cursor = encode_cursor(datetime(2025, 1, 1), "job-1")
+    sql = str(history_query("user_1", 20, cursor, status="completed", url_prefix="https://a_b/").compile(dialect=postgresql.dialect()))
+    assert "(jobs.created_at, jobs.id) < (" in sql
+    assert "jobs.user_id = " in sql and "jobs.status = " in sql
+    assert "ORDER BY jobs.created_at DESC, jobs.id DESC" in sql
+    assert "jobs.data" not in sql
+    assert "jobs.data" in str(history_query("user_1", 20, include_data=True))
@@ -0,0 +1,96 @@
+import asyncio
+import uuid
+import pytest
+from redis.asyncio import Redis
+from app.core.config import settings
+from app.services.job_store import (
+    encode_record, decode_record, encode_payload, decode_payload, PAYLOAD_FIELD,
+    job_key, read_job_record, read_job_records, touch_job_record, update_job_fields, write_job_record,
+)
+
+
+def _as_redis_reply(mapping):
+    # Redis returns bytes for both field names and values
+    return {k.encode(): (v if isinstance(v, bytes) else v.encode()) for k, v in mapping.items()}
+
+
+def test_small_fields_are_separate_hash_fields():
+    mapping = encode_record({"status": "pending", "url": "https://example.com", "mode": "guided", "error": None})
+    assert mapping == {"status": "pending", "url": "https://example.com", "mode": "guided"}
+
+
+def test_record_round_trip():
+    record = {
+        "status": "completed",
+        "url": "https://example.com",
+        "mode": "smart",
+        "user_id": "user_1",
+        "created_at": "2025-01-01T00:00:00",
+        "data": {"title": "Example", "items": list(range(100))},
+    }
+    mapping = encode_record(record)
+    assert PAYLOAD_FIELD in mapping
+    assert "data" not in mapping
+    assert decode_record(_as_redis_reply(mapping)) == record
+
+
+def test_payload_compresses_only_large_values():
+    small = encode_payload({"data": {"a": 1}})
+    large = encode_payload({"data": {"text": "lorem ipsum " * 500}})
+    assert small[:1] == b"m"
+    assert large[:1] == b"z"
+    assert len(large) < len("lorem ipsum " * 500)
+    assert decode_payload(large) == {"data": {"text": "lorem ipsum " * 500}}
+
+
+def test_reads_extend_the_ttl_up_to_the_maximum():
+    async def run():
+        redis = Redis.from_url(settings.redis_connection_url)
+        try:
+            await redis.ping()
+        except Exception:
+            pytest.skip("Redis is not available")
+        job_id = uuid.uuid4().hex
+        record = {"status": "completed", "url": "https://example.com", "mode": "guided", "data": {"a": 1}}
+        try:
+            await write_job_record(redis, job_id, record, ttl=60, publish=False)
+            assert await touch_job_record(redis, job_id, 100, 1000) == record
+            first = await redis.ttl(job_key(job_id))
+            for _ in range(5):
+                await touch_job_record(redis, job_id, 100, 1000)
+            last = await redis.ttl(job_key(job_id))
+            missing = await touch_job_record(redis, "missing-" + job_id, 100, 1000)
+            both = await read_job_records(redis, [job_id, "missing-" + job_id])
+        finally:
+            await redis.delete(job_key(job_id))
+            await redis.aclose()
+        assert 190 <= first <= 200  # 100 * 2^1
+        assert 990 <= last <= 1000  # Capped
+        assert missing is None
+        assert both == {job_id: record}
+
+    asyncio.run(run())
+
+
+def test_updates_never_recreate_an_expired_record():
+    async def run():
+        redis = Redis.from_url(settings.redis_connection_url)
+        try:
+            await redis.ping()
+        except Exception:
+            pytest.skip("Redis is not available")
+        missing, legacy = uuid.uuid4().hex, uuid.uuid4().hex
+        try:
+            assert not await update_job_fields(redis, missing, status="processing")
+            assert not await redis.exists(job_key(missing))
+
+            # A record from before records were hashes is rewritten as one
+            await redis.set(job_key(legacy), '{"status": "pending", "url": "https://example.com", "user_id": "u1"}', ex=60)
+            assert await update_job_fields(redis, legacy, status="processing")
+            assert await redis.type(job_key(legacy)) == b"hash"
+            assert await read_job_record(redis, legacy) == {"status": "processing", "url": "https://example.com", "user_id": "u1"}
+        finally:
+            await redis.delete(job_key(missing), job_key(legacy))
+            await redis.aclose()
+
+    asyncio.run(run())
@@ -0,0 +1,30 @@
+from datetime import datetime
+import pytest
+from app.core.plans import resolve_plan
+from app.services.partitions import add_months, expired_partitions, month_partition, partition_sql
+
+
+def test_month_arithmetic_and_names():
+    assert add_months(datetime(2025, 11, 1), 3) == datetime(2026, 2, 1)
+    assert add_months(datetime(2025, 1, 1), -1) == datetime(2024, 12, 1)
+    assert month_partition("free", datetime(2025, 3, 1)) == "jobs_free_202503"
+    with pytest.raises(ValueError):
+        month_partition("free; DROP TABLE jobs", datetime(2025, 3, 1))
+
+
+def test_partition_sql_covers_each_plan_and_month():
+    sql = partition_sql(["free"], datetime(2025, 12, 15), datetime(2026, 1, 1))
+    assert sql[0].startswith("CREATE TABLE IF NOT EXISTS jobs_free PARTITION OF jobs FOR VALUES IN ('free')")
+    assert sql[1].endswith("FOR VALUES FROM ('2025-12-01') TO ('2026-01-01')")
+    assert sql[2].endswith("FOR VALUES FROM ('2026-01-01') TO ('2026-02-01')")
+    assert len(sql) == 3
+
+
+def test_only_months_past_retention_expire(monkeypatch):
+    monkeypatch.setattr("app.core.config.settings.PLAN_RETENTION_DAYS", {"free": 30, "pro": 365})
+    names = ["jobs_free_202501", "jobs_free_202502", "jobs_free_202503", "jobs_free_default", "jobs_pro_202501"]
+    # March 31 minus 30 days is March 1: all of February is past retention, March isn't
+    now = datetime(2025, 3, 31)
+    assert expired_partitions("free", names, now) == ["jobs_free_202501", "jobs_free_202502"]
+    assert expired_partitions("pro", names, now) == []
+    assert resolve_plan("unknown") == resolve_plan(None) == "free"
@@ -0,0 +1,66 @@
+import asyncio
+import uuid
+import pytest
+from redis.asyncio import Redis
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.ratelimit import Limit, RateLimiter, RateLimitResult, limits_for
+
+
+def test_limits_for_skips_disabled_windows():
+    assert limits_for(5, 60, None) == [Limit(5, 1, "second"), Limit(60, 60, "minute")]
+    assert limits_for(0, None, 0) == []
+
+
+def test_rejection_headers_include_retry_after():
+    headers = RateLimitResult(False, 60, 0, reset=59.2, retry_after=0.4).headers()
+    assert headers == {
+        "X-RateLimit-Limit": "60",
+        "X-RateLimit-Remaining": "0",
+        "X-RateLimit-Reset": "60",
+        "Retry-After": "1",
+    }
+
+
+def _run_with_redis(check):
+    async def run():
+        redis = Redis.from_url(settings.redis_connection_url)
+        try:
+            await redis.ping()
+        except Exception:
+            pytest.skip("Redis is not available")
+        try:
+            await check(redis, f"test:{uuid.uuid4().hex}")
+        finally:
+            await redis.aclose()
+    asyncio.run(run())
+
+
+def test_gcra_allows_burst_then_rejects():
+    async def check(redis, key):
+        limiter = RateLimiter(redis)
+        limits = [Limit(5, 1, "second"), Limit(100, 60, "minute")]
+        results = [await limiter.check(key, limits) for _ in range(6)]
+        assert all(r.allowed for r in results[:5])
+        assert [r.remaining for r in results[:5]] == [4, 3, 2, 1, 0]
+        assert not results[5].allowed
+        assert 0 < results[5].retry_after <= 0.2
+        # The rejected request wasn't counted against the minute limit
+        await asyncio.sleep(results[5].retry_after + 0.01)
+        again = await limiter.check(key, [Limit(100, 60, "minute")])
+        assert again.remaining == 94
+
+    _run_with_redis(check)
+
+
+def test_local_precheck_skips_redis_while_blocked():
+    async def check(redis, key):
+        limiter = RateLimiter(redis, local_blocks=TTLCache())
+        limits = [Limit(1, 60, "minute")]
+        assert (await limiter.check(key, limits)).allowed
+        assert not (await limiter.check(key, limits)).allowed
+        await redis.delete(f"ratelimit:{key}:minute")
+        # Still refused from the local block list without asking Redis
+        assert not (await limiter.check(key, limits)).allowed
+
+    _run_with_redis(check)
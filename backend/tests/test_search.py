@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from app.services.search import InvalidSearch, result_text, search_query, search_vector
+
+
+def test_result_text_collects_strings_in_order_and_caps_length():
+    data = {"title": "Blue kettle", "price": 19.5, "specs": {"colour": "blue"}, "tags": ["sale", 3, None]}
+    assert result_text(data) == "Blue kettle\nblue\nsale"
+    assert result_text(data, limit=8) == "Blue ket"
+    assert result_text(None) == ""
+
+
+def test_search_vector_follows_the_sessions_database():
+    data = {"title": "Blue kettle"}
+    assert search_vector(data, create_engine("sqlite://")) is None
+    sql = str(search_vector(data, create_engine("postgresql+asyncpg://u:p@db/app")).compile(dialect=postgresql.dialect()))
+    assert "to_tsvector" in sql
+
+
+def test_search_query_pushes_predicates_down():
+    query = search_query("user_1", 20, q="kettle -used", jsonpath="$.price < 20", contains='{"in_stock": true}', status="completed")
+    sql = str(query.compile(dialect=postgresql.dialect()))
+    assert "jobs.search_vector @@ websearch_to_tsquery(" in sql
+    assert "jobs.data @@ CAST(" in sql and "AS JSONPATH)" in sql
+    assert "jobs.data @> CAST(" in sql and "AS JSONB)" in sql
+    assert "jobs.user_id = " in sql and "jobs.status = " in sql
+    assert "ORDER BY jobs.created_at DESC, jobs.id DESC" in sql
+
+
+@pytest.mark.parametrize("contains", ["not json", "[1, 2]"])
+def test_contains_must_be_an_object(contains):
+    with pytest.raises(InvalidSearch):
+        search_query("user_1", 20, contains=contains)
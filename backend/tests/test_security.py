@@ -0,0 +1,119 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jwt.algorithms import RSAAlgorithm
+from app.core import security
+from app.core.config import settings
+
+
+class _JWKSHandler(BaseHTTPRequestHandler):
+    jwks = {"keys": []}
+    requests = 0
+    failing = False
+
+    def do_GET(self):
+        type(self).requests += 1
+        time.sleep(0.05)  # Let concurrent callers pile up
+        if self.failing:
+            self.send_error(503)
+            return
+        body = json.dumps(self.jwks).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _signing_key(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": kid, "alg": "RS256", "use": "sig"})
+    return private_key, jwk
+
+
+@pytest.fixture
+def jwks_server(monkeypatch):
+    server = HTTPServer(("127.0.0.1", 0), _JWKSHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _JWKSHandler.requests = 0
+    _JWKSHandler.failing = False
+    monkeypatch.setattr(settings, "CLERK_ISSUER_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(security, "_jwks_client", None)
+    monkeypatch.setattr(security, "UNKNOWN_KID_REFETCH_INTERVAL", 0)
+    security._verified_claims.clear()
+    yield _JWKSHandler
+    server.shutdown()
+
+
+def test_verified_claims_are_cached(jwks_server):
+    private_key, jwk = _signing_key("k1")
+    jwks_server.jwks = {"keys": [jwk]}
+    token = jwt.encode({"sub": "user_1", "exp": int(time.time()) + 60}, private_key, algorithm="RS256", headers={"kid": "k1"})
+
+    async def run():
+        first = await security.verify_token(token)
+        second = await security.verify_token(token)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first["sub"] == second["sub"] == "user_1"
+    assert jwks_server.requests == 1
+
+
+def test_unknown_kid_refetches_once_for_concurrent_requests(jwks_server):
+    old_key, old_jwk = _signing_key("old")
+    new_key, new_jwk = _signing_key("new")
+    jwks_server.jwks = {"keys": [old_jwk]}
+    tokens = [
+        jwt.encode({"sub": f"user_{i}", "exp": int(time.time()) + 60}, new_key, algorithm="RS256", headers={"kid": "new"})
+        for i in range(5)
+    ]
+
+    async def run():
+        await security.get_jwks_client().refresh()
+        jwks_server.jwks = {"keys": [old_jwk, new_jwk]}  # Key rotation
+        return await asyncio.gather(*(security.verify_token(t) for t in tokens))
+
+    claims = asyncio.run(run())
+    assert [c["sub"] for c in claims] == [f"user_{i}" for i in range(5)]
+    assert jwks_server.requests == 2
+
+
+def test_expired_token_is_rejected(jwks_server):
+    private_key, jwk = _signing_key("k1")
+    jwks_server.jwks = {"keys": [jwk]}
+    token = jwt.encode({"sub": "user_1", "exp": int(time.time()) - 5}, private_key, algorithm="RS256", headers={"kid": "k1"})
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(security.verify_token(token))
+    assert exc.value.detail == "Token expired"
+
+
+def test_failed_fetch_without_keys_fails_fast_until_retry(jwks_server, monkeypatch):
+    private_key, jwk = _signing_key("k1")
+    jwks_server.jwks = {"keys": [jwk]}
+    jwks_server.failing = True
+
+    async def run():
+        client = security.get_jwks_client()
+        for _ in range(3):
+            with pytest.raises(HTTPException):
+                await client.get_key("k1")
+        assert jwks_server.requests == 1  # Only the first request waited on the fetch
+
+        jwks_server.failing = False
+        monkeypatch.setattr(security, "FAILED_FETCH_RETRY_INTERVAL", 0)
+        return await client.get_key("k1")
+
+    assert asyncio.run(run()) is not None
+    assert jwks_server.requests == 2
@@ -0,0 +1,102 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.core import database
+from app.core.config import settings
+from app.models.stats import StatsRollup
+from app.services import stats as stats_service
+from app.services.stats import ALL_TIME, bucket_start, record_job_stats, read_stats, stats_key, summarize, user_scope
+
+
+@pytest.fixture
+def key_prefix(monkeypatch):
+    """Prefix the stats keys, global scope and stats:pending included, so tests never touch real counts."""
+    prefix = f"test:{uuid.uuid4().hex}:"
+    original = stats_service.stats_key
+    monkeypatch.setattr(stats_service, "stats_key", lambda *args: prefix + original(*args))
+    monkeypatch.setattr(stats_service, "STATS_PENDING_KEY", prefix + stats_service.STATS_PENDING_KEY)
+    return prefix
+
+
+async def _delete_prefixed(redis, prefix):
+    keys = [key async for key in redis.scan_iter(f"{prefix}*")]
+    if keys:
+        await redis.delete(*keys)
+
+
+def test_bucket_keys():
+    at = datetime(2025, 3, 4, 5, 6, 7)
+    assert stats_key("global", "hour", bucket_start("hour", at)) == "stats:global:hour:2025030405"
+    assert stats_key("global", "day", bucket_start("day", at)) == "stats:global:day:20250304"
+    assert stats_key("user:u1", "all") == "stats:user:u1:all"
+
+
+def test_summarize_derives_rates():
+    assert summarize({"jobs": 4, "completed": 3, "failed": 1, "duration_ms": 2000}) == {
+        "jobs": 4, "completed": 3, "failed": 1, "cancelled": 0,
+        "success_rate": 75.0, "avg_duration_ms": 500.0, "bytes": 0,
+    }
+    assert summarize({})["avg_duration_ms"] is None
+
+
+def test_recorded_jobs_show_up_in_totals_and_series(key_prefix):
+    async def run():
+        redis = Redis.from_url(settings.redis_connection_url)
+        try:
+            await redis.ping()
+        except Exception:
+            pytest.skip("Redis is not available")
+        user_id = uuid.uuid4().hex
+        try:
+            await record_job_stats(redis, user_id, "completed", 2.0, 500)
+            await record_job_stats(redis, user_id, "cancelled")
+            stats = await read_stats(redis, user_scope(user_id), "hour", 24)
+        finally:
+            await _delete_prefixed(redis, key_prefix)
+            await redis.aclose()
+        assert (stats["jobs"], stats["completed"], stats["cancelled"]) == (2, 1, 1)
+        assert stats["avg_duration_ms"] == 2000.0
+        assert len(stats["series"]) == 24
+        assert stats["series"][-1]["bytes"] == 500
+
+    asyncio.run(run())
+
+
+def test_a_new_scope_starts_from_the_rollup_table(tmp_path, monkeypatch, key_prefix):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'stats.db'}")
+    monkeypatch.setattr(database, "AsyncSessionLocal", sessionmaker(engine, class_=AsyncSession))
+    monkeypatch.setattr(database, "ReplicaSessionLocal", None)
+
+    async def run():
+        redis = Redis.from_url(settings.redis_connection_url)
+        try:
+            await redis.ping()
+        except Exception:
+            pytest.skip("Redis is not available")
+        scope = user_scope(uuid.uuid4().hex)
+        yesterday = bucket_start("day", datetime.utcnow()) - timedelta(days=1)
+        async with engine.begin() as conn:
+            await conn.run_sync(StatsRollup.__table__.create)
+        async with database.AsyncSessionLocal() as session:
+            # Counted before Redis had the scope, e.g. backfilled by migration 0005
+            session.add_all([
+                StatsRollup(scope=scope, granularity=granularity, bucket_start=start, jobs=3, completed=2, failed=1, cancelled=0, duration_ms=3000, bytes=0)
+                for granularity, start in (("all", ALL_TIME), ("day", yesterday))
+            ])
+            await session.commit()
+        try:
+            await record_job_stats(redis, scope.split(":", 1)[1], "completed", 1.0)
+            await record_job_stats(redis, scope.split(":", 1)[1], "completed", 1.0)
+            stats = await read_stats(redis, scope, "day", 2)
+        finally:
+            await _delete_prefixed(redis, key_prefix)
+            await redis.aclose()
+            await engine.dispose()
+        assert (stats["jobs"], stats["completed"], stats["failed"]) == (5, 4, 1)
+        assert [bucket["jobs"] for bucket in stats["series"]] == [3, 2]
+
+    asyncio.run(run())
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from app.core.tracing import start_trace, current_trace, span, record_count
+from app.services.scraper import fetch_static, extract_selectors
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    body = b"<html><head><title>Traced</title></head><body><h1>Hello</h1></body></html>"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_spans_accumulate_per_job():
+    async def job(n):
+        trace = start_trace()
+        for _ in range(n):
+            with span("parse"):
+                pass
+        record_count("prompt_tokens", 10 * n)
+        return trace.to_dict()
+
+    async def run():
+        return await asyncio.gather(job(1), job(3))
+
+    one, three = asyncio.run(run())
+    assert one["prompt_tokens"] == 10
+    assert three["prompt_tokens"] == 30
+    assert "parse_ms" in one and "total_ms" in one
+
+
+def test_spans_without_trace_are_noops():
+    assert current_trace() is None
+    with span("parse"):
+        pass
+    record_count("bytes_downloaded", 1)
+
+
+def test_static_fetch_breakdown():
+    server = HTTPServer(("127.0.0.1", 0), _PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+
+    async def run():
+        trace = start_trace()
+        html = await fetch_static(url)
+        extract_selectors(html, {"title": "h1"})
+        return trace.to_dict()
+
+    try:
+        timings = asyncio.run(run())
+    finally:
+        server.shutdown()
+
+    assert timings["bytes_downloaded"] == len(_PageHandler.body)
+    for key in ("connect_ms", "ttfb_ms", "download_ms", "fetch_ms", "parse_ms"):
+        assert key in timings
@@ -0,0 +1,39 @@
+import asyncio
+import uuid
+import pytest
+from redis.asyncio import Redis
+from app.core.config import settings
+from app.services.usage import DRAIN_SCRIPT, USAGE_PENDING_PREFIX, _parse_pending, job_usage, record_usage
+
+
+def test_job_usage_counts_job_type_and_tokens():
+    assert job_usage("k1", False, {"fetch_ms": 12.0}) == {("k1", "static_jobs"): 1}
+    assert job_usage("k1", True, {"prompt_tokens": 900, "completion_tokens": 100}) == {
+        ("k1", "dynamic_jobs"): 1,
+        ("k1", "llm_tokens"): 1000,
+    }
+
+
+def test_pending_counters_drain_in_one_batch():
+    async def run():
+        redis = Redis.from_url(settings.redis_connection_url)
+        try:
+            await redis.ping()
+        except Exception:
+            pytest.skip("Redis is not available")
+        dirty_key = f"test:usage:dirty:{uuid.uuid4().hex}"
+        key_id = uuid.uuid4().hex
+        try:
+            await record_usage(redis, {(key_id, "requests"): 3}, day="2025-01-01")
+            await record_usage(redis, {(key_id, "requests"): 2, (key_id, "llm_tokens"): 50}, day="2025-01-01")
+            await redis.smove("usage:dirty", dirty_key, key_id)
+
+            raw = await redis.register_script(DRAIN_SCRIPT)(keys=[dirty_key], args=[10, USAGE_PENDING_PREFIX])
+            assert raw[0].decode() == key_id
+            assert _parse_pending(raw[1]) == {("2025-01-01", "requests"): 5, ("2025-01-01", "llm_tokens"): 50}
+            assert not await redis.exists(f"{USAGE_PENDING_PREFIX}{key_id}")
+        finally:
+            await redis.delete(dirty_key, f"{USAGE_PENDING_PREFIX}{key_id}")
+            await redis.aclose()
+
+    asyncio.run(run())
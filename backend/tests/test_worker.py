@@ -0,0 +1,169 @@
+import asyncio
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from arq.connections import ArqRedis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app import worker
+from app.core import database
+from app.core.config import settings
+from app.core.database import Base
+from app.models import api_key, job, schedule, stats, webhook # Register every table
+from app.models.job import Job
+from app.models.schedule import Schedule
+from app.services.job_store import read_job_record
+from app.services.stats import stats_key, user_scope
+from app.services.usage import USAGE_DIRTY_KEY, usage_pending_key
+from app.services import webhooks
+from app.services.webhooks import WebhookSubscriptionCache
+
+PAGE = b"<html><head><title>Widget</title></head><body><h1>Widget</h1><p class='price'>9.99</p></body></html>"
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/page":
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def page_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _PageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def _run(tmp_path, monkeypatch, test):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'worker.db'}")
+    sessions = sessionmaker(engine, class_=AsyncSession)
+    # The worker's own sessions, and those of the services it calls
+    monkeypatch.setattr(worker, "AsyncSessionLocal", sessions)
+    monkeypatch.setattr(webhooks, "AsyncSessionLocal", sessions)
+    monkeypatch.setattr(database, "AsyncSessionLocal", sessions)
+    monkeypatch.setattr(database, "ReplicaSessionLocal", None)
+
+    async def run():
+        redis = ArqRedis.from_url(settings.redis_connection_url)
+        try:
+            await redis.ping()
+        except Exception:
+            pytest.skip("Redis is not available")
+
+        async def clear():
+            for pattern in ("job:*", "stats:*", "admission:*", "usage:*"):
+                keys = [key async for key in redis.scan_iter(pattern)]
+                if keys:
+                    await redis.delete(*keys)
+
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await clear()
+        try:
+            ctx = {"redis": redis, "webhook_cache": WebhookSubscriptionCache()}
+            await test(ctx, worker.AsyncSessionLocal)
+        finally:
+            await clear()
+            await redis.aclose()
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_run_scrape_task_completes_and_meters_a_guided_job(tmp_path, monkeypatch, page_server):
+    async def test(ctx, session_factory):
+        job_id = uuid.uuid4().hex
+        status = await worker.run_scrape_task(
+            ctx, job_id=job_id, url=f"{page_server}/page", mode="guided",
+            selectors={"title": "h1", "price": ".price"}, user_id="u1", api_key_id="key-1",
+        )
+        assert status == "completed"
+        # Counted against the API key, waiting for the flush_usage cron
+        assert await ctx["redis"].sismember(USAGE_DIRTY_KEY, "key-1")
+        usage = await ctx["redis"].hgetall(usage_pending_key("key-1"))
+        assert {k.decode().split(":", 1)[1]: int(v) for k, v in usage.items()} == {"static_jobs": 1}
+
+        record = await read_job_record(ctx["redis"], job_id)
+        assert record["status"] == "completed"
+        assert record["data"] == {"title": "Widget", "price": "9.99"}
+        async with session_factory() as session:
+            row = (await session.execute(select(Job).where(Job.id == job_id))).scalar_one()
+        assert row.status == "completed"
+        assert row.data == {"title": "Widget", "price": "9.99"}
+        assert row.user_id == "u1"
+
+    _run(tmp_path, monkeypatch, test)
+
+
+def test_run_scrape_task_records_a_failed_fetch(tmp_path, monkeypatch, page_server):
+    async def test(ctx, session_factory):
+        job_id = uuid.uuid4().hex
+        status = await worker.run_scrape_task(
+            ctx, job_id=job_id, url=f"{page_server}/missing", mode="guided", selectors={"title": "h1"}, api_key_id="key-1",
+        )
+        assert status == "failed"
+        # Failed jobs still used a fetch
+        assert await ctx["redis"].hlen(usage_pending_key("key-1")) == 1
+
+        record = await read_job_record(ctx["redis"], job_id)
+        assert record["status"] == "failed"
+        assert "404" in record["error"]
+        async with session_factory() as session:
+            row = (await session.execute(select(Job).where(Job.id == job_id))).scalar_one()
+        assert row.status == "failed"
+
+    _run(tmp_path, monkeypatch, test)
+
+
+def test_a_webhook_lookup_error_does_not_fail_a_completed_job(tmp_path, monkeypatch, page_server):
+    class BrokenCache:
+        async def has_subscribers(self, user_id, event):
+            raise ConnectionError("database unavailable")
+
+    async def test(ctx, session_factory):
+        ctx["webhook_cache"] = BrokenCache()
+        job_id = uuid.uuid4().hex
+        status = await worker.run_scrape_task(
+            ctx, job_id=job_id, url=f"{page_server}/page", mode="guided", selectors={"title": "h1"}, user_id="u1",
+        )
+        assert status == "completed"
+        assert (await read_job_record(ctx["redis"], job_id))["status"] == "completed"
+
+    _run(tmp_path, monkeypatch, test)
+
+
+def test_a_failed_scheduled_run_is_recorded(tmp_path, monkeypatch, page_server):
+    async def test(ctx, session_factory):
+        schedule_id = uuid.uuid4().hex
+        async with session_factory() as session:
+            schedule = Schedule(id=schedule_id, user_id="u1", url=f"{page_server}/missing", mode="guided", selectors={"title": "h1"}, interval_seconds=3600)
+            session.add(schedule)
+            await session.commit()
+
+        await worker.scheduled_scrape_task(ctx, schedule_id)
+
+        async with session_factory() as session:
+            row = (await session.execute(select(Job).where(Job.schedule_id == schedule_id))).scalar_one()
+            schedule = await session.get(Schedule, schedule_id)
+        assert row.status == "failed"
+        assert "404" in row.error
+        assert schedule.last_run_at is not None
+        assert schedule.last_content_hash is None
+        assert (await read_job_record(ctx["redis"], row.id))["status"] == "failed"
+        assert await ctx["redis"].hget(stats_key(user_scope("u1"), "all"), "failed") == b"1"
+
+    _run(tmp_path, monkeypatch, test)
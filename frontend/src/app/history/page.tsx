@@ -1,6 +1,6 @@
 'use client';
 
-import { useQuery } from '@tanstack/react-query';
+import { useInfiniteQuery } from '@tanstack/react-query';
 import { scrapeService } from '@/services/scrape';
 import {
     Table,
@@ -20,13 +20,16 @@ import { useAuth } from '@clerk/nextjs';
 
 export default function HistoryPage() {
     const { getToken } = useAuth();
-    const { data: jobs, isLoading } = useQuery({
+    const { data, isLoading, hasNextPage, fetchNextPage, isFetchingNextPage } = useInfiniteQuery({
         queryKey: ['history'],
-        queryFn: async () => {
+        queryFn: async ({ pageParam }) => {
             const token = await getToken();
-            return scrapeService.getHistory(token || undefined);
+            return scrapeService.getHistory(token || undefined, pageParam);
         },
+        initialPageParam: undefined as string | undefined,
+        getNextPageParam: (lastPage) => lastPage.nextCursor ?? undefined,
     });
+    const jobs = data?.pages.flatMap((page) => page.jobs);
 
     if (isLoading) {
         return (
@@ -97,6 +100,18 @@ export default function HistoryPage() {
                     </TableBody>
                 </Table>
             </div>
+
+            {hasNextPage && (
+                <div className="flex justify-center">
+                    <Button
+                        variant="outline"
+                        onClick={() => fetchNextPage()}
+                        disabled={isFetchingNextPage}
+                    >
+                        {isFetchingNextPage ? 'Loading...' : 'Load more'}
+                    </Button>
+                </div>
+            )}
         </div>
     );
 }
@@ -1,7 +1,8 @@
 'use client';
 
 import { useParams } from 'next/navigation';
-import { useQuery, useMutation } from '@tanstack/react-query';
+import { useEffect, useState } from 'react';
+import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { scrapeService } from '@/services/scrape';
 import ResultsView from '@/components/results/results-view';
 import { Button } from '@/components/ui/button';
@@ -14,6 +15,9 @@ export default function JobResultsPage() {
     const params = useParams();
     const id = params.id as string;
     const { getToken } = useAuth();
+    const queryClient = useQueryClient();
+    // Poll only if the live connection is unavailable
+    const [isLive, setIsLive] = useState(false);
 
     const { data: job, isLoading, error } = useQuery({
         queryKey: ['job', id],
@@ -23,10 +27,41 @@ export default function JobResultsPage() {
         },
         refetchInterval: (query) => {
             const status = query.state.data?.status;
-            return status === 'completed' || status === 'failed' ? false : 2000;
+            if (status === 'completed' || status === 'failed' || status === 'cancelled') {
+                return false;
+            }
+            return isLive ? false : 2000;
         }
     });
 
+    useEffect(() => {
+        let close: (() => void) | undefined;
+        let cancelled = false;
+
+        getToken().then((token) => {
+            if (cancelled || !token) return;
+            close = scrapeService.watchJob(
+                id,
+                token,
+                (event) => {
+                    setIsLive(true);
+                    if (event.status === 'completed') {
+                        // Fetch the full result once it is ready
+                        queryClient.invalidateQueries({ queryKey: ['job', id] });
+                    } else {
+                        queryClient.setQueryData(['job', id], (old: any) => ({ ...old, ...event }));
+                    }
+                },
+                () => setIsLive(false)
+            );
+        });
+
+        return () => {
+            cancelled = true;
+            close?.();
+        };
+    }, [id, getToken, queryClient]);
+
     const saveMutation = useMutation({
         mutationFn: async (jobId: string) => {
             const token = await getToken();
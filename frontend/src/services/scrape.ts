@@ -4,7 +4,7 @@ import { ScrapeFormData } from '@/lib/validators';
 export interface ScrapeJob {
     job_id: string;
     id?: string; // For history items from DB
-    status: 'pending' | 'processing' | 'completed' | 'failed' | 'saved';
+    status: 'pending' | 'processing' | 'completed' | 'failed' | 'cancelled' | 'saved';
     url: string;
     mode: 'guided' | 'smart';
     created_at: string;
@@ -36,15 +36,49 @@ export const scrapeService = {
         return response.data;
     },
 
+    /**
+     * Subscribe to a job's status updates over WebSocket.
+     * Returns a function that closes the socket.
+     */
+    watchJob: (
+        id: string,
+        token: string,
+        onEvent: (event: Partial<ScrapeJob>) => void,
+        onClose?: () => void
+    ) => {
+        const wsUrl = (api.defaults.baseURL || '').replace(/^http/, 'ws');
+        const socket = new WebSocket(
+            `${wsUrl}/events/ws?job_id=${encodeURIComponent(id)}&token=${encodeURIComponent(token)}`
+        );
+        socket.onmessage = (message) => {
+            const event = JSON.parse(message.data);
+            if (event.type !== 'ping') {
+                onEvent(event);
+            }
+        };
+        if (onClose) {
+            socket.onclose = onClose;
+        }
+        return () => socket.close();
+    },
+
     saveJob: async (id: string, token?: string) => {
         const headers = token ? { Authorization: `Bearer ${token}` } : undefined;
         const response = await api.post<{ job_id: string; status: string }>(`/scrape/${id}/save`, {}, { headers });
         return response.data;
     },
 
-    getHistory: async (token?: string) => {
+    /**
+     * One page of saved jobs, newest first. Pass `nextCursor` back to get
+     * the next page; it is null on the last one.
+     */
+    getHistory: async (token?: string, cursor?: string) => {
         const headers = token ? { Authorization: `Bearer ${token}` } : undefined;
-        const response = await api.get<ScrapeJob[]>('/scrape/history/all', { headers });
-        return response.data;
+        const response = await api.get<ScrapeJob[]>('/scrape/history/all', {
+            headers,
+            params: cursor ? { cursor } : undefined,
+        });
+        const nextCursor: string | null = response.headers['x-next-cursor'] ?? null;
+        return { jobs: response.data, nextCursor };
     },
 };